@@ -1,16 +1,69 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 import asyncio
 from datetime import datetime
 import logging
+import time
+
+from services.metrics import AGENT_EXECUTE_SECONDS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class RequestBudget:
+    """Latency budget for one pipeline run, measured on the event loop clock"""
+    
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.started_at = asyncio.get_running_loop().time()
+    
+    def at(self, fraction: float) -> float:
+        """Loop time at which the given fraction of the budget is used up"""
+        return self.started_at + self.seconds * fraction
+    
+    def remaining(self, fraction: float = 1.0) -> float:
+        """Seconds left until the given fraction of the budget is used up"""
+        return max(0.0, self.at(fraction) - asyncio.get_running_loop().time())
+
+class AgentContext(dict):
+    """Context shared by every agent in a DAG run
+    
+    Keys are marked ready once their producing agent has finished, whether or
+    not it succeeded, so consumers can wait for them and then fall back to
+    their own discovery when the key is missing.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._ready: Dict[str, asyncio.Event] = {}
+    
+    def _event(self, key: str) -> asyncio.Event:
+        return self._ready.setdefault(key, asyncio.Event())
+    
+    def mark_ready(self, key: str):
+        """Release everyone waiting for a key"""
+        self._event(key).set()
+    
+    async def wait_for(self, key: str) -> Any:
+        """Wait until a key's producer has finished and return its value (None if it failed)"""
+        await self._event(key).wait()
+        return self.get(key)
+
 class BaseAgent(ABC):
     """Base class for all agents in the StockGPT agentic framework"""
     
+    # Context keys this agent returns from execute()
+    produces: Tuple[str, ...] = ()
+    # Context keys that must be ready before execute() starts
+    consumes: Tuple[str, ...] = ()
+    # Context keys the agent waits for itself, part-way through execute()
+    reads: Tuple[str, ...] = ()
+    # Fractions of the request budget: after the soft deadline the agent stops
+    # waiting for inputs and skips optional work; at the hard one it is cancelled
+    soft_deadline: float = 0.5
+    hard_deadline: float = 0.7
+    
     def __init__(self, name: str, description: str):
         self.name = name
         self.description = description
@@ -21,6 +74,58 @@ class BaseAgent(ABC):
         """Execute the agent's main functionality"""
         pass
     
+    def time_remaining(self, context: Dict[str, Any], deadline: str = "soft") -> Optional[float]:
+        """Seconds until this agent's soft or hard deadline, or None without a request budget"""
+        budget: Optional[RequestBudget] = context.get("budget")
+        if budget is None:
+            return None
+        return budget.remaining(self.soft_deadline if deadline == "soft" else self.hard_deadline)
+    
+    def past_soft_deadline(self, context: Dict[str, Any]) -> bool:
+        """True once the agent should wrap up with what it has"""
+        return self.time_remaining(context) == 0.0
+    
+    def save_partial(self, context: Dict[str, Any], **sections):
+        """Record finished result sections so a hard-deadline cancellation still returns them"""
+        partial_results = context.get("partial_results")
+        if partial_results is not None:
+            partial_results.setdefault(self.name, {}).update(sections)
+    
+    async def wait_for(self, context: Dict[str, Any], *keys: str):
+        """Wait for context keys produced by other agents, but no longer than the soft deadline
+        
+        A no-op outside a DAG run. When the deadline passes the agent carries on
+        without the missing keys and falls back to its own discovery.
+        """
+        if not isinstance(context, AgentContext):
+            return
+        try:
+            # The deadline is absolute, so waiting key by key bounds the total wait too
+            for key in keys:
+                await asyncio.wait_for(context.wait_for(key), self.time_remaining(context))
+        except asyncio.TimeoutError:
+            missing = [key for key in keys if key not in context]
+            self.log_warning(f"Soft deadline reached; continuing without {missing}")
+    
+    async def run(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute the agent once its inputs are ready and record its latency"""
+        if self.consumes:
+            await self.wait_for(context, *self.consumes)
+        
+        start = time.perf_counter()
+        status = "error"
+        try:
+            result = await self.execute(context)
+            # Agents report their own failures as *_error keys instead of raising
+            if not any(key.endswith("_error") for key in result):
+                status = "success"
+            return result
+        except asyncio.CancelledError:
+            status = "timed_out"
+            raise
+        finally:
+            AGENT_EXECUTE_SECONDS.observe(time.perf_counter() - start, agent=self.name, status=status)
+    
     def log_info(self, message: str):
         """Log information message"""
         self.logger.info(f"[{self.name}] {message}")
@@ -36,8 +141,9 @@ class BaseAgent(ABC):
 class AgentOrchestrator:
     """Orchestrates multiple agents to work together"""
     
-    def __init__(self):
+    def __init__(self, budget_seconds: Optional[float] = None):
         self.agents: List[BaseAgent] = []
+        self.budget_seconds = budget_seconds
         self.logger = logging.getLogger("AgentOrchestrator")
     
     def add_agent(self, agent: BaseAgent):
@@ -47,40 +153,131 @@ class AgentOrchestrator:
     
     async def run_agents_sequential(self, initial_context: Dict[str, Any]) -> Dict[str, Any]:
         """Run agents sequentially, passing context between them"""
-        context = initial_context.copy()
+        context = self._prepare_context(initial_context)
         
         for agent in self.agents:
-            try:
-                self.logger.info(f"Executing agent: {agent.name}")
-                result = await agent.execute(context)
-                context.update(result)
-                self.logger.info(f"Agent {agent.name} completed successfully")
-            except Exception as e:
-                self.logger.error(f"Agent {agent.name} failed: {str(e)}")
-                context[f"{agent.name}_error"] = str(e)
+            context.update(await self._run_agent(agent, context))
         
         return context
     
     async def run_agents_parallel(self, initial_context: Dict[str, Any]) -> Dict[str, Any]:
         """Run agents in parallel for independent tasks"""
-        context = initial_context.copy()
+        context = self._prepare_context(initial_context)
+        
+        # Each agent gets its own copy; run bookkeeping dicts are shared between copies
+        results = await asyncio.gather(*(self._run_agent(agent, context.copy()) for agent in self.agents))
+        
+        for result in results:
+            context.update(result)
+        return context
+    
+    async def run_agents_dag(self, initial_context: Dict[str, Any]) -> Dict[str, Any]:
+        """Start every agent at once; each waits only for the context keys it consumes"""
+        context = self.new_dag_context(initial_context)
+        async for _ in self.iter_agents_dag(context):
+            pass
+        return dict(context)
+    
+    def new_dag_context(self, initial_context: Dict[str, Any]) -> AgentContext:
+        """Shared context for ``iter_agents_dag``, with the per-run budget and bookkeeping"""
+        return AgentContext(self._prepare_context(initial_context))
+    
+    async def iter_agents_dag(self, context: AgentContext) -> AsyncIterator[Tuple[BaseAgent, Dict[str, Any]]]:
+        """Run agents as ``run_agents_dag`` does, yielding ``(agent, result)`` as each finishes
+        
+        ``context`` is updated in place before each result is yielded. Closing
+        the iterator early cancels the agents still running.
+        """
+        producers = self._check_dependencies()
         
-        # Create tasks for all agents
-        tasks = []
+        # Keys nobody produces will never arrive, so consumers must not wait on them
         for agent in self.agents:
-            task = asyncio.create_task(agent.execute(context.copy()))
-            tasks.append((agent.name, task))
+            for key in agent.consumes + agent.reads:
+                if key not in producers:
+                    if key not in context:
+                        self.logger.warning(f"Agent {agent.name} consumes {key} but no agent produces it")
+                    context.mark_ready(key)
         
-        # Wait for all tasks to complete
-        results = {}
-        for agent_name, task in tasks:
+        async def run_agent(agent: BaseAgent) -> Tuple[BaseAgent, Dict[str, Any]]:
             try:
-                result = await task
-                results.update(result)
-                self.logger.info(f"Agent {agent_name} completed successfully")
-            except Exception as e:
-                self.logger.error(f"Agent {agent_name} failed: {str(e)}")
-                results[f"{agent_name}_error"] = str(e)
+                result = await self._run_agent(agent, context)
+                context.update(result)
+                return agent, result
+            finally:
+                for key in agent.produces:
+                    context.mark_ready(key)
+        
+        tasks = [asyncio.create_task(run_agent(agent)) for agent in self.agents]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    def _prepare_context(self, initial_context: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy the initial context and add the per-run budget and bookkeeping"""
+        context = initial_context.copy()
+        if self.budget_seconds and "budget" not in context:
+            context["budget"] = RequestBudget(self.budget_seconds)
+        context.setdefault("agent_runs", {})
+        context.setdefault("partial_results", {})
+        return context
+    
+    async def _run_agent(self, agent: BaseAgent, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one agent under its hard deadline and record how it finished in ``agent_runs``
+        
+        An agent cancelled at its hard deadline still contributes whatever
+        sections it saved with ``save_partial``, flagged ``partial``.
+        """
+        start = time.perf_counter()
+        try:
+            self.logger.info(f"Executing agent: {agent.name}")
+            result = await asyncio.wait_for(agent.run(context), agent.time_remaining(context, "hard"))
+            if any(key.endswith("_error") for key in result):
+                status = "failed"
+            elif any(isinstance(value, dict) and value.get("partial") for value in result.values()):
+                status = "partial"
+            else:
+                status = "success"
+            self.logger.info(f"Agent {agent.name} completed with status {status}")
+        except asyncio.TimeoutError:
+            sections = context["partial_results"].get(agent.name)
+            if sections and agent.produces:
+                result = {agent.produces[0]: {**sections, "partial": True}}
+                status = "partial"
+            else:
+                result = {}
+                status = "timed_out"
+            self.logger.warning(f"Agent {agent.name} hit its hard deadline ({status})")
+        except Exception as e:
+            self.logger.error(f"Agent {agent.name} failed: {str(e)}")
+            result = {f"{agent.name}_error": str(e)}
+            status = "failed"
+        
+        context["agent_runs"][agent.name] = {
+            "status": status,
+            "elapsed_seconds": round(time.perf_counter() - start, 3)
+        }
+        return result
+    
+    def _check_dependencies(self) -> Dict[str, BaseAgent]:
+        """Map each context key to its producer, rejecting cycles that would deadlock the run"""
+        producers = {key: agent for agent in self.agents for key in agent.produces}
+        depends_on = {
+            agent.name: {producers[key].name for key in agent.consumes + agent.reads if key in producers}
+            for agent in self.agents
+        }
+        
+        # Kahn's algorithm: repeatedly remove agents whose dependencies are all resolved
+        resolved = set()
+        remaining = dict(depends_on)
+        while remaining:
+            ready = [name for name, deps in remaining.items() if deps <= resolved]
+            if not ready:
+                raise ValueError(f"Agent dependency cycle between: {sorted(remaining)}")
+            for name in ready:
+                resolved.add(name)
+                del remaining[name]
         
-        context.update(results)
-        return context
\ No newline at end of file
+        return producers
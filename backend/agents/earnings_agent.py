@@ -1,77 +1,90 @@
-import yfinance as yf
 import pandas as pd
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 from datetime import datetime, timedelta
 import asyncio
 import requests
 from .base_agent import BaseAgent
+from services.market_data import get_market_data_client
+from services.http_client import get_http_client
+from services.news_extraction import extract_calendar_symbols
+from services.symbol_index import get_symbol_index
+from services.scoring import get_scoring_engine, whole_points
 
 class EarningsAgent(BaseAgent):
     """Agent responsible for earnings calendar and fundamental analysis"""
     
+    produces = ("earnings_analysis",)
+    # The watchlist is seeded from trending stocks, so wait for web search first
+    consumes = ("web_search_results",)
+    soft_deadline = 0.6
+    hard_deadline = 0.75
+    
+    # ticker.info field groups the analyses read
+    ANALYSIS_GROUPS = ("earnings", "fundamentals", "analyst")
+    
     def __init__(self):
         super().__init__("EarningsAgent", "Analyzes earnings calendar and fundamental metrics")
+        self.market_data = get_market_data_client()
+        self.symbol_index = get_symbol_index()
+        self.scoring = get_scoring_engine()
         
         # Dynamic earnings watchlist - no hardcoded stocks!
         
-    async def _get_earnings_watchlist(self, context: Dict[str, Any] = None) -> List[str]:
-        """Get dynamic watchlist from other agents or market discovery"""
+    async def _plan_run(self, context: Dict[str, Any]) -> Tuple[List[str], Dict[str, Dict[str, Any]]]:
+        """Build this run's watchlist and fetch everything the analyses read in one batch
+        
+        Returns the watchlist and each watchlist symbol's ``ticker.info``. The
+        batch is fetched under the analysis field group with the shortest TTL,
+        so one payload per symbol is fresh enough for every analysis.
+        """
         try:
-            watchlist = []
-            
-            # Method 1: Use stocks discovered by other agents
-            if context:
-                # Get stocks from market analysis agent
-                market_data = context.get("market_analysis", {})
-                momentum_stocks = market_data.get("momentum_stocks", [])
-                if momentum_stocks:
-                    watchlist.extend([stock.get("symbol") for stock in momentum_stocks if stock.get("symbol")])
-                    self.log_info(f"Using {len(momentum_stocks)} stocks from market analysis agent")
-                
-                # Get stocks from web search agent
-                web_data = context.get("web_search_results", {})
-                trending_stocks = web_data.get("trending_stocks", [])
-                if trending_stocks:
-                    watchlist.extend(trending_stocks)
-                    self.log_info(f"Using {len(trending_stocks)} stocks from web search agent")
-            
-            # Method 2: Independent discovery if needed
-            if len(watchlist) < 5:
-                self.log_info("Performing independent earnings watchlist discovery...")
-                discovered = await self._discover_earnings_candidates()
-                watchlist.extend(discovered)
+            candidates = await self._get_watchlist_candidates(context)
             
-            # Remove duplicates and filter by market cap
-            unique_watchlist = []
-            seen = set()
+            ttls = self.market_data.reference_data.ttls
+            group = min(self.ANALYSIS_GROUPS, key=lambda name: ttls.get(name, ttls["quote"]))
+            infos = await self.market_data.info_many(candidates, group)
             
-            for symbol in watchlist:
-                if symbol and symbol not in seen:
-                    try:
-                        ticker = yf.Ticker(symbol)
-                        info = ticker.info
-                        market_cap = info.get("marketCap", 0)
-                        
-                        # Only include large-cap stocks (>5B market cap) for earnings analysis
-                        if market_cap > 5_000_000_000:
-                            unique_watchlist.append(symbol)
-                            seen.add(symbol)
-                            
-                    except Exception:
-                        continue
-            
-            final_watchlist = unique_watchlist[:15]  # Limit to 15 stocks
+            # Only include large-cap stocks (>5B market cap) for earnings analysis
+            watchlist = [symbol for symbol in candidates
+                         if (infos.get(symbol, {}).get("marketCap") or 0) > 5_000_000_000][:15]  # Limit to 15 stocks
             
-            if final_watchlist:
-                self.log_info(f"Earnings analysis will track {len(final_watchlist)} stocks: {final_watchlist}")
-                return final_watchlist
+            if watchlist:
+                self.log_info(f"Earnings analysis will track {len(watchlist)} stocks: {watchlist}")
             else:
                 self.log_warning("No stocks discovered for earnings analysis")
-                return []
-                
+            return watchlist, {symbol: infos[symbol] for symbol in watchlist}
+            
         except Exception as e:
             self.log_error(f"Error building earnings watchlist: {e}")
-            return []
+            return [], {}
+    
+    async def _get_watchlist_candidates(self, context: Dict[str, Any]) -> List[str]:
+        """Candidate symbols from other agents, topped up by independent discovery"""
+        watchlist = []
+        
+        # Method 1: Use stocks discovered by other agents
+        # Get stocks from market analysis agent
+        market_data = context.get("market_analysis", {})
+        momentum_stocks = market_data.get("momentum_stocks", [])
+        if momentum_stocks:
+            watchlist.extend([stock.get("symbol") for stock in momentum_stocks if stock.get("symbol")])
+            self.log_info(f"Using {len(momentum_stocks)} stocks from market analysis agent")
+        
+        # Get stocks from web search agent
+        web_data = context.get("web_search_results", {})
+        trending_stocks = web_data.get("trending_stocks", [])
+        if trending_stocks:
+            watchlist.extend(trending_stocks)
+            self.log_info(f"Using {len(trending_stocks)} stocks from web search agent")
+        
+        # Method 2: Independent discovery if needed
+        if len(watchlist) < 5:
+            self.log_info("Performing independent earnings watchlist discovery...")
+            discovered = await self._discover_earnings_candidates()
+            watchlist.extend(discovered)
+        
+        # Remove duplicates and anything that is not a listed stock, keeping discovery order
+        return self.symbol_index.filter_listed(watchlist)
     
     async def _discover_earnings_candidates(self) -> List[str]:
         """Dynamically discover stocks with upcoming earnings using web research"""
@@ -102,42 +115,21 @@ class EarningsAgent(BaseAgent):
     async def _search_earnings_calendar(self) -> List[str]:
         """Search for stocks with upcoming earnings announcements"""
         try:
-            # Use financial websites to find upcoming earnings
-            import aiohttp
-            from bs4 import BeautifulSoup
-            
             earnings_stocks = []
             
-            # Try to scrape Yahoo Finance earnings calendar
-            async with aiohttp.ClientSession() as session:
-                try:
-                    url = "https://finance.yahoo.com/calendar/earnings"
-                    async with session.get(url, timeout=10) as response:
-                        if response.status == 200:
-                            html = await response.text()
-                            soup = BeautifulSoup(html, 'html.parser')
-                            
-                            # Look for ticker symbols in earnings calendar
-                            import re
-                            # Find potential ticker symbols (2-5 uppercase letters)
-                            text_content = soup.get_text()
-                            potential_tickers = re.findall(r'\b[A-Z]{2,5}\b', text_content)
-                            
-                            # Filter to reasonable tickers and validate
-                            for ticker in potential_tickers[:50]:  # Check first 50 found
-                                try:
-                                    # Quick validation
-                                    yf_ticker = yf.Ticker(ticker)
-                                    info = yf_ticker.info
-                                    if info.get('marketCap', 0) > 1_000_000_000:  # 1B+ market cap
-                                        earnings_stocks.append(ticker)
-                                        if len(earnings_stocks) >= 10:
-                                            break
-                                except:
-                                    continue
-                                    
-                except Exception as e:
-                    self.log_error(f"Error scraping earnings calendar: {e}")
+            # Try to scrape Yahoo Finance earnings calendar over the shared HTTP client
+            try:
+                url = "https://finance.yahoo.com/calendar/earnings"
+                potential_tickers = await get_http_client().get_parsed(url, extract_calendar_symbols)
+                
+                if potential_tickers:
+                    # Words that are not listed stocks (CEO, ETF, ...) are dropped locally
+                    candidates = self.symbol_index.filter_listed(potential_tickers)[:50]  # Check first 50 found
+                    large_caps = await self.symbol_index.select(candidates, min_market_cap=1_000_000_000)  # 1B+ market cap
+                    earnings_stocks = large_caps[:10]
+                                
+            except Exception as e:
+                self.log_error(f"Error scraping earnings calendar: {e}")
             
             self.log_info(f"Found {len(earnings_stocks)} stocks from earnings calendar search")
             return earnings_stocks
@@ -160,13 +152,13 @@ class EarningsAgent(BaseAgent):
             }
             
             strong_sectors = []
+            history = await self.market_data.download_history(sector_etfs.keys(), period="1mo")
             for etf, sector in sector_etfs.items():
                 try:
-                    ticker = yf.Ticker(etf)
-                    hist = ticker.history(period="1mo")
+                    hist = history.for_symbol(etf)
                     if len(hist) > 10:
                         # Calculate momentum
-                        momentum = (hist['Close'][-1] - hist['Close'][0]) / hist['Close'][0] * 100
+                        momentum = (hist['Close'].iloc[-1] - hist['Close'].iloc[0]) / hist['Close'].iloc[0] * 100
                         if momentum > 2:  # More than 2% gain in past month
                             strong_sectors.append(sector)
                 except:
@@ -198,17 +190,23 @@ class EarningsAgent(BaseAgent):
         self.log_info("Starting earnings and fundamental analysis")
         
         try:
+            # Build the watchlist and fetch its data once; the analyses below make no upstream calls
+            watchlist, infos = await self._plan_run(context)
+            
             # Get upcoming earnings
-            upcoming_earnings = await self._get_upcoming_earnings(context)
+            upcoming_earnings = self._get_upcoming_earnings(watchlist, infos)
+            self.save_partial(context, upcoming_earnings=upcoming_earnings)
             
             # Analyze fundamental metrics
-            fundamental_analysis = await self._analyze_fundamentals(context)
+            fundamental_analysis = self._analyze_fundamentals(watchlist, infos)
+            self.save_partial(context, fundamental_analysis=fundamental_analysis)
             
             # Identify earnings surprises potential
-            earnings_insights = await self._analyze_earnings_trends(context)
+            earnings_insights = self._analyze_earnings_trends(watchlist, infos)
+            self.save_partial(context, earnings_insights=earnings_insights)
             
             # Get analyst recommendations
-            analyst_data = await self._get_analyst_recommendations(context)
+            analyst_data = self._get_analyst_recommendations(watchlist, infos)
             
             result = {
                 "earnings_analysis": {
@@ -227,18 +225,16 @@ class EarningsAgent(BaseAgent):
             self.log_error(f"Earnings analysis failed: {str(e)}")
             return {"earnings_analysis_error": str(e)}
     
-    async def _get_upcoming_earnings(self, context: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _get_upcoming_earnings(self, watchlist: List[str], infos: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Get upcoming earnings dates for watchlist stocks"""
         upcoming_earnings = []
         current_date = datetime.now()
         
-        # Get dynamic watchlist using inter-agent communication
-        watchlist = await self._get_earnings_watchlist(context)
-        
         for symbol in watchlist:  # Analyze watchlist stocks
+            if symbol not in infos:
+                continue
             try:
-                ticker = yf.Ticker(symbol)
-                info = ticker.info
+                info = infos[symbol]
                 
                 # Get earnings date if available
                 earnings_date = info.get('earningsDate')
@@ -280,95 +276,46 @@ class EarningsAgent(BaseAgent):
         # Sort by earnings date
         return sorted(upcoming_earnings, key=lambda x: x['days_until_earnings'])
     
-    async def _analyze_fundamentals(self, context: Dict[str, Any]) -> Dict[str, Any]:
-        """Analyze fundamental metrics for top stocks"""
+    # Fundamental metrics scored by the "fundamentals" model, and the ticker.info field each comes from
+    FUNDAMENTAL_FIELDS = {
+        "pe_ratio": "trailingPE",
+        "peg_ratio": "pegRatio",
+        "price_to_book": "priceToBook",
+        "debt_to_equity": "debtToEquity",
+        "roe": "returnOnEquity",
+        "profit_margin": "profitMargins",
+        "revenue_growth": "revenueGrowth",
+    }
+    
+    def _analyze_fundamentals(self, watchlist: List[str], infos: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Analyze fundamental metrics for top stocks, scoring the whole watchlist in one pass"""
+        symbols = [symbol for symbol in watchlist if symbol in infos]
+        metrics = pd.DataFrame.from_records([infos[symbol] for symbol in symbols], index=symbols,
+                                            columns=list(self.FUNDAMENTAL_FIELDS.values()))
+        metrics.columns = list(self.FUNDAMENTAL_FIELDS)
+        scores = self.scoring.model("fundamentals").score(metrics)
+        
         fundamental_data = {}
         strong_fundamentals = []
-        
-        # Get dynamic watchlist using inter-agent communication
-        watchlist = await self._get_earnings_watchlist(context)
-        
-        for symbol in watchlist:  # Analyze subset for performance
-            try:
-                ticker = yf.Ticker(symbol)
-                info = ticker.info
-                
-                # Key fundamental metrics
-                pe_ratio = info.get('trailingPE')
-                peg_ratio = info.get('pegRatio')
-                price_to_book = info.get('priceToBook')
-                debt_to_equity = info.get('debtToEquity')
-                roe = info.get('returnOnEquity')
-                profit_margin = info.get('profitMargins')
-                revenue_growth = info.get('revenueGrowth')
-                
-                # Calculate fundamental score
-                score = 0
-                
-                # P/E ratio scoring (lower is better, but not too low)
-                if pe_ratio and 10 < pe_ratio < 25:
-                    score += 2
-                elif pe_ratio and 5 < pe_ratio <= 10:
-                    score += 1
-                
-                # PEG ratio scoring (lower is better)
-                if peg_ratio and peg_ratio < 1:
-                    score += 2
-                elif peg_ratio and peg_ratio < 1.5:
-                    score += 1
-                
-                # ROE scoring (higher is better)
-                if roe and roe > 0.15:
-                    score += 2
-                elif roe and roe > 0.10:
-                    score += 1
-                
-                # Profit margin scoring
-                if profit_margin and profit_margin > 0.15:
-                    score += 2
-                elif profit_margin and profit_margin > 0.10:
-                    score += 1
-                
-                # Revenue growth scoring
-                if revenue_growth and revenue_growth > 0.10:
-                    score += 2
-                elif revenue_growth and revenue_growth > 0.05:
-                    score += 1
-                
-                # Debt-to-equity scoring (lower is better)
-                if debt_to_equity and debt_to_equity < 0.3:
-                    score += 1
-                elif debt_to_equity and debt_to_equity < 0.5:
-                    score += 0.5
-                
-                fundamental_data[symbol] = {
-                    "pe_ratio": pe_ratio,
-                    "peg_ratio": peg_ratio,
-                    "price_to_book": price_to_book,
-                    "debt_to_equity": debt_to_equity,
-                    "roe": roe,
-                    "profit_margin": profit_margin,
-                    "revenue_growth": revenue_growth,
-                    "fundamental_score": score
-                }
-                
-                # Track stocks with strong fundamentals
-                if score >= 6:
-                    strong_fundamentals.append({
-                        "symbol": symbol,
-                        "score": score,
-                        "highlights": self._get_fundamental_highlights(fundamental_data[symbol])
-                    })
-                    
-            except Exception as e:
-                self.log_error(f"Failed to analyze fundamentals for {symbol}: {str(e)}")
+        for symbol, score in zip(symbols, scores.tolist()):
+            score = whole_points(score)
+            fundamental_data[symbol] = {name: infos[symbol].get(field) for name, field in self.FUNDAMENTAL_FIELDS.items()}
+            fundamental_data[symbol]["fundamental_score"] = score
+            
+            # Track stocks with strong fundamentals
+            if score >= 6:
+                strong_fundamentals.append({
+                    "symbol": symbol,
+                    "score": score,
+                    "highlights": self._get_fundamental_highlights(fundamental_data[symbol])
+                })
         
         return {
             "detailed_fundamentals": fundamental_data,
             "strong_fundamental_stocks": sorted(strong_fundamentals, key=lambda x: x['score'], reverse=True)[:10]
         }
     
-    async def _analyze_earnings_trends(self, context: Dict[str, Any]) -> Dict[str, Any]:
+    def _analyze_earnings_trends(self, watchlist: List[str], infos: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
         """Analyze earnings trends and surprises"""
         earnings_insights = {
             "positive_guidance_stocks": [],
@@ -376,13 +323,11 @@ class EarningsAgent(BaseAgent):
             "high_earnings_growth": []
         }
         
-        # Get dynamic watchlist using inter-agent communication
-        watchlist = await self._get_earnings_watchlist(context)
-        
         for symbol in watchlist[:10]:  # Analyze subset
+            if symbol not in infos:
+                continue
             try:
-                ticker = yf.Ticker(symbol)
-                info = ticker.info
+                info = infos[symbol]
                 
                 # Earnings growth metrics
                 earnings_growth = info.get('earningsGrowth')
@@ -400,7 +345,7 @@ class EarningsAgent(BaseAgent):
         
         return earnings_insights
     
-    async def _get_analyst_recommendations(self, context: Dict[str, Any]) -> Dict[str, Any]:
+    def _get_analyst_recommendations(self, watchlist: List[str], infos: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
         """Get analyst recommendations and price targets"""
         analyst_data = {
             "strong_buy_stocks": [],
@@ -408,13 +353,11 @@ class EarningsAgent(BaseAgent):
             "upgraded_stocks": []
         }
         
-        # Get dynamic watchlist using inter-agent communication
-        watchlist = await self._get_earnings_watchlist(context)
-        
         for symbol in watchlist:
+            if symbol not in infos:
+                continue
             try:
-                ticker = yf.Ticker(symbol)
-                info = ticker.info
+                info = infos[symbol]
                 
                 # Get recommendation data
                 recommendation = info.get('recommendationKey', '')
@@ -1,16 +1,32 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
 import asyncio
 from .base_agent import BaseAgent
+from services.market_data import HistoryBatch, get_market_data_client
+from services.symbol_index import get_symbol_index
+from services import indicators
+from services.screener import get_screener
+from services.indicator_state import get_indicator_state_store
 
 class MarketAnalysisAgent(BaseAgent):
     """Agent responsible for market trend analysis and technical indicators"""
     
+    produces = ("market_analysis",)
+    # Only momentum screening needs trending stocks; macro analysis starts immediately
+    reads = ("web_search_results",)
+    soft_deadline = 0.6
+    hard_deadline = 0.75
+    
     def __init__(self):
         super().__init__("MarketAnalysisAgent", "Analyzes market trends and technical indicators")
+        self.market_data = get_market_data_client()
+        self.symbol_index = get_symbol_index()
+        # Universe-wide momentum and volume screens, refreshed in the background
+        self.screener = get_screener()
+        # Momentum indicators carried between runs, so a re-run only applies the latest bars
+        self.indicator_states = get_indicator_state_store()
         
         # Market indices to analyze
         self.market_indices = ["^GSPC", "^DJI", "^IXIC", "^RUT"]  # S&P 500, Dow, NASDAQ, Russell 2000
@@ -77,16 +93,15 @@ class MarketAnalysisAgent(BaseAgent):
             # Method: Get real active stocks from sector analysis
             sector_candidates = await self._get_sector_active_stocks()
             
-            # Validate each candidate
-            for symbol in sector_candidates:
+            # Market caps come from the local symbol index; volume from one batched download
+            listed = await self.symbol_index.select(sector_candidates, min_market_cap=500_000_000)  # 500M+ market cap
+            candidate_history = await self.market_data.download_history(listed, period="5d")
+            for symbol in listed:
                 try:
-                    ticker = yf.Ticker(symbol)
-                    hist = ticker.history(period="5d")
-                    info = ticker.info
+                    hist = candidate_history.for_symbol(symbol)
                     
                     if (len(hist) > 1 and 
-                        info.get('marketCap', 0) > 500_000_000 and  # 500M+ market cap
-                        hist['Volume'][-1] > 50_000):  # Minimum volume threshold
+                        hist['Volume'].iloc[-1] > 50_000):  # Minimum volume threshold
                         
                         discovered.append(symbol)
                         
@@ -128,10 +143,9 @@ class MarketAnalysisAgent(BaseAgent):
     async def _screen_by_volume_leaders(self) -> List[str]:
         """Screen for stocks with unusual volume activity"""
         try:
-            # This would require a stock screener API or real-time data feed
-            # For now, return empty to force pure discovery
-            self.log_info("Volume screening requires real-time market data feed")
-            return []
+            leaders = self.screener.volume_leaders(limit=10)
+            self.log_info(f"Volume screening found {len(leaders)} stocks")
+            return leaders
         except Exception as e:
             self.log_error(f"Volume screening failed: {e}")
             return []
@@ -139,10 +153,9 @@ class MarketAnalysisAgent(BaseAgent):
     async def _screen_by_momentum(self) -> List[str]:
         """Screen for stocks with strong technical momentum"""
         try:
-            # This would require technical analysis across the market
-            # For now, return empty to force discovery from other sources
-            self.log_info("Momentum screening requires broad market technical analysis")
-            return []
+            leaders = self.screener.momentum(limit=10)
+            self.log_info(f"Momentum screening found {len(leaders)} stocks")
+            return leaders
         except Exception as e:
             self.log_error(f"Momentum screening failed: {e}")
             return []
@@ -163,31 +176,32 @@ class MarketAnalysisAgent(BaseAgent):
         self.log_info("Starting market trend analysis")
         
         try:
-            # Analyze market indices
-            market_trends = await self._analyze_market_indices()
-            
-            # Analyze sector performance
-            sector_analysis = await self._analyze_sector_performance()
+            # Index, sector, VIX and volume analysis need nothing from other agents
+            macro_task = asyncio.create_task(self._analyze_macro(context))
             
-            # Calculate volatility metrics
-            volatility_metrics = await self._calculate_volatility_metrics()
-            
-            # Identify momentum stocks
-            momentum_stocks = await self._identify_momentum_stocks(context)
-            
-            # Analyze volume patterns
-            volume_analysis = await self._analyze_volume_patterns()
-            
-            result = {
-                "market_analysis": {
-                    "market_trends": market_trends,
-                    "sector_analysis": sector_analysis,
-                    "volatility_metrics": volatility_metrics,
-                    "momentum_stocks": momentum_stocks,
-                    "volume_analysis": volume_analysis,
-                    "analysis_timestamp": datetime.now().isoformat()
+            try:
+                # Momentum screening starts once the web search agent has found trending stocks
+                await self.wait_for(context, "web_search_results")
+                active_stocks = await self._get_active_stocks(context)
+                momentum_stocks = await self._identify_momentum_stocks(active_stocks)
+                self.save_partial(context, momentum_stocks=momentum_stocks)
+                
+                market_trends, sector_analysis, volatility_metrics, volume_analysis = await macro_task
+                
+                result = {
+                    "market_analysis": {
+                        "market_trends": market_trends,
+                        "sector_analysis": sector_analysis,
+                        "volatility_metrics": volatility_metrics,
+                        "momentum_stocks": momentum_stocks,
+                        "volume_analysis": volume_analysis,
+                        "analysis_timestamp": datetime.now().isoformat()
+                    }
                 }
-            }
+            finally:
+                # Don't leave the macro analysis running when momentum screening fails or is cancelled
+                if not macro_task.done():
+                    macro_task.cancel()
             
             self.log_info("Market analysis completed successfully")
             return result
@@ -196,23 +210,42 @@ class MarketAnalysisAgent(BaseAgent):
             self.log_error(f"Market analysis failed: {str(e)}")
             return {"market_analysis_error": str(e)}
     
-    async def _analyze_market_indices(self) -> Dict[str, Any]:
+    async def _analyze_macro(self, context: Dict[str, Any]):
+        """Analyze indices, sectors, volatility and volume from one batch of index/ETF history"""
+        history = await self._load_history(self.market_indices + list(self.sector_etfs.values()) + ["^VIX", "SPY"])
+        market_trends = await self._analyze_market_indices(history)
+        sector_analysis = await self._analyze_sector_performance(history)
+        volatility_metrics = await self._calculate_volatility_metrics(history)
+        volume_analysis = await self._analyze_volume_patterns(history)
+        
+        self.save_partial(context, market_trends=market_trends, sector_analysis=sector_analysis,
+                          volatility_metrics=volatility_metrics, volume_analysis=volume_analysis)
+        return market_trends, sector_analysis, volatility_metrics, volume_analysis
+    
+    async def _load_history(self, symbols: List[str], period: str = "3mo") -> HistoryBatch:
+        """Download history (3 months by default) for many symbols in a single batch"""
+        try:
+            return await self.market_data.download_history(symbols, period=period)
+        except Exception as e:
+            self.log_error(f"Bulk history download failed: {str(e)}")
+            return HistoryBatch(pd.DataFrame())
+    
+    async def _analyze_market_indices(self, history: HistoryBatch) -> Dict[str, Any]:
         """Analyze major market indices"""
         indices_data = {}
         
         for index in self.market_indices:
             try:
-                ticker = yf.Ticker(index)
-                hist = ticker.history(period="3mo")
+                hist = history.for_symbol(index, period="3mo")
                 
                 if not hist.empty:
-                    current_price = hist['Close'][-1]
-                    prev_close = hist['Close'][-2]
+                    current_price = hist['Close'].iloc[-1]
+                    prev_close = hist['Close'].iloc[-2]
                     change_pct = ((current_price - prev_close) / prev_close) * 100
                     
                     # Calculate technical indicators
-                    sma_20 = hist['Close'].rolling(window=20).mean().iloc[-1]
-                    sma_50 = hist['Close'].rolling(window=50).mean().iloc[-1]
+                    sma_20 = indicators.sma(hist['Close'], 20)[-1]
+                    sma_50 = indicators.sma(hist['Close'], 50)[-1]
                     
                     # RSI calculation
                     rsi = self._calculate_rsi(hist['Close'], 14)
@@ -231,24 +264,24 @@ class MarketAnalysisAgent(BaseAgent):
         
         return indices_data
     
-    async def _analyze_sector_performance(self) -> Dict[str, Any]:
+    async def _analyze_sector_performance(self, history: HistoryBatch) -> Dict[str, Any]:
         """Analyze sector performance using sector ETFs"""
         sector_data = {}
         
         for sector_name, etf_symbol in self.sector_etfs.items():
             try:
-                ticker = yf.Ticker(etf_symbol)
-                hist = ticker.history(period="1mo")
+                hist = history.for_symbol(etf_symbol, period="1mo")
                 
                 if not hist.empty:
-                    month_return = ((hist['Close'][-1] - hist['Close'][0]) / hist['Close'][0]) * 100
-                    week_return = ((hist['Close'][-1] - hist['Close'][-5]) / hist['Close'][-5]) * 100
+                    close = hist['Close']
+                    month_return = ((close.iloc[-1] - close.iloc[0]) / close.iloc[0]) * 100
+                    week_return = ((close.iloc[-1] - close.iloc[-5]) / close.iloc[-5]) * 100
                     
                     sector_data[sector_name] = {
                         "symbol": etf_symbol,
                         "month_return": float(month_return),
                         "week_return": float(week_return),
-                        "current_price": float(hist['Close'][-1])
+                        "current_price": float(close.iloc[-1])
                     }
                     
             except Exception as e:
@@ -263,15 +296,14 @@ class MarketAnalysisAgent(BaseAgent):
             "worst_performing_sectors": [sector[0] for sector in sorted_sectors[-3:]]
         }
     
-    async def _calculate_volatility_metrics(self) -> Dict[str, Any]:
+    async def _calculate_volatility_metrics(self, history: HistoryBatch) -> Dict[str, Any]:
         """Calculate market volatility metrics"""
         try:
             # Use VIX as primary volatility measure
-            vix = yf.Ticker("^VIX")
-            vix_hist = vix.history(period="1mo")
+            vix_hist = history.for_symbol("^VIX", period="1mo")
             
             if not vix_hist.empty:
-                current_vix = float(vix_hist['Close'][-1])
+                current_vix = float(vix_hist['Close'].iloc[-1])
                 avg_vix = float(vix_hist['Close'].mean())
                 
                 volatility_level = "low" if current_vix < 20 else "high" if current_vix > 30 else "moderate"
@@ -288,71 +320,53 @@ class MarketAnalysisAgent(BaseAgent):
         
         return {"volatility_level": "moderate"}
     
-    async def _identify_momentum_stocks(self, context: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Identify stocks with strong momentum"""
-        momentum_stocks = []
+    async def _identify_momentum_stocks(self, active_stocks: List[str]) -> List[Dict[str, Any]]:
+        """Identify stocks with strong momentum
         
-        # Get active stocks dynamically using inter-agent communication
-        active_stocks = await self._get_active_stocks(context)
+        Symbols scored on an earlier run only download the last few sessions,
+        which advance their stored indicators bar by bar; new symbols (or ones
+        with a gap) are seeded from 3 months of history.
+        """
+        try:
+            known = [symbol for symbol in active_stocks if symbol in self.indicator_states]
+            recent = await self._load_history(known, period="5d") if known else HistoryBatch(pd.DataFrame())
+            unseeded = self.indicator_states.advance(recent, active_stocks)
+            if unseeded:
+                self.indicator_states.seed(await self._load_history(unseeded))
+            self.log_info(f"Momentum state advanced for {len(active_stocks) - len(unseeded)} stocks, "
+                          f"seeded for {len(unseeded)}")
+        except Exception as e:
+            self.log_error(f"Failed to update momentum indicators: {str(e)}")
+            return []
         
-        for symbol in active_stocks:  # Analyze active stocks for performance
-            try:
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(period="2mo")
-                
-                if len(hist) >= 50:
-                    # Calculate momentum indicators
-                    current_price = hist['Close'][-1]
-                    sma_20 = hist['Close'].rolling(window=20).mean().iloc[-1]
-                    sma_50 = hist['Close'].rolling(window=50).mean().iloc[-1]
-                    
-                    # Price momentum (20-day return)
-                    price_momentum = ((current_price - hist['Close'][-20]) / hist['Close'][-20]) * 100
-                    
-                    # Volume momentum
-                    avg_volume = hist['Volume'].rolling(window=20).mean().iloc[-1]
-                    recent_volume = hist['Volume'][-5:].mean()
-                    volume_ratio = recent_volume / avg_volume
-                    
-                    # RSI
-                    rsi = self._calculate_rsi(hist['Close'], 14)
-                    
-                    momentum_score = 0
-                    if current_price > sma_20 > sma_50:
-                        momentum_score += 2
-                    if price_momentum > 5:
-                        momentum_score += 2
-                    if volume_ratio > 1.2:
-                        momentum_score += 1
-                    if 40 < rsi < 70:  # Not overbought/oversold
-                        momentum_score += 1
-                    
-                    if momentum_score >= 3:
-                        momentum_stocks.append({
-                            "symbol": symbol,
-                            "momentum_score": momentum_score,
-                            "price_momentum": float(price_momentum),
-                            "volume_ratio": float(volume_ratio),
-                            "rsi": float(rsi),
-                            "current_price": float(current_price)
-                        })
-                        
-            except Exception as e:
-                self.log_error(f"Failed to analyze momentum for {symbol}: {str(e)}")
+        momentum_stocks = []
+        for symbol in active_stocks:
+            state = self.indicator_states.get(symbol)
+            if state is None:
+                continue
+            features = state.features()
+            if features["momentum_score"] >= 3:
+                momentum_stocks.append({
+                    "symbol": symbol,
+                    "momentum_score": features["momentum_score"],
+                    "price_momentum": float(features["price_momentum"]),
+                    "volume_ratio": float(features["volume_ratio"]),
+                    "rsi": float(features["rsi"]),
+                    "current_price": float(features["current_price"])
+                })
         
         # Sort by momentum score
         return sorted(momentum_stocks, key=lambda x: x['momentum_score'], reverse=True)[:10]
     
-    async def _analyze_volume_patterns(self) -> Dict[str, Any]:
+    async def _analyze_volume_patterns(self, history: HistoryBatch) -> Dict[str, Any]:
         """Analyze market volume patterns"""
         try:
             # Analyze SPY volume as market proxy
-            spy = yf.Ticker("SPY")
-            hist = spy.history(period="1mo")
+            hist = history.for_symbol("SPY", period="1mo")
             
             if not hist.empty:
                 avg_volume = hist['Volume'].mean()
-                recent_volume = hist['Volume'][-5:].mean()
+                recent_volume = hist['Volume'].iloc[-5:].mean()
                 volume_trend = "increasing" if recent_volume > avg_volume * 1.1 else "decreasing" if recent_volume < avg_volume * 0.9 else "stable"
                 
                 return {
@@ -370,11 +384,6 @@ class MarketAnalysisAgent(BaseAgent):
     def _calculate_rsi(self, prices: pd.Series, period: int = 14) -> float:
         """Calculate Relative Strength Index"""
         try:
-            delta = prices.diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-            rs = gain / loss
-            rsi = 100 - (100 / (1 + rs))
-            return float(rsi.iloc[-1])
+            return float(indicators.rsi(prices, period)[-1])
         except:
             return 50.0  # Neutral RSI if calculation fails
\ No newline at end of file
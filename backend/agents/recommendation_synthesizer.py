@@ -1,16 +1,48 @@
-import yfinance as yf
 from typing import Dict, Any, List
 from datetime import datetime
 import asyncio
 import json
+import time
+import pandas as pd
 from .base_agent import BaseAgent
+from services.market_data import get_market_data_client
+from services.symbol_index import get_symbol_index
+from services.llm import chat_completion, strip_code_fence
+from services.metrics import REASONING_SECONDS
+from services.reasoning_store import ReasoningStore
+from services.scoring import get_scoring_engine
 
 class RecommendationSynthesizer(BaseAgent):
     """Main agent that synthesizes all information into stock recommendations"""
     
-    def __init__(self, openai_client=None):
+    produces = ("stock_recommendations",)
+    consumes = ("web_search_results", "market_analysis", "earnings_analysis")
+    # Runs last, so it may use almost the whole request budget
+    soft_deadline = 0.85
+    hard_deadline = 1.0
+    
+    # How per-stock AI reasoning is generated: one call at a time, a bounded
+    # fan-out of per-stock calls, or a single call returning JSON for all stocks
+    REASONING_STRATEGIES = ("sequential", "concurrent", "batched")
+    # "eager" reasons about every stock before returning; "lazy" returns the
+    # ranking with reasoning_status "pending" and reasons per symbol on request
+    REASONING_MODES = ("eager", "lazy")
+    
+    def __init__(self, openai_client=None, reasoning_strategy: str = "concurrent", reasoning_concurrency: int = 4,
+                 reasoning_mode: str = "eager", reasoning_store: ReasoningStore = None):
         super().__init__("RecommendationSynthesizer", "Synthesizes all agent data into stock recommendations")
+        if reasoning_strategy not in self.REASONING_STRATEGIES:
+            raise ValueError(f"Unknown reasoning strategy: {reasoning_strategy}")
+        if reasoning_mode not in self.REASONING_MODES:
+            raise ValueError(f"Unknown reasoning mode: {reasoning_mode}")
         self.openai_client = openai_client
+        self.reasoning_strategy = reasoning_strategy
+        self.reasoning_concurrency = reasoning_concurrency
+        self.reasoning_mode = reasoning_mode
+        self.reasoning_store = reasoning_store or ReasoningStore()
+        self.market_data = get_market_data_client()
+        self.symbol_index = get_symbol_index()
+        self.scoring = get_scoring_engine()
         
         # Dynamic stock discovery - no hardcoded lists!
         
@@ -40,27 +72,33 @@ class RecommendationSynthesizer(BaseAgent):
             # Get stocks by analyzing market index behavior and common patterns
             trending_candidates = await self._get_real_market_stocks()
             
-            for symbol in trending_candidates:
+            # Validate this is a real, listed stock with a 1B+ market cap against the local symbol index
+            listed = await self.symbol_index.select(trending_candidates, min_market_cap=1_000_000_000)
+            candidate_history = await self.market_data.download_history(listed, period="5d")
+            
+            for symbol in listed:
                 try:
-                    ticker = yf.Ticker(symbol)
-                    hist = ticker.history(period="5d")
-                    info = ticker.info
+                    hist = candidate_history.for_symbol(symbol)
+                    record = self.symbol_index.get(symbol)
                     
-                    # Validate this is a real, active stock
                     if (len(hist) > 1 and 
-                        info.get('marketCap', 0) > 1_000_000_000 and  # 1B+ market cap
-                        hist['Volume'][-1] > 100_000):  # Minimum daily volume
+                        hist['Volume'].iloc[-1] > 100_000):  # Minimum daily volume
                         
                         # Calculate activity metrics
-                        momentum = (hist['Close'][-1] - hist['Close'][-2]) / hist['Close'][-2] * 100
-                        volume_ratio = hist['Volume'][-1] / hist['Volume'].mean() if hist['Volume'].mean() > 0 else 1
+                        momentum = (hist['Close'].iloc[-1] - hist['Close'].iloc[-2]) / hist['Close'].iloc[-2] * 100
+                        volume_ratio = hist['Volume'].iloc[-1] / hist['Volume'].mean() if hist['Volume'].mean() > 0 else 1
+                        
+                        # Not every symbol has been enriched yet; the info payload is cached after select()
+                        market_cap = record.market_cap if record else None
+                        if not market_cap:
+                            market_cap = (await self.market_data.info(symbol, "profile")).get('marketCap')
                         
                         active_stocks.append({
                             'symbol': symbol,
                             'momentum': abs(momentum),  # Use absolute momentum for activity
                             'volume_ratio': volume_ratio,
-                            'market_cap': info.get('marketCap', 0),
-                            'volume': hist['Volume'][-1]
+                            'market_cap': market_cap or 0,
+                            'volume': hist['Volume'].iloc[-1]
                         })
                         
                 except Exception:
@@ -90,11 +128,16 @@ class RecommendationSynthesizer(BaseAgent):
             # Method 1: Extract holdings from major ETFs (real companies)
             major_etfs = ["SPY", "QQQ", "IWM", "VTI", "XLK", "XLF", "XLV"]
             
+            # Get basic info to ensure each ETF is active
+            etf_infos = await self.market_data.fan_out(
+                lambda etf_symbol: self.market_data.info(etf_symbol, "profile"), major_etfs
+            )
+            
             for etf_symbol in major_etfs:
                 try:
-                    etf_ticker = yf.Ticker(etf_symbol)
-                    # Get basic info to ensure ETF is active
-                    etf_info = etf_ticker.info
+                    etf_info = etf_infos[etf_symbol]
+                    if isinstance(etf_info, Exception):
+                        raise etf_info
                     if etf_info.get('totalAssets', 0) > 1_000_000_000:  # 1B+ in assets
                         # Note: yfinance doesn't provide holdings data directly
                         # So we'll use a different approach
@@ -155,11 +198,24 @@ class RecommendationSynthesizer(BaseAgent):
             # Get top recommendations
             top_recommendations = await self._select_top_stocks(stock_scores, web_data, market_data, earnings_data)
             
-            # Generate AI reasoning for each recommendation
-            ai_reasoning = await self._generate_ai_reasoning(top_recommendations, web_data, market_data, earnings_data)
-            
-            # Create final recommendation list
-            final_recommendations = await self._create_final_recommendations(top_recommendations, ai_reasoning)
+            if self.reasoning_mode == "lazy":
+                # Return the ranking now; reasoning is generated when a symbol is requested
+                context_summary = self._create_analysis_context(web_data, market_data, earnings_data)
+                for stock in top_recommendations:
+                    self.reasoning_store.register(stock, context_summary)
+                ai_reasoning = None
+                final_recommendations = await self._create_final_recommendations(top_recommendations, {}, pending=True)
+            else:
+                # If reasoning overruns, the ranked list still goes out with the default reasoning
+                self.save_partial(context, recommendations=await self._create_final_recommendations(top_recommendations, {}),
+                                  market_context=self._create_market_context(web_data, market_data))
+                
+                # Generate AI reasoning for each recommendation
+                ai_reasoning = await self._generate_ai_reasoning(top_recommendations, web_data, market_data, earnings_data,
+                                                                 context)
+                
+                # Create final recommendation list
+                final_recommendations = await self._create_final_recommendations(top_recommendations, ai_reasoning)
             
             result = {
                 "stock_recommendations": {
@@ -170,6 +226,8 @@ class RecommendationSynthesizer(BaseAgent):
                     "disclaimer": "These recommendations are for informational purposes only and do not constitute financial advice."
                 }
             }
+            if ai_reasoning is not None and len(ai_reasoning) < len(top_recommendations):
+                result["stock_recommendations"]["partial"] = True
             
             self.log_info(f"Generated {len(final_recommendations)} stock recommendations")
             return result
@@ -180,8 +238,6 @@ class RecommendationSynthesizer(BaseAgent):
     
     async def _calculate_stock_scores(self, web_data: Dict, market_data: Dict, earnings_data: Dict) -> Dict[str, float]:
         """Calculate composite scores for stocks based on all available data"""
-        stock_scores = {}
-        
         # Get momentum stocks from market analysis
         momentum_stocks = market_data.get("momentum_stocks", [])
         momentum_symbols = {stock["symbol"]: stock["momentum_score"] for stock in momentum_stocks}
@@ -231,51 +287,30 @@ class RecommendationSynthesizer(BaseAgent):
             self.log_warning("No stocks discovered by any agent - check agent discovery methods")
             return {}
         
-        # Calculate scores for each discovered stock
-        for symbol in unique_stocks:
-            score = 0
-            
-            # Momentum score (0-4 points)
-            if symbol in momentum_symbols:
-                score += min(momentum_symbols[symbol], 4)
-            
-            # Fundamental score (0-6 points)
-            if symbol in fundamental_symbols:
-                score += min(fundamental_symbols[symbol], 6)
-            
-            # Analyst score (0-3 points based on upside potential)
-            if symbol in analyst_symbols:
-                upside = analyst_symbols[symbol]
-                if upside > 30:
-                    score += 3
-                elif upside > 20:
-                    score += 2
-                elif upside > 10:
-                    score += 1
-            
-            # Sector/trend boost (0-2 points)
-            try:
-                ticker = yf.Ticker(symbol)
-                info = ticker.info
-                sector = info.get("sector", "").lower()
-                
-                for topic in trending_topics:
-                    if any(keyword in topic.lower() for keyword in [sector, symbol.lower()]):
-                        score += 1
-                        break
-            except:
-                pass
-            
-            # Market sentiment boost/penalty (±1 point)
-            market_sentiment = web_data.get("market_sentiment", "neutral")
-            if market_sentiment == "bullish":
-                score += 1
-            elif market_sentiment == "bearish":
-                score -= 1
-            
-            stock_scores[symbol] = score
+        # Fetch sector data for every discovered stock concurrently
+        infos = await self.market_data.info_many(unique_stocks, "profile")
+        
+        # One row of scoring features per discovered stock
+        features = pd.DataFrame({
+            "momentum_score": [momentum_symbols.get(symbol) for symbol in unique_stocks],
+            "fundamental_score": [fundamental_symbols.get(symbol) for symbol in unique_stocks],
+            "analyst_upside": [analyst_symbols.get(symbol) for symbol in unique_stocks],
+            "trending_topic": [self._matches_trending_topic(symbol, infos.get(symbol), trending_topics)
+                               for symbol in unique_stocks],
+            "market_sentiment": web_data.get("market_sentiment", "neutral")
+        }, index=unique_stocks)
         
-        return stock_scores
+        # Momentum (0-4), fundamental (0-6), analyst upside (0-3), trend (0-1) and sentiment (±1) points
+        scores = self.scoring.model("composite").score(features)
+        return {symbol: float(score) for symbol, score in scores.items()}
+    
+    def _matches_trending_topic(self, symbol: str, info: Dict[str, Any], trending_topics: List[str]) -> bool:
+        """Whether any trending topic mentions the stock's sector or symbol"""
+        if info is None:
+            return False
+        sector = (info.get("sector") or "").lower()
+        keywords = [sector, symbol.lower()] if sector else [symbol.lower()]
+        return any(keyword in topic.lower() for topic in trending_topics for keyword in keywords)
     
     async def _select_top_stocks(self, stock_scores: Dict[str, float], web_data: Dict, market_data: Dict, earnings_data: Dict) -> List[Dict[str, Any]]:
         """Select top 10 stocks based on scores and additional criteria"""
@@ -283,6 +318,11 @@ class RecommendationSynthesizer(BaseAgent):
         # Sort stocks by score
         sorted_stocks = sorted(stock_scores.items(), key=lambda x: x[1], reverse=True)
         
+        # Fetch current data for every candidate above the threshold in one pass
+        candidates = [symbol for symbol, score in sorted_stocks if score >= 3]
+        infos = await self.market_data.info_many(candidates, "profile")
+        history = await self.market_data.download_history(candidates, period="1mo")
+        
         top_stocks = []
         sectors_included = set()
         
@@ -295,9 +335,8 @@ class RecommendationSynthesizer(BaseAgent):
             
             try:
                 # Get current stock data
-                ticker = yf.Ticker(symbol)
-                info = ticker.info
-                hist = ticker.history(period="1mo")
+                info = infos[symbol]
+                hist = history.for_symbol(symbol)
                 
                 if hist.empty:
                     continue
@@ -309,8 +348,8 @@ class RecommendationSynthesizer(BaseAgent):
                 if sector_count >= 2:
                     continue
                 
-                current_price = float(hist["Close"][-1])
-                month_change = ((current_price - hist["Close"][0]) / hist["Close"][0]) * 100
+                current_price = float(hist["Close"].iloc[-1])
+                month_change = ((current_price - hist["Close"].iloc[0]) / hist["Close"].iloc[0]) * 100
                 
                 stock_info = {
                     "symbol": symbol,
@@ -333,19 +372,113 @@ class RecommendationSynthesizer(BaseAgent):
         
         return top_stocks
     
-    async def _generate_ai_reasoning(self, top_stocks: List[Dict], web_data: Dict, market_data: Dict, earnings_data: Dict) -> Dict[str, str]:
-        """Generate AI reasoning for each stock recommendation"""
+    async def _generate_ai_reasoning(self, top_stocks: List[Dict], web_data: Dict, market_data: Dict, earnings_data: Dict,
+                                     context: Dict[str, Any] = None) -> Dict[str, str]:
+        """Generate AI reasoning for each stock recommendation using the configured strategy"""
         if not self.openai_client:
             return {stock["symbol"]: "AI reasoning not available" for stock in top_stocks}
-        
-        reasoning = {}
+        if not top_stocks:
+            return {}
         
         # Create context summary
         context_summary = self._create_analysis_context(web_data, market_data, earnings_data)
         
+        # Stocks not reasoned about before the soft deadline keep the default reasoning
+        timeout = self.time_remaining(context) if context is not None else None
+        
+        start = time.perf_counter()
+        if self.reasoning_strategy == "batched":
+            reasoning = await self._generate_reasoning_batched(top_stocks, context_summary, timeout)
+        elif self.reasoning_strategy == "concurrent":
+            reasoning = await self._generate_reasoning_concurrent(top_stocks, context_summary, timeout)
+        else:
+            reasoning = await self._generate_reasoning_sequential(top_stocks, context_summary, context)
+        elapsed = time.perf_counter() - start
+        
+        REASONING_SECONDS.observe(elapsed, strategy=self.reasoning_strategy)
+        self.log_info(f"Reasoning strategy={self.reasoning_strategy} stocks={len(top_stocks)} "
+                      f"generated={len(reasoning)} elapsed={elapsed:.2f}s")
+        return reasoning
+    
+    async def _generate_reasoning_sequential(self, top_stocks: List[Dict], context_summary: str,
+                                             context: Dict[str, Any] = None) -> Dict[str, str]:
+        """One completion per stock, one at a time"""
+        reasoning = {}
         for stock in top_stocks:
-            try:
-                stock_context = f"""
+            if context is not None and self.past_soft_deadline(context):
+                self.log_warning(f"Soft deadline reached; generated reasoning for {len(reasoning)} of {len(top_stocks)} stocks")
+                break
+            reasoning[stock["symbol"]] = await self.generate_stock_reasoning(stock, context_summary)
+        return reasoning
+    
+    async def _generate_reasoning_concurrent(self, top_stocks: List[Dict], context_summary: str,
+                                             timeout: float = None) -> Dict[str, str]:
+        """One completion per stock, at most ``reasoning_concurrency`` in flight"""
+        semaphore = asyncio.Semaphore(self.reasoning_concurrency)
+        
+        async def reason(stock: Dict) -> str:
+            async with semaphore:
+                return await self.generate_stock_reasoning(stock, context_summary)
+        
+        tasks = {stock["symbol"]: asyncio.create_task(reason(stock)) for stock in top_stocks}
+        _, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+        if pending:
+            self.log_warning(f"Soft deadline reached; cancelling reasoning for {len(pending)} of {len(top_stocks)} stocks")
+            for task in pending:
+                task.cancel()
+        
+        return {symbol: task.result() for symbol, task in tasks.items() if task not in pending}
+    
+    async def _generate_reasoning_batched(self, top_stocks: List[Dict], context_summary: str,
+                                          timeout: float = None) -> Dict[str, str]:
+        """A single completion returning reasoning for every stock as JSON keyed by symbol"""
+        stock_details = "\n".join(self._describe_stock(stock) for stock in top_stocks)
+        try:
+            # JSON mode needs a model that supports response_format, which the original gpt-4 does not
+            response = await asyncio.wait_for(chat_completion(
+                self.openai_client,
+                model="gpt-4-turbo",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are a financial analyst providing concise reasoning for stock recommendations. Respond only with a JSON object mapping each ticker symbol to 2-3 sentences highlighting key factors."
+                    },
+                    {
+                        "role": "user",
+                        "content": f"""Based on the following market analysis and stock data, explain why each stock is recommended:
+
+Market Context:
+{context_summary}
+
+Stocks:
+{stock_details}
+
+Return a JSON object such as {{"AAPL": "...", "MSFT": "..."}} with one entry per stock above."""
+                    }
+                ],
+                response_format={"type": "json_object"}
+            ), timeout)
+            parsed = json.loads(strip_code_fence(response))
+            if not isinstance(parsed, dict):
+                raise ValueError("expected a JSON object keyed by symbol")
+        except asyncio.TimeoutError:
+            self.log_warning("Soft deadline reached before batched reasoning returned")
+            return {}
+        except Exception as e:
+            self.log_error(f"Batched reasoning failed, using fallback reasoning: {str(e)}")
+            parsed = {}
+        
+        # Symbols the model skipped or answered with something other than text get the fallback
+        reasoning = {}
+        for stock in top_stocks:
+            text = parsed.get(stock["symbol"])
+            reasoning[stock["symbol"]] = text.strip() if isinstance(text, str) and text.strip() else \
+                self._fallback_reasoning(stock["symbol"])
+        return reasoning
+    
+    def _describe_stock(self, stock: Dict) -> str:
+        """Key facts about one stock for a reasoning prompt"""
+        return f"""
                 Stock: {stock['symbol']} ({stock['company_name']})
                 Sector: {stock['sector']}
                 Current Price: ${stock['current_price']:.2f}
@@ -353,42 +486,55 @@ class RecommendationSynthesizer(BaseAgent):
                 Composite Score: {stock['composite_score']:.1f}
                 P/E Ratio: {stock.get('pe_ratio', 'N/A')}
                 """
-                
-                response = await asyncio.to_thread(
-                    self.openai_client.chat.completions.create,
-                    model="gpt-4",
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are a financial analyst providing concise reasoning for stock recommendations. Keep responses to 2-3 sentences highlighting key factors."
-                        },
-                        {
-                            "role": "user",
-                            "content": f"""
-                            Based on the following market analysis and stock data, provide a brief reasoning for why {stock['symbol']} is recommended:
-                            
-                            Market Context:
-                            {context_summary}
-                            
-                            Stock Details:
-                            {stock_context}
-                            
-                            Provide 2-3 sentences explaining why this stock is attractive for investment.
-                            """
-                        }
-                    ]
-                )
-                
-                reasoning[stock["symbol"]] = response.choices[0].message.content.strip()
-                
-            except Exception as e:
-                self.log_error(f"Failed to generate reasoning for {stock['symbol']}: {str(e)}")
-                reasoning[stock["symbol"]] = f"Strong technical and fundamental indicators suggest {stock['symbol']} has attractive upside potential."
-        
-        return reasoning
     
-    async def _create_final_recommendations(self, top_stocks: List[Dict], ai_reasoning: Dict[str, str]) -> List[Dict[str, Any]]:
-        """Create final formatted recommendations"""
+    def _fallback_reasoning(self, symbol: str) -> str:
+        return f"Strong technical and fundamental indicators suggest {symbol} has attractive upside potential."
+    
+    def fallback_stock_reasoning(self, stock: Dict) -> str:
+        """Generic reasoning shown when generation fails"""
+        return self._fallback_reasoning(stock["symbol"])
+    
+    async def generate_stock_reasoning(self, stock: Dict, context_summary: str) -> str:
+        """Ask for 2-3 sentences of reasoning about a single stock, falling back to generic text on errors"""
+        try:
+            return await self.request_stock_reasoning(stock, context_summary)
+        except Exception as e:
+            self.log_error(f"Failed to generate reasoning for {stock['symbol']}: {str(e)}")
+            return self._fallback_reasoning(stock["symbol"])
+    
+    async def request_stock_reasoning(self, stock: Dict, context_summary: str) -> str:
+        """Ask for 2-3 sentences of reasoning about a single stock; API errors propagate"""
+        if not self.openai_client:
+            return "AI reasoning not available"
+        response = await chat_completion(
+            self.openai_client,
+            model="gpt-4",
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are a financial analyst providing concise reasoning for stock recommendations. Keep responses to 2-3 sentences highlighting key factors."
+                },
+                {
+                    "role": "user",
+                    "content": f"""
+                    Based on the following market analysis and stock data, provide a brief reasoning for why {stock['symbol']} is recommended:
+                    
+                    Market Context:
+                    {context_summary}
+                    
+                    Stock Details:
+                    {self._describe_stock(stock)}
+                    
+                    Provide 2-3 sentences explaining why this stock is attractive for investment.
+                    """
+                }
+            ]
+        )
+        return response.strip()
+    
+    async def _create_final_recommendations(self, top_stocks: List[Dict], ai_reasoning: Dict[str, str],
+                                            pending: bool = False) -> List[Dict[str, Any]]:
+        """Create final formatted recommendations; ``pending`` leaves reasoning to be fetched later"""
         recommendations = []
         
         for i, stock in enumerate(top_stocks, 1):
@@ -403,7 +549,8 @@ class RecommendationSynthesizer(BaseAgent):
                 "market_cap": stock["market_cap"],
                 "recommendation": stock["recommendation_strength"],
                 "ai_score": min(int(stock["composite_score"] * 10), 100),
-                "reasoning": ai_reasoning.get(stock["symbol"], "Strong fundamental and technical indicators."),
+                "reasoning": None if pending else ai_reasoning.get(stock["symbol"], "Strong fundamental and technical indicators."),
+                "reasoning_status": "pending" if pending else "ready",
                 "pe_ratio": stock.get("pe_ratio"),
                 "risk_level": self._assess_risk_level(stock)
             }
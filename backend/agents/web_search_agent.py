@@ -1,15 +1,22 @@
 import asyncio
-import aiohttp
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
 import json
-from bs4 import BeautifulSoup
 import re
 from .base_agent import BaseAgent
+from services.llm import chat_completion, strip_code_fence
+from services.http_client import get_http_client
+from services.news_extraction import extract_articles
+from services.symbol_index import get_symbol_index
 
 class WebSearchAgent(BaseAgent):
     """Agent responsible for searching the web and analyzing financial news"""
     
+    produces = ("web_search_results",)
+    # Everything downstream waits on trending stocks, so this agent gets the earliest deadlines
+    soft_deadline = 0.35
+    hard_deadline = 0.45
+    
     def __init__(self, openai_client=None):
         super().__init__("WebSearchAgent", "Searches web for financial news and market insights")
         self.openai_client = openai_client
@@ -54,17 +61,36 @@ class WebSearchAgent(BaseAgent):
                 news_articles = await self._create_fallback_news()
                 self.log_info(f"Using fallback news articles: {len(news_articles)}")
             
-            # Analyze sentiment and extract insights
-            market_sentiment = await self._analyze_market_sentiment(news_articles)
-            self.log_info(f"Market sentiment: {market_sentiment}")
+            self.save_partial(context, news_articles=news_articles[:10])
+            
+            # Sentiment, topics and trending stocks from a single structured completion
+            analysis = await self._analyze_news(news_articles)
             
-            # Extract trending topics
-            trending_topics = await self._extract_trending_topics(news_articles)
+            # Fields the combined call could not provide fall back to the per-field calls.
+            # Past the soft deadline only stock extraction is retried, since downstream agents need it
+            partial = False
+            if "market_sentiment" not in analysis or "trending_topics" not in analysis:
+                partial = self.past_soft_deadline(context)
+                if partial:
+                    self.log_warning("Soft deadline reached; skipping sentiment and topic analysis")
+                    analysis.setdefault("market_sentiment", "neutral")
+                    analysis.setdefault("trending_topics", [])
+            if "market_sentiment" not in analysis:
+                analysis["market_sentiment"] = await self._analyze_market_sentiment(news_articles)
+            if "trending_topics" not in analysis:
+                analysis["trending_topics"] = await self._extract_trending_topics(news_articles)
+            
+            market_sentiment = analysis["market_sentiment"]
+            trending_topics = analysis["trending_topics"]
+            self.log_info(f"Market sentiment: {market_sentiment}")
             self.log_info(f"Found {len(trending_topics)} trending topics: {trending_topics}")
+            self.save_partial(context, market_sentiment=market_sentiment, trending_topics=trending_topics)
             
             # CRITICAL: Extract actual stock mentions from news
-            self.log_info("Extracting trending stocks from news...")
-            trending_stocks = await self._extract_trending_stocks_from_news(news_articles)
+            if "trending_stocks" not in analysis:
+                self.log_info("Extracting trending stocks from news...")
+                analysis["trending_stocks"] = await self._extract_trending_stocks_from_news(news_articles)
+            trending_stocks = analysis["trending_stocks"]
             self.log_info(f"Extracted {len(trending_stocks)} trending stocks: {trending_stocks}")
             
             result = {
@@ -76,6 +102,8 @@ class WebSearchAgent(BaseAgent):
                     "analysis_timestamp": datetime.now().isoformat()
                 }
             }
+            if partial:
+                result["web_search_results"]["partial"] = True
             
             self.log_info(f"WebSearchAgent completed: {len(news_articles)} articles, {len(trending_stocks)} stocks, sentiment: {market_sentiment}")
             return result
@@ -85,55 +113,92 @@ class WebSearchAgent(BaseAgent):
             return {"web_search_error": str(e)}
     
     async def _search_financial_news(self) -> List[Dict[str, str]]:
-        """Search for recent financial news articles"""
-        articles = []
+        """Search for recent financial news articles
         
-        async with aiohttp.ClientSession() as session:
-            for source in self.news_sources:
-                try:
-                    articles.extend(await self._scrape_news_source(session, source))
-                except Exception as e:
-                    self.log_error(f"Failed to scrape {source}: {str(e)}")
+        Sources are fetched concurrently over the shared HTTP client; unchanged
+        pages come back as 304s and reuse the articles parsed last time.
+        """
+        results = await asyncio.gather(*(self._scrape_news_source(source) for source in self.news_sources))
         
-        # Sort by recency and relevance
-        return sorted(articles, key=lambda x: x.get('timestamp', ''), reverse=True)[:20]
+        # Keep source order so unchanged pages produce identical prompts
+        articles = [article for source_articles in results for article in source_articles]
+        return articles[:20]
     
-    async def _scrape_news_source(self, session: aiohttp.ClientSession, url: str) -> List[Dict[str, str]]:
+    async def _scrape_news_source(self, url: str) -> List[Dict[str, str]]:
         """Scrape news articles from a specific source"""
-        articles = []
-        
         try:
-            async with session.get(url, timeout=10) as response:
-                if response.status == 200:
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    # Extract articles based on common patterns
-                    article_elements = soup.find_all(['article', 'div'], class_=re.compile(r'(story|article|news|headline)'))
-                    
-                    for element in article_elements[:10]:  # Limit per source
-                        title_elem = element.find(['h1', 'h2', 'h3', 'a'])
-                        if title_elem:
-                            title = title_elem.get_text(strip=True)
-                            link = title_elem.get('href', '') if title_elem.name == 'a' else ''
-                            
-                            # Extract summary if available
-                            summary_elem = element.find(['p', 'div'], class_=re.compile(r'(summary|excerpt|description)'))
-                            summary = summary_elem.get_text(strip=True) if summary_elem else ""
-                            
-                            if title and len(title) > 10:
-                                articles.append({
-                                    'title': title,
-                                    'summary': summary,
-                                    'link': link,
-                                    'source': url,
-                                    'timestamp': datetime.now().isoformat()
-                                })
-        
+            articles = await get_http_client().get_parsed(url, lambda html: extract_articles(html, url),
+                                                          upstream="news")
+            return articles or []
         except Exception as e:
             self.log_error(f"Error scraping {url}: {str(e)}")
+            return []
+    
+    async def _analyze_news(self, articles: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Get sentiment, trending topics and trending stocks from one completion
+        
+        Returns only the fields that came back valid; the caller falls back to
+        the per-field calls for anything missing.
+        """
+        if not self.openai_client or not articles:
+            return {}
         
-        return articles
+        try:
+            news_content = "\n".join([
+                f"Title: {article['title']}\nSummary: {article.get('summary', '')}"
+                for article in articles[:20]
+            ])
+            
+            response = await chat_completion(
+                self.openai_client,
+                model="gpt-4",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": """You are a financial analyst reading recent financial news. Respond with ONLY a JSON object with these keys:
+                        "market_sentiment": one of "bullish", "bearish" or "neutral"
+                        "trending_topics": 5-10 key trending topics (sectors, companies, economic events, market themes) as strings
+                        "trending_stocks": 5-15 ticker symbols of publicly traded US companies mentioned in the news that are trending positively or have significant coverage (earnings beats, new deals, sector trends, analyst upgrades). Only include symbols you are confident are real, actively traded US stocks, prioritising large- and mid-caps."""
+                    },
+                    {
+                        "role": "user",
+                        "content": f"Analyze these financial news articles:\n\n{news_content}"
+                    }
+                ]
+            )
+            
+            payload = json.loads(strip_code_fence(response))
+            if not isinstance(payload, dict):
+                raise ValueError("expected a JSON object")
+            
+        except Exception as e:
+            self.log_warning(f"Combined news analysis failed, falling back to per-field calls: {str(e)}")
+            return {}
+        
+        analysis = {}
+        
+        sentiment = payload.get("market_sentiment")
+        if isinstance(sentiment, str) and sentiment.strip().lower() in ('bullish', 'bearish', 'neutral'):
+            analysis["market_sentiment"] = sentiment.strip().lower()
+        
+        topics = payload.get("trending_topics")
+        if isinstance(topics, list):
+            analysis["trending_topics"] = [topic.strip() for topic in topics if isinstance(topic, str) and topic.strip()][:10]
+        
+        stocks = payload.get("trending_stocks")
+        if isinstance(stocks, list):
+            analysis["trending_stocks"] = self._clean_tickers(stocks)
+        
+        missing = {"market_sentiment", "trending_topics", "trending_stocks"} - set(analysis)
+        if missing:
+            self.log_warning(f"Combined news analysis returned invalid {sorted(missing)}")
+        return analysis
+    
+    @staticmethod
+    def _clean_tickers(values: List[Any]) -> List[str]:
+        """Keep plausible, listed ticker strings, upper-cased, at most 15"""
+        plausible = [value for value in values if isinstance(value, str) and len(value) <= 5 and value.isalpha()]
+        return get_symbol_index().filter_listed(plausible, include_etfs=True)[:15]
     
     async def _analyze_market_sentiment(self, articles: List[Dict[str, str]]) -> str:
         """Analyze overall market sentiment from news articles"""
@@ -147,8 +212,8 @@ class WebSearchAgent(BaseAgent):
                 for article in articles[:10]
             ])
             
-            response = await asyncio.to_thread(
-                self.openai_client.chat.completions.create,
+            response = await chat_completion(
+                self.openai_client,
                 model="gpt-4",
                 messages=[
                     {
@@ -162,7 +227,7 @@ class WebSearchAgent(BaseAgent):
                 ]
             )
             
-            sentiment = response.choices[0].message.content.strip().lower()
+            sentiment = response.strip().lower()
             return sentiment if sentiment in ['bullish', 'bearish', 'neutral'] else 'neutral'
             
         except Exception as e:
@@ -178,8 +243,8 @@ class WebSearchAgent(BaseAgent):
             # Combine article titles
             titles_text = "\\n".join([article['title'] for article in articles[:15]])
             
-            response = await asyncio.to_thread(
-                self.openai_client.chat.completions.create,
+            response = await chat_completion(
+                self.openai_client,
                 model="gpt-4",
                 messages=[
                     {
@@ -193,7 +258,7 @@ class WebSearchAgent(BaseAgent):
                 ]
             )
             
-            topics_text = response.choices[0].message.content.strip()
+            topics_text = response.strip()
             
             # Try to parse as JSON
             try:
@@ -220,8 +285,8 @@ class WebSearchAgent(BaseAgent):
                 for article in articles[:20]  # Use more articles for stock discovery
             ])
             
-            response = await asyncio.to_thread(
-                self.openai_client.chat.completions.create,
+            response = await chat_completion(
+                self.openai_client,
                 model="gpt-4",
                 messages=[
                     {
@@ -244,20 +309,17 @@ Return a JSON array of 5-15 ticker symbols for companies mentioned in these arti
                 ]
             )
             
-            stocks_text = response.choices[0].message.content.strip()
+            stocks_text = response.strip()
             
             # Parse the response
             try:
                 stocks = json.loads(stocks_text)
                 if isinstance(stocks, list):
                     # Filter out any non-string values and clean up
-                    clean_stocks = []
-                    for stock in stocks:
-                        if isinstance(stock, str) and len(stock) <= 5 and stock.isalpha():
-                            clean_stocks.append(stock.upper())
+                    clean_stocks = self._clean_tickers(stocks)
                     
                     self.log_info(f"Extracted {len(clean_stocks)} trending stocks from news: {clean_stocks}")
-                    return clean_stocks[:15]  # Limit to 15 stocks
+                    return clean_stocks
                 else:
                     return []
             except json.JSONDecodeError:
@@ -267,7 +329,7 @@ Return a JSON array of 5-15 ticker symbols for companies mentioned in these arti
                 potential_tickers = re.findall(r'\b[A-Z]{2,5}\b', stocks_text)
                 # Filter common false positives
                 excluded = {'THE', 'AND', 'FOR', 'ARE', 'BUT', 'NOT', 'YOU', 'ALL', 'CAN', 'HER', 'WAS', 'ONE', 'OUR', 'HAD', 'WHO', 'ITS', 'DID', 'YES', 'HIS', 'HAS', 'GET', 'NEW', 'NOW', 'OLD', 'SEE', 'TWO', 'WAY', 'MAY', 'USE'}
-                clean_tickers = [t for t in potential_tickers if t not in excluded][:10]
+                clean_tickers = get_symbol_index().filter_listed(t for t in potential_tickers if t not in excluded)[:10]
                 self.log_info(f"Fallback extraction found potential tickers: {clean_tickers}")
                 return clean_tickers
                 
@@ -1,13 +1,32 @@
-import openai
 import yaml
-from fastapi import FastAPI, HTTPException
+import logging
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional
-import yfinance as yf
-import pandas as pd
+from pydantic import BaseModel, conint
+from starlette.routing import Match
+from typing import List, Optional
 from datetime import datetime, timedelta
 from services.stock_recommendation_service import get_recommendation_service
+from services.reference_data import get_reference_data_cache
+from services.market_data import get_market_data_client
+from services.bar_store import get_bar_store
+from services.completion_cache import get_completion_cache
+from services.llm import create_openai_client, get_llm_policy
+from services.http_client import get_http_client
+from services.event_stream import SSE_HEADERS, SSE_MEDIA_TYPE, sse_stream
+from services.symbol_index import get_symbol_index
+from services.screener import get_screener
+from services.scoring import get_scoring_engine
+from services.recommendation_scheduler import RecommendationScheduler
+from services.chart_data import build_chart_columns, chart_points_from_columns
+from services.chart_formats import (
+    ARROW_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, ChartFormat, columns_to_json, encode_arrow, encode_msgpack, series_to_json
+)
+from services.indicators import compute_indicators, parse_indicator_spec, sma
+from services.metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS_IN_FLIGHT, registry
 
 class StockRecommendationRequest(BaseModel):
     use_parallel_execution: Optional[bool] = True
@@ -18,20 +37,124 @@ class StockChartRequest(BaseModel):
     period: Optional[str] = "1mo"  # 1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max
     interval: Optional[str] = "1d"  # 1m, 2m, 5m, 15m, 30m, 60m, 90m, 1h, 1d, 5d, 1wk, 1mo, 3mo
     include_moving_averages: Optional[bool] = True
+    moving_average_periods: Optional[List[conint(ge=1)]] = [20, 50, 200]
+    indicators: Optional[List[str]] = None  # e.g. ["ema_12", "bollinger_20", "rsi_14", "macd", "vwap"]
+    format: Optional[ChartFormat] = "rows"
 
 # Load configuration
 with open('config.yml') as config:
     config_data = yaml.safe_load(config)
     openai_config = config_data['openai']
 
-# Initialize OpenAI client for agentic framework
-client = openai.OpenAI(api_key=openai_config['api_key'])
+logging.basicConfig(level=config_data.get('logging', {}).get('level', 'INFO'))
+logger = logging.getLogger(__name__)
+
+# Configure the shared ticker.info cache before any agent is created
+reference_data_config = config_data.get('reference_data', {})
+get_reference_data_cache(
+    max_size=reference_data_config.get('max_size', 1024),
+    ttls=reference_data_config.get('ttl_seconds')
+)
+
+# Bounded thread pool that keeps blocking yfinance calls off the event loop
+market_data_config = config_data.get('market_data', {})
+market_data = get_market_data_client(
+    max_workers=market_data_config.get('max_workers', 8),
+    max_concurrency=market_data_config.get('max_concurrency', 8)
+)
+
+# Local Arrow bar store so chart requests only download new bars
+bar_store_config = config_data.get('bar_store', {})
+bar_store = get_bar_store(
+    path=bar_store_config.get('path', 'data/bars'),
+    refresh_seconds=bar_store_config.get('refresh_seconds', 60)
+)
+
+# On-disk cache of OpenAI completions so unchanged prompts are not resent
+llm_cache_config = config_data.get('llm_cache', {})
+get_completion_cache(
+    path=llm_cache_config.get('path', 'data/completions.sqlite3'),
+    ttl_seconds=llm_cache_config.get('ttl_seconds', 6 * 60 * 60),
+    max_entries=llm_cache_config.get('max_entries', 5000)
+)
+
+# Pooled aiohttp session for news and calendar scraping, with conditional requests
+http_client_config = config_data.get('http_client', {})
+http_client = get_http_client(
+    max_connections=http_client_config.get('max_connections', 20),
+    max_connections_per_host=http_client_config.get('max_connections_per_host', 4),
+    timeout_seconds=http_client_config.get('timeout_seconds', 10)
+)
+
+# Local index of listed symbols, so ticker validation does not need a live info call
+symbol_index_config = config_data.get('symbol_index', {})
+symbol_index = get_symbol_index(
+    path=symbol_index_config.get('path', 'data/symbols.sqlite3'),
+    refresh_seconds=symbol_index_config.get('refresh_seconds', 24 * 60 * 60),
+    enrichment_max_age=symbol_index_config.get('enrichment_max_age_seconds', 24 * 60 * 60)
+)
+
+# Universe-wide momentum/volume screen over the symbol index, refreshed in the background
+screener_config = config_data.get('screener', {})
+screener = get_screener(
+    refresh_seconds=screener_config.get('refresh_seconds', 30 * 60),
+    max_symbols=screener_config.get('max_symbols', 5000),
+    chunk_size=screener_config.get('chunk_size', 500)
+)
+
+# Fundamental and composite scoring rules; config replaces a model's default rules by name
+get_scoring_engine(models=config_data.get('scoring'))
+
+# Async OpenAI client on a shared connection pool, with one retry/concurrency policy for all agents
+client = create_openai_client(
+    openai_config['api_key'],
+    base_url=openai_config.get('base_url'),
+    max_connections=openai_config.get('max_connections', 20),
+    max_keepalive_connections=openai_config.get('max_keepalive_connections', 10),
+    timeout_seconds=openai_config.get('timeout_seconds', 60)
+)
+get_llm_policy(
+    max_concurrency=openai_config.get('max_concurrency', 8),
+    max_retries=openai_config.get('max_retries', 4),
+    backoff_base=openai_config.get('backoff_base_seconds', 0.5),
+    backoff_cap=openai_config.get('backoff_cap_seconds', 20)
+)
+
+# Background-refreshed recommendation snapshot served by the recommendation endpoints
+recommendation_config = config_data.get('recommendations', {})
+recommendation_service = get_recommendation_service(
+    client,
+    budget_seconds=recommendation_config.get('budget_seconds', 60),
+    agent_deadlines=recommendation_config.get('agent_deadlines'),
+    reasoning_strategy=recommendation_config.get('reasoning_strategy', 'concurrent'),
+    reasoning_concurrency=recommendation_config.get('reasoning_concurrency', 4),
+    reasoning_mode=recommendation_config.get('reasoning_mode', 'eager')
+)
+recommendation_scheduler = RecommendationScheduler(
+    recommendation_service,
+    refresh_seconds=recommendation_config.get('refresh_seconds', 300),
+    stale_after_seconds=recommendation_config.get('stale_after_seconds'),
+    snapshot_path=recommendation_config.get('snapshot_path', 'data/recommendation_snapshot.json')
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await symbol_index.start()
+    await screener.start()
+    await recommendation_scheduler.start()
+    yield
+    await recommendation_scheduler.stop()
+    await screener.stop()
+    await symbol_index.stop()
+    await client.close()
+    await http_client.close()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="StockGPT API",
     description="Agentic AI framework for intelligent stock recommendations",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 app.add_middleware(
     CORSMiddleware,
@@ -41,10 +164,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def _route_template(request: Request) -> str:
+    """Label requests by route path (``/stock-chart/{symbol}``), not the raw URL"""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    route = _route_template(request)
+    start = time.perf_counter()
+    status = 500
+    with HTTP_REQUESTS_IN_FLIGHT.track_inprogress(route=route):
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start,
+                                         route=route, method=request.method, status=str(status))
+
 @app.get("/")
 async def health():
     return {"message": "StockGPT API is running - Agentic Stock Recommendation System"}
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of agent, upstream, cache and HTTP metrics"""
+    return Response(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/stock-recommendations")
 async def get_stock_recommendations(request: StockRecommendationRequest = None):
     """
@@ -55,19 +205,24 @@ async def get_stock_recommendations(request: StockRecommendationRequest = None):
     - Analyze market trends and technical indicators  
     - Review earnings calendars and fundamental metrics
     - Synthesize all data into top 10 stock recommendations
+    
+    Default requests are answered from the background-refreshed snapshot;
+    sequential execution is computed on the request path.
     """
     try:
-        # Get the recommendation service
-        recommendation_service = get_recommendation_service(client)
-        
         # Use default request if none provided
         if request is None:
             request = StockRecommendationRequest()
         
-        # Generate recommendations
-        recommendations = await recommendation_service.generate_recommendations(
-            use_parallel_execution=request.use_parallel_execution
-        )
+        if not request.use_parallel_execution:
+            return await recommendation_service.generate_recommendations(
+                use_parallel_execution=False,
+                include_market_context=request.include_market_context
+            )
+        
+        recommendations = await recommendation_scheduler.get_snapshot()
+        if not request.include_market_context:
+            recommendations.pop("market_context", None)
         
         return recommendations
         
@@ -80,82 +235,98 @@ async def get_stock_recommendations_simple():
     Simple GET endpoint for stock recommendations (no request body needed)
     """
     try:
-        recommendation_service = get_recommendation_service(client)
-        recommendations = await recommendation_service.generate_recommendations()
-        return recommendations
+        return await recommendation_scheduler.get_snapshot()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate recommendations: {str(e)}")
 
+@app.get("/stock-recommendations/stream")
+async def stream_stock_recommendations(include_market_context: bool = True):
+    """
+    Recommendations streamed as Server-Sent Events
+    
+    A fresh snapshot is replayed as ``recommendations`` then ``done``.
+    Otherwise a pipeline run emits ``agent`` events as the web search, market
+    analysis and earnings agents finish, then ``recommendations`` with the
+    ranked list (which becomes the snapshot), one ``reasoning`` event per
+    symbol as its reasoning is generated, and ``done`` (or ``error``).
+    Comment lines are sent during long gaps as a keep-alive.
+    """
+    events = recommendation_scheduler.stream(include_market_context=include_market_context)
+    return StreamingResponse(sse_stream(events), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+@app.get("/stock-recommendations/{symbol}/reasoning")
+async def get_stock_reasoning(symbol: str):
+    """
+    AI reasoning for one recommended stock
+    
+    With ``reasoning_mode: lazy`` recommendations arrive with
+    ``reasoning_status: pending``; the reasoning is generated on the first
+    request for a symbol and cached for later ones. Symbols ranked by a
+    streamed run are registered in the reasoning store; others must be in
+    the current snapshot.
+    """
+    snapshot = recommendation_scheduler.current_snapshot()
+    recommended = {stock.get("symbol") for stock in (snapshot or {}).get("recommendations", [])}
+    reasoning = None
+    if symbol in recommendation_service.reasoning_store or symbol.upper() in recommended:
+        reasoning = await recommendation_service.get_reasoning(symbol, snapshot)
+    if reasoning is None:
+        raise HTTPException(status_code=404, detail=f"{symbol.upper()} is not among the current recommendations")
+    
+    return {
+        "symbol": symbol.upper(),
+        "reasoning": reasoning,
+        "reasoning_status": "ready"
+    }
+
 @app.post("/stock-chart")
 async def get_stock_chart_data(request: StockChartRequest):
     """
     Get historical stock price data with optional moving averages
     
-    Supports various timeframes and intervals for detailed chart analysis
+    Supports various timeframes and intervals for detailed chart analysis,
+    plus optional SMA/EMA/Bollinger/RSI/MACD/VWAP indicators
     """
+    # Reject unknown indicators before doing any data fetching
     try:
-        # Fetch stock data using yfinance
-        ticker = yf.Ticker(request.symbol)
-        hist = ticker.history(period=request.period, interval=request.interval)
+        for spec in request.indicators or []:
+            parse_indicator_spec(spec)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        # Read stored bars and fetch only the ones newer than the last stored timestamp
+        hist = await bar_store.get_history(request.symbol, period=request.period, interval=request.interval)
         
         if hist.empty:
             raise HTTPException(status_code=404, detail=f"No data found for symbol: {request.symbol}")
         
-        # Convert to list of dictionaries for JSON response
-        chart_data = []
-        for index, row in hist.iterrows():
-            data_point = {
-                "date": index.strftime("%Y-%m-%d %H:%M:%S") if hasattr(index, 'strftime') else str(index),
-                "timestamp": int(index.timestamp() * 1000) if hasattr(index, 'timestamp') else 0,
-                "open": round(float(row['Open']), 2),
-                "high": round(float(row['High']), 2),
-                "low": round(float(row['Low']), 2),
-                "close": round(float(row['Close']), 2),
-                "volume": int(row['Volume']) if pd.notna(row['Volume']) else 0
-            }
-            chart_data.append(data_point)
+        # Build one array per field; rows are only materialised for the default format
+        binary_format = request.format in ("arrow", "msgpack")
+        columns = build_chart_columns(hist, include_dates=not binary_format)
+        close_prices = columns["close"]
+        data_length = len(close_prices)
         
         # Calculate moving averages if requested
         moving_averages = {}
-        if request.include_moving_averages and len(chart_data) > 0:
-            close_prices = [point['close'] for point in chart_data]
-            
+        if request.include_moving_averages and data_length > 0:
             # Always calculate MAs if we have any data - don't require minimum lengths
-            ma_periods = [20, 50, 200]
-            data_length = len(close_prices)
-            
-            print(f"🔍 DEBUG: Calculating MAs for {data_length} data points")
-            print(f"🔍 DEBUG: include_moving_averages = {request.include_moving_averages}")
-            print(f"🔍 DEBUG: Sample close prices: {close_prices[:5]}...")
+            ma_periods = request.moving_average_periods or [20, 50, 200]
             
             for period in ma_periods:
-                ma_values = []
-                valid_count = 0
-                for i in range(len(close_prices)):
-                    if i < period - 1:
-                        ma_values.append(None)
-                    else:
-                        ma = sum(close_prices[i-period+1:i+1]) / period
-                        ma_values.append(round(ma, 2))
-                        valid_count += 1
-                
-                moving_averages[f"ma_{period}"] = ma_values
-                print(f"🔍 DEBUG: MA{period} - {valid_count} valid values, sample: {[v for v in ma_values[-5:] if v is not None]}")
-            
-            print(f"🔍 DEBUG: Final moving_averages keys: {list(moving_averages.keys())}")
-            print(f"🔍 DEBUG: MA20 length: {len(moving_averages.get('ma_20', []))}")
-            print(f"🔍 DEBUG: Sample MA20 values: {[v for v in moving_averages.get('ma_20', [])[-10:] if v is not None]}")
-        else:
-            print(f"🔍 DEBUG: NOT calculating MAs - include_moving_averages: {request.include_moving_averages}, chart_data length: {len(chart_data)}")
+                moving_averages[f"ma_{period}"] = sma(close_prices, period)
+        
+        # Calculate any additional technical indicators that were requested
+        indicators = compute_indicators(hist, request.indicators) if request.indicators else {}
         
         # Get current stock info
-        info = ticker.info
-        current_price = info.get('currentPrice', chart_data[-1]['close'] if chart_data else 0)
+        info = await market_data.info(request.symbol, "quote")
+        current_price = info.get('currentPrice', close_prices[-1] if data_length else 0)
         previous_close = info.get('previousClose', 0)
         change = current_price - previous_close if previous_close else 0
         change_percent = (change / previous_close * 100) if previous_close else 0
         
-        response = {
+        summary = {
             "symbol": request.symbol.upper(),
             "company_name": info.get('longName', request.symbol),
             "current_price": round(float(current_price), 2),
@@ -164,17 +335,33 @@ async def get_stock_chart_data(request: StockChartRequest):
             "change_percent": round(float(change_percent), 2),
             "period": request.period,
             "interval": request.interval,
-            "data": chart_data,
-            "moving_averages": moving_averages,
-            "data_points": len(chart_data),
+            "format": request.format,
+            "data_points": data_length,
             "timestamp": datetime.now().isoformat()
         }
         
-        print(f"🔍 DEBUG: FINAL Response moving_averages keys: {list(response['moving_averages'].keys())}")
-        print(f"🔍 DEBUG: FINAL Response data length: {len(response['data'])}")
-        print(f"🔍 DEBUG: FINAL Has MA data: {bool(response['moving_averages'])}")
-        if response['moving_averages']:
-            print(f"🔍 DEBUG: FINAL MA20 sample: {response['moving_averages'].get('ma_20', [])[-3:]}")
+        # Binary formats ship raw column buffers with no per-row Python objects
+        if request.format == "arrow":
+            return Response(encode_arrow(columns, {**moving_averages, **indicators}, summary),
+                            media_type=ARROW_MEDIA_TYPE)
+        if request.format == "msgpack":
+            return Response(encode_msgpack(columns, {**moving_averages, **indicators}, summary),
+                            media_type=MSGPACK_MEDIA_TYPE)
+        
+        if request.format == "columnar":
+            chart_data = columns_to_json(columns)
+        else:
+            chart_data = chart_points_from_columns(columns)
+        
+        response = {
+            **summary,
+            "data": chart_data,
+            "moving_averages": series_to_json(moving_averages),
+            "indicators": series_to_json(indicators)
+        }
+        
+        logger.debug("chart symbol=%s data_points=%d moving_averages=%s indicators=%s",
+                     request.symbol, data_length, list(moving_averages), list(indicators))
         
         return response
         
@@ -182,9 +369,19 @@ async def get_stock_chart_data(request: StockChartRequest):
         raise HTTPException(status_code=500, detail=f"Failed to fetch chart data: {str(e)}")
 
 @app.get("/stock-chart/{symbol}")
-async def get_stock_chart_data_simple(symbol: str, period: str = "1mo", interval: str = "1d"):
+async def get_stock_chart_data_simple(symbol: str, period: str = "1mo", interval: str = "1d",
+                                      indicators: Optional[str] = None,
+                                      response_format: ChartFormat = Query("rows", alias="format")):
     """
     Simple GET endpoint for stock chart data (no request body needed)
+    
+    ``indicators`` is a comma-separated list, e.g. ``rsi_14,macd,vwap``
     """
-    request = StockChartRequest(symbol=symbol, period=period, interval=interval)
+    request = StockChartRequest(
+        symbol=symbol,
+        period=period,
+        interval=interval,
+        indicators=[spec for spec in indicators.split(",") if spec.strip()] if indicators else None,
+        format=response_format
+    )
     return await get_stock_chart_data(request)
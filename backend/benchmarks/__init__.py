@@ -0,0 +1 @@
+# Micro-benchmarks for StockGPT backend hot paths
@@ -0,0 +1,80 @@
+"""
+Micro-benchmark: vectorized chart payload vs the original ``iterrows()`` loop
+
+Run from the backend directory:
+    python -m benchmarks.bench_chart_payload --rows 20000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from services.chart_data import build_chart_points
+
+
+def legacy_chart_points(hist: pd.DataFrame):
+    """The row-by-row loop previously inlined in ``get_stock_chart_data``"""
+    chart_data = []
+    for index, row in hist.iterrows():
+        data_point = {
+            "date": index.strftime("%Y-%m-%d %H:%M:%S") if hasattr(index, 'strftime') else str(index),
+            "timestamp": int(index.timestamp() * 1000) if hasattr(index, 'timestamp') else 0,
+            "open": round(float(row['Open']), 2),
+            "high": round(float(row['High']), 2),
+            "low": round(float(row['Low']), 2),
+            "close": round(float(row['Close']), 2),
+            "volume": int(row['Volume']) if pd.notna(row['Volume']) else 0
+        }
+        chart_data.append(data_point)
+    return chart_data
+
+
+def make_history(rows: int, freq: str) -> pd.DataFrame:
+    """Synthetic OHLCV frame shaped like ``Ticker.history`` output"""
+    rng = np.random.default_rng(42)
+    index = pd.date_range(end="2024-06-28 16:00", periods=rows, freq=freq, tz="America/New_York", name="Date")
+    close = 100 + rng.standard_normal(rows).cumsum()
+    volume = rng.integers(1_000, 10_000_000, rows).astype(np.float64)
+    volume[rng.random(rows) < 0.01] = np.nan
+    return pd.DataFrame({
+        "Open": close + rng.normal(0, 0.5, rows),
+        "High": close + np.abs(rng.normal(0, 1, rows)),
+        "Low": close - np.abs(rng.normal(0, 1, rows)),
+        "Close": close,
+        "Volume": volume
+    }, index=index)
+
+
+def best_of(func, hist, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(hist)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--freq", default="1min", help="bar spacing, e.g. 1min or 1D")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    hist = make_history(args.rows, args.freq)
+
+    legacy_time, legacy = best_of(legacy_chart_points, hist, args.repeat)
+    vectorized_time, vectorized = best_of(build_chart_points, hist, args.repeat)
+
+    assert legacy == vectorized, "vectorized payload differs from the iterrows() loop"
+
+    print(f"rows:        {args.rows}")
+    print(f"iterrows():  {legacy_time * 1000:9.1f} ms")
+    print(f"vectorized:  {vectorized_time * 1000:9.1f} ms")
+    print(f"speedup:     {legacy_time / vectorized_time:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Micro-benchmark: re-scoring a watchlist after one intraday bar update
+
+Run from the backend directory:
+    python -m benchmarks.bench_indicator_state --symbols 5000
+
+Seeds ``IndicatorStateStore`` from a synthetic 3-month batch, then revises
+the latest bar (as an intraday refresh does) and compares the cost of
+re-scoring every symbol with the per-symbol pandas recomputation, the
+vectorized screen over the full matrix, and the incremental state.
+"""
+
+import argparse
+
+import numpy as np
+
+from benchmarks.bench_screener import best_of, legacy_screen, synthetic_batch
+from services.market_data import HistoryBatch
+from services.indicator_state import IndicatorStateStore
+from services.screener import momentum_features
+
+
+def revised_batch(history: HistoryBatch, seed: int = 11) -> HistoryBatch:
+    """The full batch with the last bar moved, as a later intraday quote would"""
+    rng = np.random.default_rng(seed)
+    frame = history.frame.copy()
+    frame.iloc[-1] = frame.iloc[-1] * (1 + rng.normal(0, 0.01, frame.shape[1]))
+    return HistoryBatch(frame)
+
+
+def incremental_update(store: IndicatorStateStore, recent: HistoryBatch, symbols):
+    store.advance(recent, symbols)
+    return [store.get(symbol).features() for symbol in symbols]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=63)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    history = synthetic_batch(args.symbols, args.days)
+    symbols = list(history.field("Close").columns)
+    store = IndicatorStateStore(max_symbols=args.symbols)
+    store.seed(history)
+
+    revised = revised_batch(history)
+    recent = HistoryBatch(revised.frame.iloc[-1:])
+
+    legacy_time, _ = best_of(legacy_screen, (revised, symbols), 1)
+    vector_time, batch = best_of(momentum_features, (revised.field("Close"), revised.field("Volume")), args.repeat)
+    state_time, features = best_of(incremental_update, (store, recent, symbols), args.repeat)
+
+    scores = np.array([row["momentum_score"] for row in features])
+    assert (scores == batch["momentum_score"].to_numpy()).all(), "incremental and batch scores disagree"
+
+    per_symbol = 1e6 / args.symbols
+    print(f"{args.symbols} symbols x {args.days} days, latest bar revised")
+    print(f"per-symbol pandas  {legacy_time * 1000:9.1f} ms  {legacy_time * per_symbol:8.2f} us/symbol")
+    print(f"vectorized matrix  {vector_time * 1000:9.1f} ms  {vector_time * per_symbol:8.2f} us/symbol"
+          f"  (needs all {args.days} days again)")
+    print(f"incremental state  {state_time * 1000:9.1f} ms  {state_time * per_symbol:8.2f} us/symbol"
+          f"  (needs only the latest bar)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Micro-benchmark: profile-based lxml extraction vs the original BeautifulSoup scan
+
+Run from the backend directory:
+    python -m benchmarks.bench_news_extraction --articles 400
+    python -m benchmarks.bench_news_extraction --fixtures path/to/saved_pages
+
+Without ``--fixtures`` the pages are synthetic, shaped like each source's
+markup and padded with navigation/script noise, and both parsers must
+extract the same titles, summaries and calendar symbols from them (links can
+differ: the site profiles also find links the old scan missed). A fixtures
+directory holds pages saved from the live sites, named by host
+(``finance.yahoo.com.html``, ``www.marketwatch.com.html``,
+``www.cnbc.com.html``, ``finance.yahoo.com-calendar.html``); real pages only
+report how many items differ.
+"""
+
+import argparse
+import os
+import re
+import time
+
+from bs4 import BeautifulSoup
+
+from services.news_extraction import extract_articles, extract_calendar_symbols
+
+NEWS_URLS = {
+    "finance.yahoo.com": "https://finance.yahoo.com/news/",
+    "www.marketwatch.com": "https://www.marketwatch.com/latest-news",
+    "www.cnbc.com": "https://www.cnbc.com/world-markets/",
+}
+CALENDAR_FIXTURE = "finance.yahoo.com-calendar"
+
+
+def legacy_articles(html: str, url: str):
+    """The BeautifulSoup parse previously inlined in ``WebSearchAgent._scrape_news_source``"""
+    articles = []
+    soup = BeautifulSoup(html, 'html.parser')
+    article_elements = soup.find_all(['article', 'div'], class_=re.compile(r'(story|article|news|headline)'))
+    for element in article_elements[:10]:
+        title_elem = element.find(['h1', 'h2', 'h3', 'a'])
+        if title_elem:
+            title = title_elem.get_text(strip=True)
+            link = title_elem.get('href', '') if title_elem.name == 'a' else ''
+            summary_elem = element.find(['p', 'div'], class_=re.compile(r'(summary|excerpt|description)'))
+            summary = summary_elem.get_text(strip=True) if summary_elem else ""
+            if title and len(title) > 10:
+                articles.append({'title': title, 'summary': summary, 'link': link, 'source': url})
+    return articles
+
+
+def legacy_calendar_symbols(html: str):
+    """The page-text regex previously inlined in ``EarningsAgent._search_earnings_calendar``"""
+    text_content = BeautifulSoup(html, 'html.parser').get_text()
+    return list(dict.fromkeys(re.findall(r'\b[A-Z]{2,5}\b', text_content)))
+
+
+def _noise(count: int) -> str:
+    """Navigation, ads and inline scripts that surround the article list on real pages"""
+    block = (
+        '<nav class="nav-menu"><ul>' + ''.join(f'<li class="nav-item"><a href="/s/{i}">Section {i}</a></li>'
+                                               for i in range(20)) + '</ul></nav>'
+        '<div class="ad-slot"><div class="ad-inner"><span>Advertisement</span></div></div>'
+        '<script>window.__data = {"a": [1, 2, 3], "b": "' + 'x' * 400 + '"};</script>'
+    )
+    return block * count
+
+
+def synthetic_page(host: str, articles: int) -> str:
+    """A news page in the markup of ``host`` with ``articles`` items
+
+    Each item also carries exactly one node the old class-name scan matches,
+    so both parsers see the same articles.
+    """
+    items = []
+    for i in range(articles):
+        headline = f"Company {i} shares move after quarterly results beat estimates"
+        summary = " ".join([f"Analysts revised targets for company {i} after the report."] * 3)
+        if host == "finance.yahoo.com":
+            items.append(f'<li class="js-stream-content stream-item"><div class="content story-item">'
+                         f'<a href="/news/story-{i}.html"><h3 class="clamp">{headline}</h3></a>'
+                         f'<p class="clamp summary">{summary}</p></div></li>')
+        elif host == "www.marketwatch.com":
+            items.append(f'<div class="element"><div class="article__content">'
+                         f'<h3 class="article__headline"><a class="link" href="/story/{i}">{headline}</a></h3>'
+                         f'<p class="article__summary">{summary}</p></div></div>')
+        else:
+            items.append(f'<div class="Card-standardBreakerCard Card-story"><div class="Card-textContent">'
+                         f'<a class="Card-title" href="/2024/06/{i}/story.html"><div class="Card-title">{headline}</div></a>'
+                         f'<span class="Card-time">2 hours ago</span></div></div>')
+    return f'<html><head><title>News</title></head><body>{_noise(articles // 4)}<ul>{"".join(items)}</ul>{_noise(articles // 4)}</body></html>'
+
+
+def synthetic_calendar(rows: int) -> str:
+    """An earnings calendar table with ``rows`` companies (at most 676 distinct symbols)"""
+    symbols = [f"T{chr(65 + i % 26)}{chr(65 + i // 26 % 26)}" for i in range(rows)]
+    body = '\n'.join(
+        f'<tr>\n<td><a href="/quote/{symbol}" data-test="quoteLink">{symbol}</a></td>\n'
+        f'<td>Company {i} Inc</td>\n<td>Before Market Open</td>\n<td>1.23</td>\n</tr>'
+        for i, symbol in enumerate(symbols)
+    )
+    return f'<html><body>{_noise(rows // 4)}<table><thead><tr><th>Symbol</th><th>Company</th></tr></thead>' \
+           f'<tbody>{body}</tbody></table></body></html>'
+
+
+def load_pages(fixtures: str, articles: int):
+    pages = {}
+    for host, url in NEWS_URLS.items():
+        if fixtures:
+            path = os.path.join(fixtures, f"{host}.html")
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8", errors="replace") as f:
+                pages[host] = (url, f.read())
+        else:
+            pages[host] = (url, synthetic_page(host, articles))
+
+    calendar = None
+    if fixtures:
+        path = os.path.join(fixtures, f"{CALENDAR_FIXTURE}.html")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                calendar = f.read()
+    else:
+        calendar = synthetic_calendar(articles)
+    return pages, calendar
+
+
+def best_of(func, args, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def article_items(articles):
+    """The fields both parsers must agree on"""
+    return [(article["title"], article["summary"]) for article in articles]
+
+
+def report(label, size, legacy_time, legacy, fast_time, fast):
+    print(f"{label:<22} {size / 1024:7.0f} KB  legacy {legacy_time * 1000:8.1f} ms ({len(legacy):3d})"
+          f"  lxml {fast_time * 1000:7.1f} ms ({len(fast):3d})  {legacy_time / fast_time:6.1f}x")
+
+
+def check_parity(label, legacy, fast, strict):
+    """Fail on synthetic pages when the parsers disagree; report the difference on saved ones"""
+    if legacy == fast:
+        return
+    differing = len(set(legacy) ^ set(fast))
+    assert not strict, f"{label}: legacy and lxml extraction disagree ({differing} items differ)"
+    print(f"{'':<22} {differing} items differ from the legacy parse")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=400, help="items per synthetic page")
+    parser.add_argument("--fixtures", help="directory of saved pages named by host")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages, calendar = load_pages(args.fixtures, args.articles)
+    print("page                       size  legacy time (articles)      lxml time (articles)   speedup")
+
+    strict = not args.fixtures
+    for host, (url, html) in pages.items():
+        legacy_time, legacy = best_of(legacy_articles, (html, url), args.repeat)
+        fast_time, fast = best_of(extract_articles, (html, url), args.repeat)
+        report(host, len(html), legacy_time, legacy, fast_time, fast)
+        check_parity(host, article_items(legacy), article_items(fast), strict)
+
+    if calendar is not None:
+        legacy_time, legacy = best_of(legacy_calendar_symbols, (calendar,), args.repeat)
+        fast_time, fast = best_of(extract_calendar_symbols, (calendar,), args.repeat)
+        report("earnings calendar", len(calendar), legacy_time, legacy, fast_time, fast)
+        check_parity("earnings calendar", legacy, fast, strict)
+
+
+if __name__ == "__main__":
+    main()
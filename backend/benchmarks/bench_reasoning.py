@@ -0,0 +1,72 @@
+"""
+Compare AI reasoning strategies in ``RecommendationSynthesizer`` against the live API
+
+Makes real OpenAI calls with the key in ``config.yml`` (or against
+``openai.base_url``, e.g. the local stub), so the timings reflect your
+account's rate limits. Run from the backend directory:
+    python -m benchmarks.bench_reasoning --stocks 10 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import yaml
+
+from agents.recommendation_synthesizer import RecommendationSynthesizer
+from services.completion_cache import get_completion_cache
+from services.llm import create_openai_client
+
+SYMBOLS = ["AAPL", "MSFT", "NVDA", "AMZN", "GOOGL", "META", "JPM", "UNH", "XOM", "LLY", "AVGO", "COST"]
+
+
+def make_top_stocks(count: int):
+    """Synthetic ``_select_top_stocks`` output"""
+    return [{
+        "symbol": symbol,
+        "company_name": symbol,
+        "sector": "Technology",
+        "current_price": 100.0 + i,
+        "month_change": 2.5,
+        "composite_score": 6.0,
+        "pe_ratio": 25.0
+    } for i, symbol in enumerate(SYMBOLS[:count])]
+
+
+async def time_strategy(openai_config, strategy: str, concurrency: int, top_stocks):
+    # The async client's connection pool belongs to one event loop, so build it per run
+    client = create_openai_client(openai_config["api_key"], base_url=openai_config.get("base_url"))
+    synthesizer = RecommendationSynthesizer(client, reasoning_strategy=strategy, reasoning_concurrency=concurrency)
+    start = time.perf_counter()
+    reasoning = await synthesizer._generate_ai_reasoning(top_stocks, {}, {}, {})
+    elapsed = time.perf_counter() - start
+    await client.close()
+    fallbacks = sum(text == synthesizer._fallback_reasoning(symbol) for symbol, text in reasoning.items())
+    return elapsed, len(reasoning), fallbacks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stocks", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--strategies", default="sequential,concurrent,batched")
+    args = parser.parse_args()
+
+    with open("config.yml") as config:
+        openai_config = yaml.safe_load(config)["openai"]
+
+    # Every strategy must hit the API, so use a scratch completion cache and empty it between runs
+    cache = get_completion_cache(path=os.path.join(tempfile.mkdtemp(), "completions.sqlite3"))
+
+    top_stocks = make_top_stocks(args.stocks)
+    print(f"stocks: {len(top_stocks)}  concurrency: {args.concurrency}")
+    for strategy in args.strategies.split(","):
+        cache.clear()
+        elapsed, generated, fallbacks = asyncio.run(time_strategy(openai_config, strategy, args.concurrency, top_stocks))
+        print(f"{strategy:<11} {elapsed:7.2f} s   {generated} generated, {fallbacks} fallback")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Parity check: configurable fundamental scoring vs the original if-chain
+
+Run from the backend directory:
+    python -m benchmarks.bench_scoring --symbols 5000
+
+Scores synthetic ``ticker.info`` payloads (with missing, zero and boundary
+values) with the rules ``EarningsAgent._analyze_fundamentals`` used to
+hard-code and with the "fundamentals" model of ``services.scoring``, checks
+both agree, and prints how long each takes.
+"""
+
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from agents.earnings_agent import EarningsAgent
+from services.scoring import ScoringEngine
+
+
+def legacy_score(info):
+    """The scoring chain previously inlined in ``EarningsAgent._analyze_fundamentals``"""
+    pe_ratio = info.get('trailingPE')
+    peg_ratio = info.get('pegRatio')
+    debt_to_equity = info.get('debtToEquity')
+    roe = info.get('returnOnEquity')
+    profit_margin = info.get('profitMargins')
+    revenue_growth = info.get('revenueGrowth')
+
+    score = 0
+    if pe_ratio and 10 < pe_ratio < 25:
+        score += 2
+    elif pe_ratio and 5 < pe_ratio <= 10:
+        score += 1
+    if peg_ratio and peg_ratio < 1:
+        score += 2
+    elif peg_ratio and peg_ratio < 1.5:
+        score += 1
+    if roe and roe > 0.15:
+        score += 2
+    elif roe and roe > 0.10:
+        score += 1
+    if profit_margin and profit_margin > 0.15:
+        score += 2
+    elif profit_margin and profit_margin > 0.10:
+        score += 1
+    if revenue_growth and revenue_growth > 0.10:
+        score += 2
+    elif revenue_growth and revenue_growth > 0.05:
+        score += 1
+    if debt_to_equity and debt_to_equity < 0.3:
+        score += 1
+    elif debt_to_equity and debt_to_equity < 0.5:
+        score += 0.5
+    return score
+
+
+def synthetic_infos(symbols: int, seed: int = 3):
+    rng = random.Random(seed)
+    ranges = {"trailingPE": (-5, 40), "pegRatio": (-1, 3), "debtToEquity": (-0.2, 1), "returnOnEquity": (-0.1, 0.3),
+              "profitMargins": (-0.1, 0.3), "revenueGrowth": (-0.1, 0.3), "priceToBook": (0, 5)}
+    # Thresholds themselves, to check strict vs inclusive comparisons
+    boundaries = [5, 10, 25, 1, 1.5, 0.3, 0.5, 0.05, 0.10, 0.15]
+
+    def value(low, high):
+        roll = rng.random()
+        if roll < 0.1:
+            return None
+        if roll < 0.15:
+            return 0
+        if roll < 0.25:
+            return rng.choice(boundaries)
+        return rng.uniform(low, high)
+
+    return {f"S{i:05d}": {field: value(*bounds) for field, bounds in ranges.items()} for i in range(symbols)}
+
+
+def feature_frame(infos):
+    """The per-symbol feature frame ``EarningsAgent._analyze_fundamentals`` builds from the payloads"""
+    symbols = list(infos)
+    metrics = pd.DataFrame.from_records([infos[symbol] for symbol in symbols], index=symbols,
+                                        columns=list(EarningsAgent.FUNDAMENTAL_FIELDS.values()))
+    metrics.columns = list(EarningsAgent.FUNDAMENTAL_FIELDS)
+    return metrics
+
+
+def best_of(func, args, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    infos = synthetic_infos(args.symbols)
+    model = ScoringEngine().model("fundamentals")
+
+    legacy_time, legacy = best_of(lambda: {symbol: legacy_score(info) for symbol, info in infos.items()}, (),
+                                  args.repeat)
+    frame_time, metrics = best_of(feature_frame, (infos,), args.repeat)
+    engine_time, scores = best_of(model.score, (metrics,), args.repeat)
+
+    scores = dict(zip(metrics.index, scores.tolist()))
+    mismatches = [symbol for symbol in infos if legacy[symbol] != scores[symbol]]
+    assert not mismatches, f"scores disagree for {mismatches[:5]}"
+
+    print(f"{args.symbols} symbols, {len(model.rules)} rules")
+    print(f"if-chain per symbol  {legacy_time * 1000:8.1f} ms")
+    print(f"vectorized model     {engine_time * 1000:8.1f} ms  (+ {frame_time * 1000:.1f} ms to gather "
+          f"info payloads into columns)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Local stand-in for the OpenAI chat completions API
+
+Serves ``POST /v1/chat/completions`` with a fixed reply after a configurable
+delay, failing a fraction of requests with 429 or 500 so the retry policy and
+connection pool can be exercised without a real key. Run from the backend
+directory and point ``openai.base_url`` in config.yml at it:
+    python -m benchmarks.openai_stub --port 8001 --latency 0.5 --error-rate 0.2
+
+    openai:
+      api_key: "stub"
+      base_url: "http://127.0.0.1:8001/v1"
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def create_app(latency: float, error_rate: float, content: str) -> FastAPI:
+    app = FastAPI(title="OpenAI stub")
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        await asyncio.sleep(latency)
+
+        if random.random() < error_rate:
+            status = random.choice((429, 500))
+            headers = {"retry-after": "1"} if status == 429 else {}
+            return JSONResponse(
+                {"error": {"message": "stub failure", "type": "stub_error", "code": status}},
+                status_code=status, headers=headers
+            )
+
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before each reply")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 429/500")
+    parser.add_argument("--content", default="neutral", help="assistant message returned by every completion")
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.latency, args.error_rate, args.content), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+from datetime import timedelta
+from typing import Dict, Optional
+import asyncio
+import logging
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from services.market_data import OHLCV_FIELDS, MarketDataClient, get_market_data_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.path.join("data", "bars")
+DEFAULT_REFRESH_SECONDS = 60
+# Per-file updates are serialized through a fixed pool of locks, picked by key hash
+LOCK_STRIPES = 64
+
+# Schema metadata keys
+COVERAGE_KEY = b"coverage_start"
+FETCHED_AT_KEY = b"fetched_at"
+FULL_HISTORY = "max"
+
+
+def _requested_start(period: str, now: pd.Timestamp) -> Optional[pd.Timestamp]:
+    """Earliest timestamp a yfinance ``period`` asks for, or None for ``max``"""
+    if period == FULL_HISTORY:
+        return None
+    if period == "ytd":
+        return now.normalize().replace(month=1, day=1)
+
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+    amount, unit = int(match.group(1)), match.group(2)
+    if unit == "d":
+        return now - timedelta(days=amount)
+    if unit == "wk":
+        return now - pd.DateOffset(weeks=amount)
+    if unit == "mo":
+        return now - pd.DateOffset(months=amount)
+    return now - pd.DateOffset(years=amount)
+
+
+def _trim_to_period(frame: pd.DataFrame, period: str) -> pd.DataFrame:
+    """Slice stored bars down to what a fresh ``history(period=...)`` would return"""
+    if frame.empty or period == FULL_HISTORY:
+        return frame
+
+    # Day periods count trading sessions, not calendar days
+    if period.endswith("d") and period[:-1].isdigit():
+        sessions = frame.index.normalize().unique()[-int(period[:-1]):]
+        return frame[frame.index.normalize() >= sessions[0]]
+
+    start = _requested_start(period, pd.Timestamp.now(tz=frame.index.tz))
+    return frame[frame.index >= start]
+
+
+class BarStore:
+    """On-disk OHLCV store with one Arrow IPC file per symbol and interval
+
+    Each request only downloads the bars newer than the last stored timestamp
+    and appends them, falling back to a full download when the stored range
+    does not cover the requested period or the overlapping bar shows the
+    history was re-adjusted (split, dividend).
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH,
+                 refresh_seconds: float = DEFAULT_REFRESH_SECONDS,
+                 market_data: Optional[MarketDataClient] = None):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self.market_data = market_data or get_market_data_client()
+        self._locks = [asyncio.Lock() for _ in range(LOCK_STRIPES)]
+        os.makedirs(self.path, exist_ok=True)
+
+    def _file_path(self, symbol: str, interval: str) -> str:
+        safe_symbol = re.sub(r"[^A-Za-z0-9._-]", "_", symbol.upper())
+        return os.path.join(self.path, f"{safe_symbol}_{interval}.arrow")
+
+    def read(self, symbol: str, interval: str):
+        """Load the stored bars for a symbol
+
+        Returns ``(frame, metadata)`` or ``(None, {})`` when nothing is stored.
+        """
+        file_path = self._file_path(symbol, interval)
+        if not os.path.exists(file_path):
+            return None, {}
+
+        # Read into memory: to_pandas copies the columns anyway, so mapping the file gains nothing
+        with pa.OSFile(file_path, "rb") as source:
+            table = pa.ipc.open_file(source).read_all()
+        metadata = table.schema.metadata or {}
+
+        frame = table.to_pandas()
+        frame = frame.set_index("Date")
+        return frame, metadata
+
+    def write(self, symbol: str, interval: str, frame: pd.DataFrame, coverage_start: str):
+        """Atomically replace the stored bars for a symbol"""
+        table = pa.Table.from_pandas(frame.rename_axis("Date").reset_index(), preserve_index=False)
+        table = table.replace_schema_metadata({
+            COVERAGE_KEY: coverage_start.encode(),
+            FETCHED_AT_KEY: str(time.time()).encode()
+        })
+
+        file_path = self._file_path(symbol, interval)
+        tmp_path = f"{file_path}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, file_path)
+
+    def _covers(self, frame: pd.DataFrame, metadata: Dict[bytes, bytes], period: str) -> bool:
+        """Check whether stored bars reach back far enough for the requested period"""
+        coverage = metadata.get(COVERAGE_KEY, b"").decode()
+        if not coverage:
+            return False
+        if coverage == FULL_HISTORY:
+            return True
+        if period == FULL_HISTORY:
+            return False
+
+        stored_start = pd.Timestamp(coverage)
+        if stored_start.tz is None and frame.index.tz is not None:
+            stored_start = stored_start.tz_localize(frame.index.tz)
+        return stored_start <= _requested_start(period, pd.Timestamp.now(tz=stored_start.tz))
+
+    async def get_history(self, symbol: str, period: str = "1mo", interval: str = "1d") -> pd.DataFrame:
+        """Return OHLCV bars for a period, fetching only what is not stored yet"""
+        key = f"{symbol.upper()}_{interval}"
+        lock = self._locks[hash(key) % len(self._locks)]
+
+        async with lock:
+            stored, metadata = await asyncio.to_thread(self.read, symbol, interval)
+
+            if stored is None or stored.empty or not self._covers(stored, metadata, period):
+                return _trim_to_period(await self._full_fetch(symbol, period, interval), period)
+
+            fetched_at = float(metadata.get(FETCHED_AT_KEY, b"0"))
+            if time.time() - fetched_at >= self.refresh_seconds:
+                stored = await self._append_delta(symbol, period, interval, stored, metadata)
+
+            return _trim_to_period(stored, period)
+
+    async def _full_fetch(self, symbol: str, period: str, interval: str) -> pd.DataFrame:
+        """Download the whole period and replace the stored file"""
+        hist = await self.market_data.history(symbol, period=period, interval=interval)
+        if hist.empty:
+            return hist
+
+        hist = hist[[field for field in OHLCV_FIELDS if field in hist.columns]]
+        coverage = FULL_HISTORY if period == FULL_HISTORY else hist.index[0].isoformat()
+        if period != FULL_HISTORY:
+            requested = _requested_start(period, pd.Timestamp.now(tz=hist.index.tz))
+            coverage = min(requested, hist.index[0]).isoformat()
+
+        await asyncio.to_thread(self.write, symbol, interval, hist, coverage)
+        logger.info(f"Stored {len(hist)} {interval} bars for {symbol} ({period})")
+        return hist
+
+    async def _append_delta(self, symbol: str, period: str, interval: str, stored: pd.DataFrame,
+                            metadata: Dict[bytes, bytes]) -> pd.DataFrame:
+        """Fetch bars from the last stored timestamp onwards and append them"""
+        last_timestamp = stored.index[-1]
+        try:
+            delta = await self.market_data.history(symbol, period=None, interval=interval, start=last_timestamp)
+        except Exception as e:
+            logger.warning(f"Delta fetch failed for {symbol} {interval}, serving stored bars: {e}")
+            return stored
+
+        coverage = metadata[COVERAGE_KEY].decode()
+        if delta.empty:
+            await asyncio.to_thread(self.write, symbol, interval, stored, coverage)
+            return stored
+
+        delta = delta[[field for field in OHLCV_FIELDS if field in delta.columns]]
+        if self._readjusted(stored, delta):
+            logger.info(f"Stored {interval} bars for {symbol} were re-adjusted upstream, fetching again")
+            return await self._full_fetch(symbol, period, interval)
+
+        # The last stored bar may have been a partial session, so new rows win
+        combined = pd.concat([stored, delta])
+        combined = combined[~combined.index.duplicated(keep="last")].sort_index()
+
+        await asyncio.to_thread(self.write, symbol, interval, combined, coverage)
+        logger.info(f"Appended {len(combined) - len(stored)} new {interval} bars for {symbol}")
+        return combined
+
+    @staticmethod
+    def _readjusted(stored: pd.DataFrame, delta: pd.DataFrame) -> bool:
+        """Check whether the bar both frames share has a different open
+
+        Prices are split and dividend adjusted, so a corporate action changes
+        every earlier bar. The open of the last stored bar is fixed once its
+        session starts (unlike its close or volume), so a changed open means
+        the stored history is stale.
+        """
+        last_timestamp = stored.index[-1]
+        if last_timestamp not in delta.index or "Open" not in stored.columns or "Open" not in delta.columns:
+            return False
+        stored_open = stored["Open"].iloc[-1]
+        fresh_open = delta.loc[last_timestamp, "Open"]
+        if isinstance(fresh_open, pd.Series):
+            fresh_open = fresh_open.iloc[-1]
+        if pd.isna(stored_open) or pd.isna(fresh_open):
+            return False
+        return not np.isclose(stored_open, fresh_open, rtol=1e-6, atol=0)
+
+
+# Singleton instance for the application
+_bar_store = None
+
+
+def get_bar_store(**kwargs) -> BarStore:
+    """Get or create the bar store instance"""
+    global _bar_store
+    if _bar_store is None:
+        _bar_store = BarStore(**kwargs)
+    return _bar_store
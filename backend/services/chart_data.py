@@ -0,0 +1,108 @@
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Ticks per second for each DatetimeIndex resolution
+_TICKS_PER_SECOND = {"s": 1, "ms": 1_000, "us": 1_000_000, "ns": 1_000_000_000}
+
+
+def round_prices(values: np.ndarray, decimals: int = 2) -> np.ndarray:
+    """Vectorized rounding that matches Python's ``round(float(x), decimals)``
+
+    ``np.round`` scales before rounding, so values sitting almost exactly on a
+    half-way point can round the other way. Those few are re-rounded with the
+    builtin to keep the output bit-for-bit identical.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, decimals)
+
+    scaled = values * 10 ** decimals
+    near_tie = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for i in near_tie:
+        rounded[i] = round(float(values[i]), decimals)
+
+    return rounded
+
+
+def epoch_milliseconds(index: pd.DatetimeIndex) -> np.ndarray:
+    """Milliseconds since the epoch, truncated like ``int(ts.timestamp() * 1000)``"""
+    values = index.asi8
+    ticks_per_second = _TICKS_PER_SECOND[index.unit]
+    if ticks_per_second <= 1_000:
+        return values * (1_000 // ticks_per_second)
+
+    # Integer division truncating toward zero, matching int() on pre-1970 dates
+    ticks_per_millisecond = ticks_per_second // 1_000
+    return np.sign(values) * (np.abs(values) // ticks_per_millisecond)
+
+
+def format_dates(index: pd.DatetimeIndex) -> List[str]:
+    """Format every timestamp as ``%Y-%m-%d %H:%M:%S`` in its own wall-clock time
+
+    Equivalent to ``index.strftime(DATE_FORMAT)`` but goes through NumPy's
+    datetime64 string conversion instead of formatting one value at a time.
+    """
+    wall_clock = index.tz_localize(None) if index.tz is not None else index
+    seconds = wall_clock.to_numpy().astype("datetime64[s]")
+    return np.char.replace(np.datetime_as_string(seconds, unit="s"), "T", " ").tolist()
+
+
+def build_chart_columns(hist: pd.DataFrame, include_dates: bool = True) -> Dict[str, Any]:
+    """Build the chart fields as one array per column
+
+    Prices are rounded to cents, timestamps are epoch milliseconds (int64) and
+    missing volumes are 0. ``date`` strings are only formatted when requested.
+    """
+    index = hist.index
+    if isinstance(index, pd.DatetimeIndex):
+        timestamps = epoch_milliseconds(index).astype(np.int64)
+        dates = format_dates(index) if include_dates else None
+    else:
+        timestamps = np.zeros(len(index), dtype=np.int64)
+        dates = [str(value) for value in index] if include_dates else None
+
+    volume = hist['Volume'].to_numpy(dtype=np.float64)
+    columns = {
+        "timestamp": timestamps,
+        "open": round_prices(hist['Open'].to_numpy()),
+        "high": round_prices(hist['High'].to_numpy()),
+        "low": round_prices(hist['Low'].to_numpy()),
+        "close": round_prices(hist['Close'].to_numpy()),
+        "volume": np.where(np.isnan(volume), 0, volume).astype(np.int64)
+    }
+    if dates is not None:
+        columns = {"date": dates, **columns}
+    return columns
+
+
+def chart_points_from_columns(columns: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Zip chart columns back into the row-oriented payload the frontend expects"""
+    return [
+        {
+            "date": date,
+            "timestamp": timestamp,
+            "open": open_price,
+            "high": high,
+            "low": low,
+            "close": close,
+            "volume": vol
+        }
+        for date, timestamp, open_price, high, low, close, vol
+        in zip(columns["date"], columns["timestamp"].tolist(), columns["open"].tolist(),
+               columns["high"].tolist(), columns["low"].tolist(), columns["close"].tolist(),
+               columns["volume"].tolist())
+    ]
+
+
+def build_chart_points(hist: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Build the row-oriented chart payload column-wise
+
+    Produces exactly the same list of dicts as iterating ``hist.iterrows()``
+    and formatting each row, without per-row pandas overhead.
+    """
+    if hist.empty:
+        return []
+    return chart_points_from_columns(build_chart_columns(hist))
@@ -0,0 +1,84 @@
+from typing import Any, Dict, Literal
+import json
+
+import msgpack
+import numpy as np
+import pyarrow as pa
+
+from services.indicators import to_json_values
+
+# Supported values of StockChartRequest.format
+ChartFormat = Literal["rows", "columnar", "arrow", "msgpack"]
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+# Binary encodings ship prices and indicators as float32, counts as int64
+_INT_FIELDS = ("timestamp", "volume")
+_FLOAT_FIELDS = ("open", "high", "low", "close")
+
+
+def flatten_series(series: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Flatten multi-line indicators (``{"bollinger_20": {"upper": ...}}``) to ``bollinger_20.upper``"""
+    flat = {}
+    for key, values in series.items():
+        if isinstance(values, dict):
+            for line, line_values in values.items():
+                flat[f"{key}.{line}"] = line_values
+        else:
+            flat[key] = values
+    return flat
+
+
+def series_to_json(series: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert indicator arrays to rounded JSON lists, keeping multi-line nesting"""
+    return {
+        key: ({line: to_json_values(line_values) for line, line_values in values.items()}
+              if isinstance(values, dict) else to_json_values(values))
+        for key, values in series.items()
+    }
+
+
+def columns_to_json(columns: Dict[str, Any]) -> Dict[str, list]:
+    """One JSON array per chart field"""
+    return {field: values if isinstance(values, list) else values.tolist() for field, values in columns.items()}
+
+
+def encode_arrow(columns: Dict[str, Any], series: Dict[str, Any], summary: Dict[str, Any]) -> bytes:
+    """Encode the chart as a single-batch Arrow IPC stream
+
+    Bars and indicators are columns (NaN becomes null); the scalar summary
+    fields travel as JSON in the schema metadata under ``summary``.
+    """
+    arrays = {field: pa.array(columns[field].astype(np.int64)) for field in _INT_FIELDS}
+    for field in _FLOAT_FIELDS:
+        arrays[field] = pa.array(columns[field].astype(np.float32))
+    for key, values in flatten_series(series).items():
+        arrays[key] = pa.array(np.asarray(values, dtype=np.float32), from_pandas=True)
+
+    table = pa.table(arrays).replace_schema_metadata({"summary": json.dumps(summary)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encode_msgpack(columns: Dict[str, Any], series: Dict[str, Any], summary: Dict[str, Any]) -> bytes:
+    """Encode the chart as MessagePack with raw little-endian column buffers
+
+    ``columns`` maps each field to its bytes and ``dtypes`` gives the NumPy
+    dtype needed to read it back (``<i8`` or ``<f4``; NaN marks gaps).
+    """
+    buffers = {}
+    dtypes = {}
+    for field in _INT_FIELDS:
+        buffers[field] = columns[field].astype("<i8").tobytes()
+        dtypes[field] = "<i8"
+    for field in _FLOAT_FIELDS:
+        buffers[field] = columns[field].astype("<f4").tobytes()
+        dtypes[field] = "<f4"
+    for key, values in flatten_series(series).items():
+        buffers[key] = np.asarray(values, dtype="<f4").tobytes()
+        dtypes[key] = "<f4"
+
+    return msgpack.packb({**summary, "columns": buffers, "dtypes": dtypes}, use_bin_type=True)
@@ -0,0 +1,120 @@
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from services.metrics import register_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+DEFAULT_MAX_ENTRIES = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS completions_last_used ON completions (last_used_at);
+"""
+
+
+def completion_key(model: str, messages: List[Dict[str, Any]], params: Dict[str, Any]) -> str:
+    """Content address of a completion request: sha256 over model, messages and params"""
+    payload = json.dumps({"model": model, "messages": messages, "params": params},
+                         sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """SQLite-backed cache of chat completion text keyed by ``completion_key``
+
+    Entries expire ``ttl_seconds`` after they were created; beyond
+    ``max_entries`` the least recently used are evicted.
+    """
+
+    def __init__(self, path: str = "data/completions.sqlite3",
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(_SCHEMA)
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached completion text, or None when missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT content, created_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] >= self.ttl_seconds:
+                self.misses += 1
+                return None
+
+            self._connection.execute("UPDATE completions SET last_used_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model: str, content: str):
+        """Store completion text, then drop expired and least recently used entries"""
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO completions (key, model, content, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model, content, now, now)
+            )
+            self._connection.execute("DELETE FROM completions WHERE created_at <= ?", (now - self.ttl_seconds,))
+            self._connection.execute(
+                "DELETE FROM completions WHERE key IN ("
+                "SELECT key FROM completions ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM completions")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for monitoring"""
+        with self._lock:
+            size = self._connection.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "size": size,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
+
+
+# Singleton instance shared by every LLM caller
+_completion_cache = None
+
+
+def get_completion_cache(**kwargs) -> CompletionCache:
+    """Get or create the process-wide completion cache"""
+    global _completion_cache
+    if _completion_cache is None:
+        _completion_cache = CompletionCache(**kwargs)
+        register_cache("llm_completions", _completion_cache.stats)
+    return _completion_cache
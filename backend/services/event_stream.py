@@ -0,0 +1,56 @@
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, Tuple
+import asyncio
+import json
+
+SSE_MEDIA_TYPE = "text/event-stream"
+# Events buffered per connection before the producer waits for the client to catch up
+DEFAULT_MAX_PENDING = 64
+
+# Sent with event streams so proxies neither cache nor buffer them
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """One Server-Sent Events message with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def sse_stream(events: AsyncGenerator[Tuple[str, Dict[str, Any]], None],
+                     heartbeat_seconds: float = 15,
+                     max_pending: int = DEFAULT_MAX_PENDING) -> AsyncIterator[str]:
+    """Encode ``(event, data)`` pairs as SSE, with a comment line during long gaps
+
+    The heartbeat keeps idle proxies and load balancers from closing the
+    connection while an agent is still working.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+    done = object()
+
+    async def pump():
+        try:
+            async for item in events:
+                await queue.put(item)
+        finally:
+            # Run the producer's cleanup now rather than whenever it is garbage collected
+            await events.aclose()
+            # A cancelled pump means the client is gone; nobody is waiting for the sentinel
+            if not asyncio.current_task().cancelling():
+                await queue.put(done)
+
+    task = asyncio.create_task(pump())
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if item is done:
+                break
+            yield sse_event(*item)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
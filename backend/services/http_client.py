@@ -0,0 +1,118 @@
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import logging
+
+import aiohttp
+
+from services.metrics import register_cache, track_upstream
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; StockGPT/2.0)",
+    "Accept": "text/html,application/xhtml+xml",
+}
+
+
+class _CachedResponse:
+    __slots__ = ("etag", "last_modified", "parsed")
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], parsed: Any):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.parsed = parsed
+
+
+class HttpClient:
+    """Application-wide pooled aiohttp session for scraping
+
+    ``get_parsed`` sends conditional requests (If-None-Match /
+    If-Modified-Since) using the validators from the last 200 response, and
+    on a 304 returns what was parsed then instead of downloading and parsing
+    the page again.
+    """
+
+    def __init__(self, max_connections: int = 20, max_connections_per_host: int = 4,
+                 timeout_seconds: float = 10):
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout_seconds = timeout_seconds
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._responses: Dict[str, _CachedResponse] = {}
+
+        self.not_modified = 0
+        self.downloads = 0
+
+    def session(self) -> aiohttp.ClientSession:
+        """The shared session, created on first use in the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.max_connections,
+                                             limit_per_host=self.max_connections_per_host,
+                                             ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, headers=DEFAULT_HEADERS,
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout_seconds))
+            self._session_loop = loop
+        return self._session
+
+    async def get_parsed(self, url: str, parse: Callable[[str], Any], upstream: str = "web") -> Optional[Any]:
+        """Fetch a page and return ``parse(html)``, reusing the cached result on 304
+
+        Parsing runs in a worker thread. Returns None for other non-200 responses.
+        """
+        cached = self._responses.get(url)
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        with track_upstream(upstream, url):
+            async with self.session().get(url, headers=headers) as response:
+                if response.status == 304 and cached is not None:
+                    self.not_modified += 1
+                    return cached.parsed
+                if response.status != 200:
+                    logger.debug(f"GET {url} returned {response.status}")
+                    return None
+                html = await response.text()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+
+        self.downloads += 1
+        parsed = await asyncio.to_thread(parse, html)
+        if etag or last_modified:
+            self._responses[url] = _CachedResponse(etag, last_modified, parsed)
+        else:
+            self._responses.pop(url, None)
+        return parsed
+
+    def stats(self) -> Dict[str, Any]:
+        """Return revalidation counters for monitoring"""
+        requests = self.not_modified + self.downloads
+        return {
+            "size": len(self._responses),
+            "hits": self.not_modified,
+            "misses": self.downloads,
+            "hit_ratio": self.not_modified / requests if requests else 0.0
+        }
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# Singleton instance shared by every agent
+_http_client = None
+
+
+def get_http_client(**kwargs) -> HttpClient:
+    """Get or create the process-wide HTTP client"""
+    global _http_client
+    if _http_client is None:
+        _http_client = HttpClient(**kwargs)
+        register_cache("http_responses", _http_client.stats)
+    return _http_client
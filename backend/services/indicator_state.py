@@ -0,0 +1,287 @@
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+import math
+
+import numpy as np
+
+from services.market_data import HistoryBatch
+from services.screener import momentum_score
+
+NAN = float("nan")
+DEFAULT_MAX_SYMBOLS = 5000
+# Bars needed before a symbol is scored (the SMA50 window)
+MIN_BARS = 50
+
+
+class RollingWindow:
+    """Mean of the last ``period`` values, updated in O(1) per value
+
+    The newest value can be revised in place, which is how an intraday bar
+    that is still forming gets updated. NaN values are counted rather than
+    summed, so the mean is NaN while one is in the window (as with
+    ``indicators.sma``). The sum is recomputed from the buffer once per
+    ``period`` values so floating point error cannot build up.
+    """
+
+    __slots__ = ("period", "values", "index", "count", "total", "nans")
+
+    def __init__(self, period: int):
+        self.period = period
+        self.values = [0.0] * period
+        self.index = 0
+        self.count = 0
+        self.total = 0.0
+        self.nans = 0
+
+    def _add(self, value: float, sign: int):
+        if math.isnan(value):
+            self.nans += sign
+        else:
+            self.total += sign * value
+
+    def push(self, value: float):
+        if self.count == self.period:
+            self._add(self.values[self.index], -1)
+        else:
+            self.count += 1
+        self.values[self.index] = value
+        self._add(value, 1)
+        self.index = (self.index + 1) % self.period
+        if self.index == 0:
+            self.total = sum(v for v in self.values if not math.isnan(v))
+
+    def revise(self, value: float):
+        """Replace the newest value"""
+        newest = (self.index - 1) % self.period
+        self._add(self.values[newest], -1)
+        self.values[newest] = value
+        self._add(value, 1)
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.period
+
+    @property
+    def mean(self) -> float:
+        if not self.full or self.nans:
+            return NAN
+        return self.total / self.period
+
+    @property
+    def oldest(self) -> float:
+        """The value ``period - 1`` pushes ago (e.g. the close 20 bars back for a 20-bar window)"""
+        return self.values[self.index] if self.full else NAN
+
+
+class RollingRSI:
+    """RSI over the last ``period`` price changes, updated in O(1) per bar
+
+    Uses the simple averages of gains and losses that ``indicators.rsi`` and
+    the screener use, including counting the first (undefined) change as zero,
+    so incremental and batch scores agree.
+    """
+
+    __slots__ = ("gains", "losses", "previous_close", "last_close")
+
+    def __init__(self, period: int = 14):
+        self.gains = RollingWindow(period)
+        self.losses = RollingWindow(period)
+        self.previous_close: Optional[float] = None
+        self.last_close: Optional[float] = None
+
+    def push(self, close: float):
+        self.previous_close, self.last_close = self.last_close, close
+        delta = 0.0 if self.previous_close is None else close - self.previous_close
+        self.gains.push(max(delta, 0.0))
+        self.losses.push(max(-delta, 0.0))
+
+    def revise(self, close: float):
+        """Replace the newest close"""
+        self.last_close = close
+        delta = 0.0 if self.previous_close is None else close - self.previous_close
+        self.gains.revise(max(delta, 0.0))
+        self.losses.revise(max(-delta, 0.0))
+
+    @property
+    def value(self) -> float:
+        if not self.gains.full:
+            return NAN
+        avg_gain, avg_loss = self.gains.mean, self.losses.mean
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else NAN
+        return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+class MomentumState:
+    """Running inputs to the momentum score for one symbol
+
+    ``update`` takes one daily bar: a bar for the last seen date revises it
+    (the session is still trading), a later one is appended.
+    """
+
+    __slots__ = ("close_20", "close_50", "volume_20", "volume_5", "rsi", "previous_timestamp", "last_timestamp",
+                 "bars")
+
+    def __init__(self):
+        self.close_20 = RollingWindow(20)
+        self.close_50 = RollingWindow(50)
+        self.volume_20 = RollingWindow(20)
+        self.volume_5 = RollingWindow(5)
+        self.rsi = RollingRSI(14)
+        self.previous_timestamp: Optional[int] = None
+        self.last_timestamp: Optional[int] = None
+        self.bars = 0
+
+    def update(self, timestamp: int, close: float, volume: float):
+        if self.last_timestamp is not None and timestamp < self.last_timestamp:
+            return
+        revise = timestamp == self.last_timestamp
+        for window, value in ((self.close_20, close), (self.close_50, close), (self.volume_20, volume),
+                              (self.volume_5, volume), (self.rsi, close)):
+            if revise:
+                window.revise(value)
+            else:
+                window.push(value)
+        if not revise:
+            self.bars += 1
+            self.previous_timestamp, self.last_timestamp = self.last_timestamp, timestamp
+
+    @property
+    def ready(self) -> bool:
+        return self.bars >= MIN_BARS
+
+    def features(self) -> Dict[str, Any]:
+        """The screener's feature columns for this symbol (only ``bars`` and a score of 0 until ready)"""
+        if not self.ready:
+            return {"bars": self.bars, "momentum_score": 0}
+
+        current_price = self.rsi.last_close
+        sma_20, sma_50 = self.close_20.mean, self.close_50.mean
+        price_momentum = (current_price - self.close_20.oldest) / self.close_20.oldest * 100
+        recent_volume, average_volume = self.volume_5.mean, self.volume_20.mean
+        if average_volume:
+            volume_ratio = recent_volume / average_volume
+        else:
+            volume_ratio = math.inf if recent_volume > 0 else NAN
+        rsi = self.rsi.value
+        return {
+            "current_price": current_price,
+            "sma_20": sma_20,
+            "sma_50": sma_50,
+            "price_momentum": price_momentum,
+            "recent_volume": recent_volume,
+            "average_volume": average_volume,
+            "volume_ratio": volume_ratio,
+            "rsi": rsi,
+            "bars": self.bars,
+            "momentum_score": int(momentum_score(current_price, sma_20, sma_50, price_momentum, volume_ratio, rsi))
+        }
+
+
+class IndicatorStateStore:
+    """Per-symbol momentum state kept between analysis runs
+
+    A symbol is seeded once from its full history; after that each run only
+    needs the last few bars, which advance the state in O(1) per bar instead
+    of recomputing every rolling window. Least recently used symbols are
+    dropped beyond ``max_symbols``.
+    """
+
+    def __init__(self, max_symbols: int = DEFAULT_MAX_SYMBOLS):
+        self.max_symbols = max_symbols
+        self._states: "OrderedDict[str, MomentumState]" = OrderedDict()
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._states
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def get(self, symbol: str) -> Optional[MomentumState]:
+        state = self._states.get(symbol)
+        if state is not None:
+            self._states.move_to_end(symbol)
+        return state
+
+    def seed(self, history: HistoryBatch):
+        """Replace the state of every symbol in a batch with one built from its full history"""
+        for symbol, timestamps, closes, volumes in self._columns(history):
+            if not timestamps:
+                continue
+            state = MomentumState()
+            for timestamp, close, volume in zip(timestamps, closes, volumes):
+                state.update(timestamp, close, volume)
+            self._states[symbol] = state
+            self._states.move_to_end(symbol)
+        while len(self._states) > self.max_symbols:
+            self._states.popitem(last=False)
+
+    def advance(self, history: HistoryBatch, symbols: Iterable[str]) -> List[str]:
+        """Apply recent bars to existing states; return the symbols that need seeding instead
+
+        A symbol needs seeding when it has no state, is missing from the
+        batch, the batch starts after its last stored bar (bars would be
+        skipped), or its history was re-adjusted (split, dividend).
+        """
+        advanced = set()
+        for symbol, timestamps, closes, volumes in self._columns(history):
+            state = self._states.get(symbol)
+            if state is None or not timestamps or timestamps[0] > state.last_timestamp:
+                continue
+            if self._readjusted(state, timestamps, closes):
+                continue
+            for timestamp, close, volume in zip(timestamps, closes, volumes):
+                state.update(timestamp, close, volume)
+            advanced.add(symbol)
+        return [symbol for symbol in symbols if symbol not in advanced]
+
+    @staticmethod
+    def _readjusted(state: MomentumState, timestamps: List[int], closes: List[float]) -> bool:
+        """Whether the batch disagrees with the state's last settled close
+
+        Closes are split and dividend adjusted, so a corporate action changes
+        every earlier bar. The newest stored bar may have been a session still
+        trading, so the bar before it is compared instead.
+        """
+        if state.previous_timestamp is None or state.rsi.previous_close is None:
+            return False
+        try:
+            index = timestamps.index(state.previous_timestamp)
+        except ValueError:
+            return False
+        return not math.isclose(closes[index], state.rsi.previous_close, rel_tol=1e-6)
+
+    @staticmethod
+    def _columns(history: HistoryBatch):
+        """``(symbol, timestamps, closes, volumes)`` per symbol, as plain lists without the NaN-close rows"""
+        close = history.field("Close")
+        if close.empty:
+            return
+        volume = history.field("Volume").reindex(index=close.index, columns=close.columns)
+        timestamps = close.index.asi8
+        close_values = close.to_numpy(dtype=np.float64)
+        volume_values = volume.to_numpy(dtype=np.float64)
+        valid = ~np.isnan(close_values)
+        complete = valid.all(axis=0)
+        all_timestamps = timestamps.tolist()
+        # Converting whole matrices at once is far cheaper than per-column numpy indexing
+        for column, (symbol, closes, volumes) in enumerate(zip(close.columns, close_values.T.tolist(),
+                                                               volume_values.T.tolist())):
+            if complete[column]:
+                yield symbol, all_timestamps, closes, volumes
+            else:
+                rows = np.flatnonzero(valid[:, column])
+                yield (symbol, timestamps[rows].tolist(), close_values[rows, column].tolist(),
+                       volume_values[rows, column].tolist())
+
+
+# Singleton instance shared by every agent
+_indicator_state_store = None
+
+
+def get_indicator_state_store(**kwargs) -> IndicatorStateStore:
+    """Get or create the process-wide indicator state store"""
+    global _indicator_state_store
+    if _indicator_state_store is None:
+        _indicator_state_store = IndicatorStateStore(**kwargs)
+    return _indicator_state_store
@@ -0,0 +1,183 @@
+from typing import Any, Dict, List, Optional, Tuple
+import re
+
+import numpy as np
+import pandas as pd
+
+from services.chart_data import round_prices
+
+# Default period for each indicator when a spec omits it (e.g. "rsi" -> "rsi_14")
+DEFAULT_PERIODS = {
+    "sma": 20,
+    "ema": 20,
+    "bollinger": 20,
+    "rsi": 14,
+}
+
+SUPPORTED_INDICATORS = ("sma", "ema", "bollinger", "rsi", "macd", "vwap")
+
+
+def _as_float_array(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+
+def _window_sums(values: np.ndarray, period: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Sum and NaN count of every trailing window of ``period`` values, via cumulative sums"""
+    nan_mask = np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(nan_mask, 0.0, values))))
+    nans = np.concatenate(([0], np.cumsum(nan_mask)))
+    return sums[period:] - sums[:-period], nans[period:] - nans[:-period]
+
+
+def sma(values, period: int) -> np.ndarray:
+    """Simple moving average in O(n); NaN until a full window is available"""
+    values = _as_float_array(values)
+    result = np.full(len(values), np.nan)
+    if period <= 0 or len(values) < period:
+        return result
+
+    window_sum, window_nans = _window_sums(values, period)
+    result[period - 1:] = np.where(window_nans > 0, np.nan, window_sum / period)
+    return result
+
+
+def ema(values, period: int) -> np.ndarray:
+    """Exponential moving average (span ``period``); NaN until ``period`` values are seen"""
+    values = _as_float_array(values)
+    if len(values) == 0:
+        return values
+    return pd.Series(values).ewm(span=period, adjust=False, min_periods=period).mean().to_numpy()
+
+
+def bollinger(values, period: int = 20, num_std: float = 2.0) -> Dict[str, np.ndarray]:
+    """Bollinger bands: SMA plus/minus ``num_std`` population standard deviations"""
+    values = _as_float_array(values)
+    middle = sma(values, period)
+    upper = np.full(len(values), np.nan)
+    lower = np.full(len(values), np.nan)
+    if len(values) < period:
+        return {"middle": middle, "upper": upper, "lower": lower}
+
+    # Centre the series first so the sum-of-squares identity does not lose precision
+    centred = values - np.nanmean(values)
+    window_sum, window_nans = _window_sums(centred, period)
+    window_sq_sum, _ = _window_sums(centred * centred, period)
+    mean = window_sum / period
+    variance = np.maximum(window_sq_sum / period - mean * mean, 0.0)
+    std = np.where(window_nans > 0, np.nan, np.sqrt(variance))
+
+    upper[period - 1:] = middle[period - 1:] + num_std * std
+    lower[period - 1:] = middle[period - 1:] - num_std * std
+    return {"middle": middle, "upper": upper, "lower": lower}
+
+
+def rsi(values, period: int = 14) -> np.ndarray:
+    """Relative Strength Index using simple averages of gains and losses
+
+    Matches the pandas ``rolling(period).mean()`` formulation the agents used,
+    including treating the first (undefined) price change as zero.
+    """
+    values = _as_float_array(values)
+    if len(values) == 0:
+        return values
+
+    delta = np.concatenate(([np.nan], np.diff(values)))
+    gains = np.where(delta > 0, delta, 0.0)
+    losses = np.where(delta < 0, -delta, 0.0)
+
+    avg_gain = sma(gains, period)
+    avg_loss = sma(losses, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+def macd(values, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+    """MACD line, signal line and histogram"""
+    values = _as_float_array(values)
+    macd_line = ema(values, fast) - ema(values, slow)
+
+    # The signal line starts once the MACD line itself is defined
+    signal_line = np.full(len(values), np.nan)
+    valid = np.flatnonzero(~np.isnan(macd_line))
+    if len(valid):
+        signal_line[valid[0]:] = ema(macd_line[valid[0]:], signal)
+
+    return {"macd": macd_line, "signal": signal_line, "histogram": macd_line - signal_line}
+
+
+def vwap(high, low, close, volume, sessions: Optional[np.ndarray] = None) -> np.ndarray:
+    """Volume-weighted average price of the typical price
+
+    When ``sessions`` labels each bar (e.g. with its trading date) the
+    average resets at the start of every session, as intraday VWAP does.
+    """
+    typical = (_as_float_array(high) + _as_float_array(low) + _as_float_array(close)) / 3
+    volume = np.nan_to_num(_as_float_array(volume))
+    price_volume = np.cumsum(np.nan_to_num(typical) * volume)
+    cumulative_volume = np.cumsum(volume)
+
+    if sessions is not None and len(sessions):
+        sessions = np.asarray(sessions)
+        starts = np.concatenate(([True], sessions[1:] != sessions[:-1]))
+        start_index = np.maximum.accumulate(np.where(starts, np.arange(len(sessions)), 0))
+        price_volume_before = np.concatenate(([0.0], price_volume))[start_index]
+        volume_before = np.concatenate(([0.0], cumulative_volume))[start_index]
+        price_volume = price_volume - price_volume_before
+        cumulative_volume = cumulative_volume - volume_before
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(cumulative_volume > 0, price_volume / cumulative_volume, np.nan)
+
+
+def parse_indicator_spec(spec: str) -> Tuple[str, Optional[int]]:
+    """Split an indicator spec such as ``rsi_14`` or ``macd`` into name and period"""
+    match = re.fullmatch(r"([a-z]+)(?:_(\d+))?", spec.strip().lower())
+    if not match or match.group(1) not in SUPPORTED_INDICATORS:
+        raise ValueError(f"Unsupported indicator: {spec}")
+    name = match.group(1)
+    period = int(match.group(2)) if match.group(2) else DEFAULT_PERIODS.get(name)
+    if period is not None and period < 1:
+        raise ValueError(f"Unsupported indicator: {spec}")
+    return name, period
+
+
+def compute_indicators(frame: pd.DataFrame, specs: List[str]) -> Dict[str, Any]:
+    """Compute the requested indicators over an OHLCV frame
+
+    Returns NumPy arrays keyed by the normalised spec (``rsi_14``, ``macd``);
+    multi-line indicators return a dict of arrays.
+    """
+    close = frame["Close"].to_numpy(dtype=np.float64)
+    results: Dict[str, Any] = {}
+
+    for spec in specs:
+        name, period = parse_indicator_spec(spec)
+        key = f"{name}_{period}" if period else name
+
+        if name == "sma":
+            results[key] = sma(close, period)
+        elif name == "ema":
+            results[key] = ema(close, period)
+        elif name == "bollinger":
+            results[key] = bollinger(close, period)
+        elif name == "rsi":
+            results[key] = rsi(close, period)
+        elif name == "macd":
+            results[key] = macd(close)
+        elif name == "vwap":
+            # Intraday bars share a trading date; anchor VWAP to each session
+            sessions = None
+            if isinstance(frame.index, pd.DatetimeIndex):
+                dates = frame.index.normalize()
+                if dates.has_duplicates:
+                    sessions = dates.asi8
+            results[key] = vwap(frame["High"], frame["Low"], close, frame["Volume"], sessions)
+
+    return results
+
+
+def to_json_values(values: np.ndarray, decimals: int = 2) -> List[Optional[float]]:
+    """Round an indicator series for JSON, with None in place of NaN"""
+    rounded = round_prices(values, decimals)
+    return [None if np.isnan(value) else value for value in rounded.tolist()]
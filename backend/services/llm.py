@@ -0,0 +1,142 @@
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import random
+
+import httpx
+import openai
+
+from services.completion_cache import completion_key, get_completion_cache
+from services.metrics import UPSTREAM_RETRIES, track_upstream
+
+logger = logging.getLogger(__name__)
+
+
+def create_openai_client(api_key: str, base_url: Optional[str] = None,
+                         max_connections: int = 20, max_keepalive_connections: int = 10,
+                         keepalive_expiry: float = 30.0, timeout_seconds: float = 60.0) -> openai.AsyncOpenAI:
+    """Async OpenAI client on one pooled, keep-alive HTTP connection pool
+
+    SDK-level retries are disabled; ``chat_completion`` applies the shared
+    ``LLMPolicy`` instead. ``base_url`` points the client at a local stub
+    server (see ``benchmarks/openai_stub.py``) or another compatible endpoint.
+    """
+    http_client = openai.DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+    )
+    return openai.AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client,
+                              timeout=timeout_seconds, max_retries=0)
+
+
+class LLMPolicy:
+    """Retry, backoff and concurrency limits shared by every completion"""
+
+    def __init__(self, max_concurrency: int = 8, max_retries: int = 4,
+                 backoff_base: float = 0.5, backoff_cap: float = 20.0):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._limiters: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+    def limiter(self) -> asyncio.Semaphore:
+        """Concurrency limiter for the running event loop"""
+        loop = asyncio.get_running_loop()
+        limiter = self._limiters.get(loop)
+        if limiter is None:
+            # Drop limiters of closed loops (e.g. from earlier asyncio.run calls)
+            self._limiters = {other: sem for other, sem in self._limiters.items() if not other.is_closed()}
+            limiter = self._limiters[loop] = asyncio.Semaphore(self.max_concurrency)
+        return limiter
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """Rate limits, server errors, timeouts and dropped connections are worth retrying"""
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code == 429 or error.status_code >= 500
+        return isinstance(error, (openai.APIConnectionError, openai.APITimeoutError))
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        """Seconds to wait before retry ``attempt`` (0-based): full jitter, or Retry-After if given"""
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                retry_after = None
+        if retry_after is not None:
+            return min(retry_after, self.backoff_cap)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+
+# Singleton policy shared by every agent
+_llm_policy = None
+
+
+def get_llm_policy(**kwargs) -> LLMPolicy:
+    """Get or create the process-wide LLM retry/concurrency policy"""
+    global _llm_policy
+    if _llm_policy is None:
+        _llm_policy = LLMPolicy(**kwargs)
+    return _llm_policy
+
+
+async def _create_completion(client, model: str, messages: List[Dict[str, Any]], **params):
+    if isinstance(client, openai.AsyncOpenAI):
+        return await client.chat.completions.create(model=model, messages=messages, **params)
+    # Synchronous clients still work, at the cost of a worker thread per call
+    return await asyncio.to_thread(client.chat.completions.create, model=model, messages=messages, **params)
+
+
+def strip_code_fence(text: str) -> str:
+    """Remove a surrounding ```json ... ``` fence, which models often add"""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    return text.strip()
+
+
+async def chat_completion(client, model: str, messages: List[Dict[str, Any]],
+                          use_cache: bool = True, **params) -> str:
+    """Run one chat completion and return the message text
+
+    Identical requests (same model, messages and params) are answered from the
+    on-disk completion cache; pass ``use_cache=False`` to always call the API.
+    Calls share the ``LLMPolicy`` concurrency limit and are retried with
+    jittered backoff on 429s, 5xx responses and connection errors.
+    """
+    cache = get_completion_cache() if use_cache else None
+    key = completion_key(model, messages, params) if cache else None
+    if cache:
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            return cached
+
+    policy = get_llm_policy()
+    attempt = 0
+    while True:
+        try:
+            async with policy.limiter():
+                with track_upstream("openai", model):
+                    response = await _create_completion(client, model, messages, **params)
+            break
+        except Exception as e:
+            if attempt >= policy.max_retries or not policy.is_retryable(e):
+                raise
+            delay = policy.backoff(attempt, e)
+            attempt += 1
+            UPSTREAM_RETRIES.inc(upstream="openai", operation=model)
+            logger.warning(f"OpenAI call failed ({type(e).__name__}); retry {attempt}/{policy.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    content = response.choices[0].message.content
+
+    if cache and content is not None:
+        await asyncio.to_thread(cache.put, key, model, content)
+    return content
@@ -0,0 +1,201 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, TypeVar
+import asyncio
+import functools
+import logging
+import re
+
+import pandas as pd
+import yfinance as yf
+
+from services.metrics import track_upstream
+from services.reference_data import get_reference_data_cache
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_MAX_CONCURRENCY = 8
+
+OHLCV_FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def _period_offset(period: str) -> Optional[pd.DateOffset]:
+    """Translate a yfinance period string (``1mo``, ``3mo``, ``1y``) into a date offset"""
+    match = re.fullmatch(r"(\d+)(mo|y|wk)", period)
+    if not match:
+        return None
+    amount, unit = int(match.group(1)), match.group(2)
+    if unit == "mo":
+        return pd.DateOffset(months=amount)
+    if unit == "y":
+        return pd.DateOffset(years=amount)
+    return pd.DateOffset(weeks=amount)
+
+
+class HistoryBatch:
+    """Aligned (date x symbol) OHLCV frame fetched in one bulk download
+
+    Columns are a ``(field, symbol)`` MultiIndex as returned by ``yf.download``.
+    Symbols that trade on different calendars are NaN on the dates they miss,
+    so per-symbol slices drop those rows.
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+
+    @property
+    def symbols(self) -> List[str]:
+        """Symbols that came back with at least one bar"""
+        if self.frame.empty:
+            return []
+        close = self.frame["Close"]
+        return [symbol for symbol in close.columns if close[symbol].notna().any()]
+
+    def field(self, name: str) -> pd.DataFrame:
+        """Return one field (e.g. ``Close``) as a date x symbol frame"""
+        if self.frame.empty:
+            return pd.DataFrame()
+        return self.frame[name]
+
+    def for_symbol(self, symbol: str, period: Optional[str] = None) -> pd.DataFrame:
+        """Return a single-symbol OHLCV frame, optionally trimmed to a trailing period
+
+        The result has the same columns as ``Ticker.history`` so existing
+        analysis code can consume it unchanged.
+        """
+        if self.frame.empty or symbol not in self.frame.columns.get_level_values(1):
+            return pd.DataFrame(columns=OHLCV_FIELDS)
+
+        hist = self.frame.xs(symbol, axis=1, level=1)
+        hist = hist[[field for field in OHLCV_FIELDS if field in hist.columns]]
+        hist = hist.dropna(subset=["Close"])
+
+        if period and not hist.empty:
+            if period.endswith("d") and period[:-1].isdigit():
+                hist = hist.iloc[-int(period[:-1]):]
+            else:
+                offset = _period_offset(period)
+                if offset is not None:
+                    hist = hist[hist.index > hist.index[-1] - offset]
+
+        return hist
+
+
+def download_history(symbols: Iterable[str], period: str = "3mo", interval: str = "1d") -> HistoryBatch:
+    """Fetch OHLCV history for many symbols in one batched, threaded download"""
+    unique_symbols = list(dict.fromkeys(symbol for symbol in symbols if symbol))
+    if not unique_symbols:
+        return HistoryBatch(pd.DataFrame())
+
+    with track_upstream("yfinance", "download"):
+        frame = yf.download(
+            tickers=unique_symbols,
+            period=period,
+            interval=interval,
+            group_by="column",
+            auto_adjust=True,
+            threads=True,
+            progress=False
+        )
+
+    if frame is None or frame.empty:
+        logger.warning(f"Bulk history download returned no data for {len(unique_symbols)} symbols")
+        return HistoryBatch(pd.DataFrame())
+
+    # Older yfinance releases return flat columns for a single ticker
+    if not isinstance(frame.columns, pd.MultiIndex):
+        frame.columns = pd.MultiIndex.from_product([frame.columns, unique_symbols[:1]])
+
+    logger.info(f"Downloaded {period} history for {len(unique_symbols)} symbols in one batch")
+    return HistoryBatch(frame)
+
+
+def _fetch_history(symbol: str, interval: str, **kwargs) -> pd.DataFrame:
+    """Blocking ``Ticker.history`` call for one symbol"""
+    with track_upstream("yfinance", "history"):
+        return yf.Ticker(symbol).history(interval=interval, **kwargs)
+
+
+class MarketDataClient:
+    """Async facade over blocking yfinance calls
+
+    Every Yahoo round trip runs on a dedicated, bounded thread pool so agents
+    never block the event loop, and per-symbol fan-outs are capped by a
+    semaphore so one agent cannot monopolise the pool.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self.reference_data = get_reference_data_cache()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="market-data")
+
+    async def _run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Run a blocking call on the market data thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def history(self, symbol: str, period: Optional[str] = "1mo", interval: str = "1d", **kwargs) -> pd.DataFrame:
+        """Async ``Ticker.history`` for one symbol
+
+        Pass ``period=None`` together with ``start`` to fetch an explicit range.
+        """
+        if period is not None:
+            kwargs["period"] = period
+        return await self._run(_fetch_history, symbol, interval, **kwargs)
+
+    async def info(self, symbol: str, group: str = "quote") -> Dict[str, Any]:
+        """Async ``ticker.info`` read through the shared reference data cache"""
+        return await self._run(self.reference_data.get_info, symbol, group)
+
+    async def download_history(self, symbols: Iterable[str], period: str = "3mo", interval: str = "1d") -> HistoryBatch:
+        """Async bulk history download for many symbols"""
+        return await self._run(download_history, list(symbols), period, interval)
+
+    async def fan_out(self, func: Callable[[str], Awaitable[T]], symbols: Iterable[str],
+                      limit: Optional[int] = None) -> Dict[str, Any]:
+        """Run ``func`` for every symbol with at most ``limit`` calls in flight
+
+        Returns a dict keyed by symbol, in input order. Failed calls hold the
+        raised exception instead of a result.
+        """
+        semaphore = asyncio.Semaphore(limit or self.max_concurrency)
+        unique_symbols = list(dict.fromkeys(symbol for symbol in symbols if symbol))
+
+        async def bounded(symbol: str):
+            async with semaphore:
+                return await func(symbol)
+
+        results = await asyncio.gather(*(bounded(symbol) for symbol in unique_symbols), return_exceptions=True)
+        return dict(zip(unique_symbols, results))
+
+    async def info_many(self, symbols: Iterable[str], group: str = "quote",
+                        limit: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """Fetch ``ticker.info`` for many symbols concurrently, omitting failures"""
+        results = await self.fan_out(lambda symbol: self.info(symbol, group), symbols, limit)
+
+        infos = {}
+        for symbol, result in results.items():
+            if isinstance(result, Exception):
+                logger.debug(f"Failed to fetch info for {symbol}: {result}")
+                continue
+            infos[symbol] = result
+        return infos
+
+    def shutdown(self):
+        """Stop the worker threads"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton instance shared by every agent and endpoint
+_market_data_client = None
+
+
+def get_market_data_client(**kwargs) -> MarketDataClient:
+    """Get or create the process-wide market data client"""
+    global _market_data_client
+    if _market_data_client is None:
+        _market_data_client = MarketDataClient(**kwargs)
+    return _market_data_client
@@ -0,0 +1,255 @@
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+import bisect
+import threading
+import time
+
+# Latency buckets in seconds, from cache hits up to full agent runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+# ``(name, metric_type, documentation, labels, value)`` samples produced by a collector at scrape time
+CollectedSample = Tuple[str, str, str, Dict[str, str], float]
+
+
+class _Metric(ABC):
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self._samples())
+        return lines
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Sample lines for every label set"""
+
+
+class Counter(_Metric):
+    """Monotonically increasing count per label set"""
+
+    metric_type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+                    for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down per label set"""
+
+    metric_type = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        """Increment while the block runs"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+                    for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    """Cumulative bucketed distribution of observations per label set"""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the block takes"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, counts in self._counts.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = f'le="{_format_value(bound)}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+                labels = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(self._sums[key])}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every metric and renders the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[CollectedSample]]] = []
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[CollectedSample]]):
+        """Add a callback yielding ``(name, metric_type, documentation, labels, value)`` samples at scrape time"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+
+        # Several collectors can feed one family (e.g. every cache's hits), so
+        # group their samples by name to emit each HELP/TYPE header once
+        families: Dict[str, Tuple[str, str, List[str]]] = {}
+        for collector in self._collectors:
+            for name, metric_type, documentation, labels, value in collector():
+                family = families.setdefault(name, (metric_type, documentation, []))
+                family[2].append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+
+        for name, (metric_type, documentation, samples) in families.items():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(samples)
+
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry and the metrics every module records into
+registry = MetricsRegistry()
+
+AGENT_EXECUTE_SECONDS = registry.histogram(
+    "stockgpt_agent_execute_seconds", "Latency of BaseAgent.execute by agent and outcome", ["agent", "status"]
+)
+UPSTREAM_REQUESTS = registry.counter(
+    "stockgpt_upstream_requests_total", "Calls to upstream services by outcome", ["upstream", "operation", "outcome"]
+)
+UPSTREAM_RETRIES = registry.counter(
+    "stockgpt_upstream_retries_total", "Upstream calls retried after a retryable failure", ["upstream", "operation"]
+)
+UPSTREAM_SECONDS = registry.histogram(
+    "stockgpt_upstream_request_seconds", "Latency of upstream calls", ["upstream", "operation"]
+)
+REASONING_SECONDS = registry.histogram(
+    "stockgpt_reasoning_seconds", "Time to generate AI reasoning for all recommended stocks", ["strategy"]
+)
+HTTP_REQUESTS_IN_FLIGHT = registry.gauge(
+    "stockgpt_http_requests_in_flight", "HTTP requests currently being served", ["route"]
+)
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "stockgpt_http_request_seconds", "Latency of HTTP requests", ["route", "method", "status"]
+)
+
+
+@contextmanager
+def track_upstream(upstream: str, operation: str):
+    """Count and time one upstream call, recording whether it raised"""
+    start = time.perf_counter()
+    outcome = "success"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start, upstream=upstream, operation=operation)
+        UPSTREAM_REQUESTS.inc(upstream=upstream, operation=operation, outcome=outcome)
+
+
+def register_cache(name: str, stats: Callable[[], Dict[str, float]]):
+    """Export a cache's ``stats()``: hits and misses as counters, size and hit ratio as gauges"""
+    def collect():
+        cache_stats = stats()
+        for field in ("hits", "misses"):
+            if field in cache_stats:
+                yield (f"stockgpt_cache_{field}_total", "counter", f"Cache {field}", {"cache": name},
+                       cache_stats[field])
+        if "size" in cache_stats:
+            yield ("stockgpt_cache_size", "gauge", "Cache size", {"cache": name}, cache_stats["size"])
+        if "hit_ratio" in cache_stats:
+            yield ("stockgpt_cache_hit_ratio", "gauge", "Fraction of lookups served from cache", {"cache": name},
+                   cache_stats["hit_ratio"])
+
+    registry.register_collector(collect)
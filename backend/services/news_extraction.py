@@ -0,0 +1,164 @@
+from typing import Dict, List, Optional
+from datetime import datetime
+from urllib.parse import urlparse
+import re
+
+import lxml.html
+from lxml import etree
+
+# EXSLT regular expressions, for the generic class-name pattern
+_NAMESPACES = {"re": "http://exslt.org/regular-expressions"}
+
+_TICKER_PATTERN = re.compile(r"\b[A-Z]{2,5}\b")
+
+
+def _has_class(name: str) -> str:
+    """XPath predicate matching one whole token of the class attribute"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+class SelectorProfile:
+    """XPath selectors for the article list of one site
+
+    ``article`` selects the article nodes; ``title``, ``summary`` and ``link``
+    are evaluated relative to each of them. Without a ``link`` selector the
+    href of the title element is used when the title is a link.
+    """
+
+    __slots__ = ("name", "article", "title", "summary", "link")
+
+    def __init__(self, name: str, article: str, title: str,
+                 summary: Optional[str] = None, link: Optional[str] = None):
+        self.name = name
+        self.article = etree.XPath(article, namespaces=_NAMESPACES)
+        self.title = etree.XPath(title, namespaces=_NAMESPACES)
+        self.summary = etree.XPath(summary, namespaces=_NAMESPACES) if summary else None
+        self.link = etree.XPath(link, namespaces=_NAMESPACES) if link else None
+
+
+# The pattern every source used before per-site profiles: any article/div whose
+# class mentions story/article/news/headline, its first heading or link as title
+GENERIC_PROFILE = SelectorProfile(
+    "generic",
+    article="//*[self::article or self::div][re:test(@class, 'story|article|news|headline')]",
+    title="(.//*[self::h1 or self::h2 or self::h3 or self::a])[1]",
+    summary="(.//*[self::p or self::div][re:test(@class, 'summary|excerpt|description')])[1]"
+)
+
+# Per-site profiles, keyed by host; a page they find nothing on falls back to GENERIC_PROFILE
+NEWS_PROFILES: Dict[str, SelectorProfile] = {
+    "finance.yahoo.com": SelectorProfile(
+        "yahoo",
+        article=f"//li[{_has_class('stream-item')}]",
+        title="(.//h3)[1]",
+        summary="(.//p)[1]",
+        link="(.//a[@href])[1]/@href"
+    ),
+    "www.marketwatch.com": SelectorProfile(
+        "marketwatch",
+        article=f"//div[{_has_class('article__content')}]",
+        title=f"(.//h3[{_has_class('article__headline')}])[1]",
+        summary=f"(.//p[{_has_class('article__summary')}])[1]",
+        link=f"(.//h3[{_has_class('article__headline')}]//a/@href)[1]"
+    ),
+    "www.cnbc.com": SelectorProfile(
+        "cnbc",
+        article=f"//div[{_has_class('Card-textContent')}]",
+        title=f"(.//a[{_has_class('Card-title')}])[1]",
+        link=f"(.//a[{_has_class('Card-title')}]/@href)[1]"
+    ),
+}
+
+# Symbol cells of the Yahoo earnings calendar table
+CALENDAR_SYMBOLS = etree.XPath("//table//tr/td[1]//a/text()")
+
+
+def _parse(html: str):
+    try:
+        return lxml.html.fromstring(html)
+    except ValueError:
+        # lxml refuses str input that carries an XML encoding declaration
+        return lxml.html.fromstring(html.encode("utf-8"))
+
+
+def _text(element) -> str:
+    """Element text with whitespace runs collapsed to one space
+
+    BeautifulSoup's ``get_text(strip=True)`` stripped each text node and
+    glued them together, so ``Fed <b>holds</b> rates`` read ``Fedholdsrates``;
+    here it reads ``Fed holds rates``. Text in a single node is unchanged
+    apart from repeated or surrounding whitespace.
+    """
+    return " ".join(element.text_content().split())
+
+
+def _first(results) -> Optional[object]:
+    return results[0] if results else None
+
+
+def profile_for(url: str) -> Optional[SelectorProfile]:
+    """Site profile for a news URL, if there is one"""
+    return NEWS_PROFILES.get(urlparse(url).netloc)
+
+
+def _apply_profile(document, profile: SelectorProfile, url: str, limit: int) -> List[Dict[str, str]]:
+    articles = []
+    for node in profile.article(document)[:limit]:
+        title_elem = _first(profile.title(node))
+        if title_elem is None:
+            continue
+        title = _text(title_elem)
+
+        if profile.link is not None:
+            link = str(_first(profile.link(node)) or "")
+        else:
+            link = title_elem.get("href", "") if title_elem.tag == "a" else ""
+
+        summary_elem = _first(profile.summary(node)) if profile.summary is not None else None
+        summary = _text(summary_elem) if summary_elem is not None else ""
+
+        if title and len(title) > 10:
+            articles.append({
+                'title': title,
+                'summary': summary,
+                'link': link,
+                'source': url,
+                'timestamp': datetime.now().isoformat()
+            })
+    return articles
+
+
+def extract_articles(html: str, url: str, limit: int = 10) -> List[Dict[str, str]]:
+    """Article titles, summaries and links from a news page
+
+    Uses the site profile for ``url`` when there is one and it matches,
+    otherwise the generic class-name pattern. At most ``limit`` article nodes
+    are considered.
+    """
+    if not html or not html.strip():
+        return []
+    document = _parse(html)
+
+    profile = profile_for(url)
+    if profile is not None:
+        articles = _apply_profile(document, profile, url, limit)
+        if articles:
+            return articles
+    return _apply_profile(document, GENERIC_PROFILE, url, limit)
+
+
+def extract_calendar_symbols(html: str) -> List[str]:
+    """Ticker symbols listed on the earnings calendar page, in page order
+
+    Reads the symbol column of the calendar table; if the layout is not
+    recognised, falls back to every 2-5 letter uppercase word in the page text.
+    """
+    if not html or not html.strip():
+        return []
+    document = _parse(html)
+
+    symbols = [symbol.strip() for symbol in CALENDAR_SYMBOLS(document)]
+    symbols = [symbol for symbol in symbols if symbol]
+    if not symbols:
+        symbols = _TICKER_PATTERN.findall(document.text_content())
+    return list(dict.fromkeys(symbols))
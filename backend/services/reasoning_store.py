@@ -0,0 +1,84 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class _ReasoningEntry:
+    __slots__ = ("stock", "context_summary", "reasoning", "generated_at", "task")
+
+    def __init__(self, stock: Dict[str, Any], context_summary: str):
+        self.stock = stock
+        self.context_summary = context_summary
+        self.reasoning: Optional[str] = None
+        self.generated_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class ReasoningStore:
+    """Inputs for deferred per-stock AI reasoning, and the reasoning once generated
+
+    The synthesizer registers each ranked stock with the market summary it was
+    ranked under; reasoning is generated the first time a symbol is asked for
+    and cached until the stock is registered again with different inputs.
+    Concurrent requests for the same symbol share one generation.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._entries: Dict[str, _ReasoningEntry] = {}
+
+    def register(self, stock: Dict[str, Any], context_summary: str):
+        """Record the inputs for a ranked stock, keeping its reasoning if they are unchanged"""
+        symbol = stock["symbol"].upper()
+        entry = self._entries.pop(symbol, None)
+        if entry is None or entry.stock != stock or entry.context_summary != context_summary:
+            entry = _ReasoningEntry(dict(stock), context_summary)
+        self._entries[symbol] = entry
+
+        # Dicts keep insertion order, so the first key is the least recently registered
+        while len(self._entries) > self.max_size:
+            self._entries.pop(next(iter(self._entries)))
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol.upper() in self._entries
+
+    def cached(self, symbol: str) -> Optional[str]:
+        """Reasoning already generated for a symbol, if any"""
+        entry = self._entries.get(symbol.upper())
+        return entry.reasoning if entry else None
+
+    async def get_reasoning(self, symbol: str,
+                            generate: Callable[[Dict[str, Any], str], Awaitable[str]],
+                            fallback: Callable[[Dict[str, Any]], str]) -> Optional[str]:
+        """Return reasoning for a registered symbol, generating it on first use; None if unknown
+
+        When ``generate`` raises, ``fallback`` text is returned but not cached,
+        so the next request tries again.
+        """
+        entry = self._entries.get(symbol.upper())
+        if entry is None:
+            return None
+        if entry.reasoning is not None:
+            return entry.reasoning
+
+        if entry.task is None:
+            entry.task = asyncio.create_task(generate(entry.stock, entry.context_summary))
+        task = entry.task
+
+        try:
+            reasoning = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Reasoning generation failed for {symbol.upper()}: {e}")
+            return fallback(entry.stock)
+        finally:
+            if entry.task is task and task.done():
+                entry.task = None
+
+        entry.reasoning = reasoning
+        entry.generated_at = time.time()
+        return reasoning
@@ -0,0 +1,193 @@
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import aclosing
+from datetime import datetime
+
+from services.stock_recommendation_service import StockRecommendationService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_SECONDS = 300
+DEFAULT_SNAPSHOT_PATH = os.path.join("data", "recommendation_snapshot.json")
+
+
+class RecommendationScheduler:
+    """Keeps a recommendation snapshot warm in memory and on disk
+
+    A background loop regenerates the snapshot on a fixed cadence. Readers get
+    the latest snapshot immediately; a stale one is still served while a
+    refresh runs in the background (stale-while-revalidate).
+    """
+
+    def __init__(self, service: StockRecommendationService,
+                 refresh_seconds: float = DEFAULT_REFRESH_SECONDS,
+                 stale_after_seconds: Optional[float] = None,
+                 snapshot_path: str = DEFAULT_SNAPSHOT_PATH):
+        self.service = service
+        self.refresh_seconds = refresh_seconds
+        self.stale_after_seconds = stale_after_seconds or refresh_seconds
+        self.snapshot_path = snapshot_path
+
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._generated_at: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Load the last persisted snapshot and start the refresh loop"""
+        self._load_from_disk()
+        self._loop_task = asyncio.create_task(self._run_loop())
+        logger.info(f"Recommendation scheduler started (every {self.refresh_seconds}s)")
+
+    async def stop(self):
+        """Stop the refresh loop and any refresh in progress"""
+        for task in (self._loop_task, self._refresh_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        logger.info("Recommendation scheduler stopped")
+
+    async def _run_loop(self):
+        """Regenerate the snapshot on a fixed cadence"""
+        while True:
+            # Skip the first refresh when a fresh snapshot was loaded from disk
+            if self.age_seconds() is None or self.age_seconds() >= self.refresh_seconds:
+                await self.refresh()
+            await asyncio.sleep(self.refresh_seconds)
+
+    async def refresh(self):
+        """Regenerate the snapshot, sharing any refresh already in progress"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+        await asyncio.shield(self._refresh_task)
+
+    async def _refresh(self):
+        try:
+            response = await self.service.generate_recommendations()
+        except Exception as e:
+            logger.error(f"Snapshot refresh failed: {str(e)}")
+            self._last_error = str(e)
+            return
+
+        await self._publish(response)
+
+    async def _publish(self, response: Dict[str, Any]):
+        """Store a pipeline response as the snapshot and persist it"""
+        # Never store an error response; keep serving the previous snapshot, if there is one
+        if not response.get("success"):
+            logger.warning(f"Snapshot refresh returned an error, keeping previous snapshot: {response.get('error')}")
+            self._last_error = response.get("error")
+            return
+
+        self._snapshot = response
+        self._last_error = None
+        self._generated_at = time.time()
+        logger.info("Recommendation snapshot refreshed")
+
+        try:
+            await asyncio.to_thread(self._save_to_disk)
+        except Exception as e:
+            logger.error(f"Failed to persist recommendation snapshot: {str(e)}")
+
+    def trigger_refresh(self):
+        """Start a background refresh unless one is already running"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+
+    def age_seconds(self) -> Optional[float]:
+        """Seconds since the current snapshot was generated"""
+        if self._generated_at is None:
+            return None
+        return time.time() - self._generated_at
+
+    async def get_snapshot(self) -> Dict[str, Any]:
+        """Return the latest snapshot, refreshing in the background when it is stale"""
+        if self._snapshot is None:
+            # Nothing to serve yet - the first caller waits for the initial run
+            await self.refresh()
+            if self._snapshot is None:
+                raise RuntimeError(f"No recommendation snapshot available: {self._last_error}")
+
+        if self.is_stale():
+            self.trigger_refresh()
+        return self._snapshot_response()
+
+    def is_stale(self) -> bool:
+        """Whether there is no snapshot or it is older than ``stale_after_seconds``"""
+        return self._snapshot is None or self.age_seconds() >= self.stale_after_seconds
+
+    def _snapshot_response(self) -> Dict[str, Any]:
+        age = self.age_seconds()
+        return {
+            **self.service.apply_cached_reasoning(self._snapshot),
+            "generated_at": datetime.fromtimestamp(self._generated_at).isoformat(),
+            "age_seconds": round(age, 3),
+            "stale": age >= self.stale_after_seconds
+        }
+
+    async def stream(self, include_market_context: bool = True) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Recommendation stream events, replaying the snapshot when it is fresh
+
+        A fresh snapshot (or one a refresh already in progress produces) is
+        sent as ``recommendations`` followed by ``done``. Otherwise a streamed
+        pipeline run is relayed and its ranking becomes the new snapshot.
+        """
+        if self.is_stale() and self._refresh_task is not None and not self._refresh_task.done():
+            # Wait for the scheduled run rather than starting a second pipeline
+            await asyncio.shield(self._refresh_task)
+
+        if not self.is_stale():
+            response = self._snapshot_response()
+            if not include_market_context:
+                response.pop("market_context", None)
+            yield "recommendations", response
+            yield "done", {"execution_time_seconds": 0.0, "from_snapshot": True}
+            return
+
+        async with aclosing(self.service.stream_recommendations()) as events:
+            async for event, data in events:
+                if event == "recommendations":
+                    # Concurrent streams share one run and so receive the same response object
+                    if data is not self._snapshot:
+                        await self._publish(data)
+                    if not include_market_context:
+                        data = {key: value for key, value in data.items() if key != "market_context"}
+                yield event, data
+
+    def current_snapshot(self) -> Optional[Dict[str, Any]]:
+        """The latest snapshot as stored, without triggering a refresh"""
+        return self._snapshot
+
+    def _load_from_disk(self):
+        """Restore the last persisted snapshot, if any"""
+        if not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path) as snapshot_file:
+                stored = json.load(snapshot_file)
+            if not stored["snapshot"].get("success"):
+                logger.warning(f"Ignoring failed run stored in {self.snapshot_path}")
+                return
+            self._snapshot = stored["snapshot"]
+            self._generated_at = stored["generated_at"]
+            logger.info(f"Loaded recommendation snapshot ({self.age_seconds():.0f}s old)")
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable snapshot file {self.snapshot_path}: {e}")
+
+    def _save_to_disk(self):
+        """Persist the current snapshot atomically"""
+        directory = os.path.dirname(self.snapshot_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w") as snapshot_file:
+            json.dump({"snapshot": self._snapshot, "generated_at": self._generated_at}, snapshot_file, default=str)
+        os.replace(tmp_path, self.snapshot_path)
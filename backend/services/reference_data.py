@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+import yfinance as yf
+
+from services.metrics import register_cache, track_upstream
+
+logger = logging.getLogger(__name__)
+
+# How long a cached ``ticker.info`` payload is considered fresh for each group
+# of fields. Callers ask for the group they actually read, so a sector lookup
+# can reuse a day-old payload while a price lookup forces a refetch.
+DEFAULT_FIELD_GROUP_TTLS = {
+    "profile": 24 * 60 * 60,       # longName, sector, industry, marketCap
+    "fundamentals": 6 * 60 * 60,   # trailingPE, pegRatio, margins, growth
+    "earnings": 60 * 60,           # earningsDate, earningsGrowth
+    "analyst": 60 * 60,            # recommendationKey, targetMeanPrice
+    "quote": 60,                   # currentPrice, previousClose
+}
+
+DEFAULT_MAX_SIZE = 1024
+
+
+def _fetch_ticker_info(symbol: str) -> Dict[str, Any]:
+    """Fetch the raw ``info`` payload for a symbol from Yahoo"""
+    with track_upstream("yfinance", "info"):
+        return yf.Ticker(symbol).info or {}
+
+
+class _CacheEntry:
+    __slots__ = ("info", "fetched_at")
+
+    def __init__(self, info: Dict[str, Any], fetched_at: float):
+        self.info = info
+        self.fetched_at = fetched_at
+
+
+class ReferenceDataCache:
+    """Process-wide, thread-safe cache of per-symbol ``ticker.info`` payloads
+
+    Entries are evicted least-recently-used once ``max_size`` symbols are held,
+    and concurrent misses for the same symbol share a single upstream fetch.
+    """
+
+    def __init__(self,
+                 fetcher: Optional[Callable[[str], Dict[str, Any]]] = None,
+                 max_size: int = DEFAULT_MAX_SIZE,
+                 ttls: Optional[Dict[str, float]] = None):
+        self._fetcher = fetcher or _fetch_ticker_info
+        self.max_size = max_size
+        self.ttls = {**DEFAULT_FIELD_GROUP_TTLS, **(ttls or {})}
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get_info(self, symbol: str, group: str = "quote") -> Dict[str, Any]:
+        """Return ``ticker.info`` for a symbol, fresh enough for the given field group"""
+        key = symbol.upper()
+        ttl = self.ttls.get(group, self.ttls["quote"])
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.fetched_at < ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.info
+
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            info = self._fetcher(key)
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._entries[key] = _CacheEntry(info, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._inflight.pop(key, None)
+
+        future.set_result(info)
+        for listener in self._listeners:
+            try:
+                listener(key, info)
+            except Exception as e:
+                logger.warning(f"Reference data listener failed for {key}: {e}")
+        return info
+
+    def add_listener(self, listener: Callable[[str, Dict[str, Any]], None]):
+        """Call ``listener(symbol, info)`` after every upstream fetch (on the fetching thread)"""
+        self._listeners.append(listener)
+
+    def invalidate(self, symbol: Optional[str] = None):
+        """Drop one symbol, or every symbol when none is given"""
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(symbol.upper(), None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0
+            }
+
+
+# Singleton instance shared by every agent and endpoint
+_reference_data_cache = None
+
+
+def get_reference_data_cache(**kwargs) -> ReferenceDataCache:
+    """Get or create the process-wide reference data cache"""
+    global _reference_data_cache
+    if _reference_data_cache is None:
+        _reference_data_cache = ReferenceDataCache(**kwargs)
+        register_cache("reference_data", _reference_data_cache.stats)
+    return _reference_data_cache
@@ -0,0 +1,159 @@
+from typing import Any, Callable, Dict, List, Mapping, Optional
+import operator
+
+import numpy as np
+import pandas as pd
+
+# Comparisons a band may combine; a band matches when all of them hold
+_COMPARISONS = {
+    "gt": operator.gt,
+    "ge": operator.ge,
+    "lt": operator.lt,
+    "le": operator.le,
+    "eq": operator.eq,
+    "ne": operator.ne,
+}
+
+# Rules for each scoring model; the ``scoring`` config section replaces a model's rules by name.
+# Each rule scores one feature column in one of three ways:
+#   bands:  points of the first band whose comparisons all hold (missing values never match)
+#   values: points looked up by the feature's value
+#   min/max: the feature value itself, clipped (missing values score 0)
+# ``weight`` (default 1) scales a rule's points.
+DEFAULT_MODELS: Dict[str, List[Dict[str, Any]]] = {
+    # EarningsAgent fundamental score, 0-11
+    "fundamentals": [
+        # Lower P/E is better, but not too low
+        {"feature": "pe_ratio", "bands": [{"gt": 10, "lt": 25, "points": 2}, {"gt": 5, "le": 10, "points": 1}]},
+        {"feature": "peg_ratio", "bands": [{"ne": 0, "lt": 1, "points": 2}, {"ne": 0, "lt": 1.5, "points": 1}]},
+        {"feature": "roe", "bands": [{"gt": 0.15, "points": 2}, {"gt": 0.10, "points": 1}]},
+        {"feature": "profit_margin", "bands": [{"gt": 0.15, "points": 2}, {"gt": 0.10, "points": 1}]},
+        {"feature": "revenue_growth", "bands": [{"gt": 0.10, "points": 2}, {"gt": 0.05, "points": 1}]},
+        {"feature": "debt_to_equity", "bands": [{"ne": 0, "lt": 0.3, "points": 1}, {"ne": 0, "lt": 0.5, "points": 0.5}]},
+    ],
+    # RecommendationSynthesizer composite score
+    "composite": [
+        {"feature": "momentum_score", "max": 4},
+        {"feature": "fundamental_score", "max": 6},
+        {"feature": "analyst_upside", "bands": [{"gt": 30, "points": 3}, {"gt": 20, "points": 2}, {"gt": 10, "points": 1}]},
+        {"feature": "trending_topic", "bands": [{"eq": 1, "points": 1}]},
+        {"feature": "market_sentiment", "values": {"bullish": 1, "bearish": -1}},
+    ],
+}
+
+RuleFunction = Callable[[pd.Series], np.ndarray]
+
+
+def _numeric(column: pd.Series) -> np.ndarray:
+    """Feature values as floats; missing or non-numeric values become NaN"""
+    return pd.to_numeric(column, errors="coerce").to_numpy(dtype=np.float64)
+
+
+def _compile_bands(feature: str, bands: List[Mapping[str, Any]]) -> RuleFunction:
+    compiled = []
+    for band in bands:
+        tests = [(op, threshold) for op, threshold in band.items() if op != "points"]
+        unknown = [op for op, _ in tests if op not in _COMPARISONS]
+        if unknown or not tests or "points" not in band:
+            raise ValueError(f"Invalid band for {feature}: {dict(band)}")
+        compiled.append(([(_COMPARISONS[op], float(threshold)) for op, threshold in tests], float(band["points"])))
+
+    def apply(column: pd.Series) -> np.ndarray:
+        values = _numeric(column)
+        present = ~np.isnan(values)
+        conditions = []
+        for tests, _ in compiled:
+            condition = present.copy()
+            for compare, threshold in tests:
+                condition &= compare(values, threshold)
+            conditions.append(condition)
+        return np.select(conditions, [points for _, points in compiled], default=0.0)
+
+    return apply
+
+
+def _compile_values(feature: str, values: Mapping[Any, Any]) -> RuleFunction:
+    points = {key: float(value) for key, value in values.items()}
+
+    def apply(column: pd.Series) -> np.ndarray:
+        return column.map(points).fillna(0.0).to_numpy(dtype=np.float64)
+
+    return apply
+
+
+def _compile_clip(feature: str, lower: Optional[float], upper: Optional[float]) -> RuleFunction:
+    def apply(column: pd.Series) -> np.ndarray:
+        return np.nan_to_num(np.clip(_numeric(column), lower, upper), nan=0.0)
+
+    return apply
+
+
+def whole_points(value: float):
+    """A score as an int when it is a whole number, as the original if-chains returned it"""
+    return int(value) if float(value).is_integer() else value
+
+
+class ScoringModel:
+    """A named set of rules compiled into vectorized column operations
+
+    ``score`` takes a frame with one row per symbol and one column per
+    feature, and returns every symbol's total in a single pass. Features
+    missing from the frame score 0.
+    """
+
+    def __init__(self, name: str, rules: List[Mapping[str, Any]]):
+        self.name = name
+        self.rules = [self._compile(rule) for rule in rules]
+
+    @property
+    def features(self) -> List[str]:
+        return list(dict.fromkeys(feature for _, feature, _, _ in self.rules))
+
+    def _compile(self, rule: Mapping[str, Any]):
+        feature = rule.get("feature")
+        if not feature:
+            raise ValueError(f"Scoring rule in {self.name} has no feature: {dict(rule)}")
+        if "bands" in rule:
+            apply = _compile_bands(feature, rule["bands"])
+        elif "values" in rule:
+            apply = _compile_values(feature, rule["values"])
+        else:
+            apply = _compile_clip(feature, rule.get("min"), rule.get("max"))
+        return rule.get("name", feature), feature, float(rule.get("weight", 1)), apply
+
+    def points(self, features: pd.DataFrame) -> pd.DataFrame:
+        """Points from each rule, one column per rule"""
+        columns = {}
+        for name, feature, weight, apply in self.rules:
+            column = features[feature] if feature in features else pd.Series(np.nan, index=features.index)
+            columns[name] = columns.get(name, 0.0) + weight * apply(column)
+        return pd.DataFrame(columns, index=features.index)
+
+    def score(self, features: pd.DataFrame) -> pd.Series:
+        """Total points per symbol"""
+        if features.empty:
+            return pd.Series(dtype=np.float64)
+        return self.points(features).sum(axis=1)
+
+
+class ScoringEngine:
+    """Scoring models by name, built from ``DEFAULT_MODELS`` and config overrides"""
+
+    def __init__(self, models: Optional[Mapping[str, List[Mapping[str, Any]]]] = None):
+        specs = {**DEFAULT_MODELS, **(models or {})}
+        self.models = {name: ScoringModel(name, rules) for name, rules in specs.items()}
+
+    def model(self, name: str) -> ScoringModel:
+        return self.models[name]
+
+
+# Singleton instance shared by every agent
+_scoring_engine = None
+
+
+def get_scoring_engine(**kwargs) -> ScoringEngine:
+    """Get or create the process-wide scoring engine"""
+    global _scoring_engine
+    if _scoring_engine is None:
+        _scoring_engine = ScoringEngine(**kwargs)
+    return _scoring_engine
@@ -0,0 +1,226 @@
+from typing import List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from services.market_data import HistoryBatch, MarketDataClient, get_market_data_client
+from services.symbol_index import SymbolIndex, get_symbol_index
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_SECONDS = 30 * 60
+DEFAULT_MAX_SYMBOLS = 5000
+DEFAULT_CHUNK_SIZE = 500
+# Retry interval while the symbol index has not been downloaded yet
+_INDEX_WAIT_SECONDS = 60
+
+# Columns of the frame returned by ``momentum_features``
+FEATURE_COLUMNS = ["current_price", "sma_20", "sma_50", "price_momentum", "recent_volume",
+                   "average_volume", "volume_ratio", "rsi", "bars", "momentum_score"]
+
+
+def _align_to_last_bar(close: np.ndarray, volume: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Shift each column's valid closes to the bottom of the matrix, keeping their order
+
+    Symbols on different calendars are NaN on the dates they miss. Dropping
+    those rows column by column (as ``HistoryBatch.for_symbol`` does) lets
+    ``[-20:]`` mean "the last 20 bars" for every column at once. Returns the
+    aligned close and volume matrices and each column's bar count.
+    """
+    valid = ~np.isnan(close)
+    # A stable sort on the validity flag moves NaN rows up without reordering bars
+    order = np.argsort(valid, axis=0, kind="stable")
+    return (np.take_along_axis(close, order, axis=0),
+            np.take_along_axis(volume, order, axis=0),
+            valid.sum(axis=0))
+
+
+def momentum_score(current_price, sma_20, sma_50, price_momentum, volume_ratio, rsi):
+    """MarketAnalysisAgent's momentum score, for scalars or whole arrays of symbols
+
+    +2 for price > SMA20 > SMA50, +2 for a 20-day return above 5%, +1 for a
+    volume ratio above 1.2 and +1 for RSI between 40 and 70. NaN inputs fail
+    their rule.
+    """
+    return (2 * ((current_price > sma_20) & (sma_20 > sma_50))
+            + 2 * (price_momentum > 5)
+            + (volume_ratio > 1.2)
+            + ((rsi > 40) & (rsi < 70)))
+
+
+def momentum_features(close: pd.DataFrame, volume: pd.DataFrame, rsi_period: int = 14) -> pd.DataFrame:
+    """Momentum indicators and score for every symbol in a (date x symbol) close/volume matrix
+
+    Computes the values ``MarketAnalysisAgent`` used to derive one symbol at a
+    time (SMA20/50, 20-day return, 5-day over 20-day volume, RSI) for every
+    column in one pass, then applies ``momentum_score`` as boolean masks.
+    Symbols with fewer than 50 bars get NaN indicators and a score of 0.
+    """
+    symbols = close.columns
+    volume = volume.reindex(index=close.index, columns=symbols)
+    c, v, bars = _align_to_last_bar(close.to_numpy(dtype=np.float64), volume.to_numpy(dtype=np.float64))
+
+    features = pd.DataFrame(np.nan, index=symbols, columns=FEATURE_COLUMNS)
+    features["bars"] = bars
+    features["momentum_score"] = 0
+    if len(c) < 50:
+        return features
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        current_price = c[-1]
+        sma_20 = c[-20:].mean(axis=0)
+        sma_50 = c[-50:].mean(axis=0)
+        price_momentum = (current_price - c[-20]) / c[-20] * 100
+
+        average_volume = v[-20:].mean(axis=0)
+        recent_volume = v[-5:].mean(axis=0)
+        volume_ratio = recent_volume / average_volume
+
+        # Simple-average RSI, as in ``indicators.rsi``: mean gain over mean loss of the last period changes
+        delta = np.diff(c[-(rsi_period + 1):], axis=0)
+        avg_gain = np.where(delta > 0, delta, 0.0).mean(axis=0)
+        avg_loss = np.where(delta < 0, -delta, 0.0).mean(axis=0)
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+
+    eligible = bars >= 50
+    score = momentum_score(current_price, sma_20, sma_50, price_momentum, volume_ratio, rsi)
+
+    for name, values in (("current_price", current_price), ("sma_20", sma_20), ("sma_50", sma_50),
+                         ("price_momentum", price_momentum), ("recent_volume", recent_volume),
+                         ("average_volume", average_volume), ("volume_ratio", volume_ratio), ("rsi", rsi)):
+        features[name] = np.where(eligible, values, np.nan)
+    features["momentum_score"] = np.where(eligible, score, 0)
+    return features
+
+
+def top_momentum(features: pd.DataFrame, min_score: int = 3, limit: Optional[int] = None) -> pd.DataFrame:
+    """Symbols scoring at least ``min_score``, best first (ties keep matrix order)"""
+    selected = features[features["momentum_score"] >= min_score]
+    selected = selected.sort_values("momentum_score", ascending=False, kind="stable")
+    return selected if limit is None else selected.iloc[:limit]
+
+
+def volume_leaders(features: pd.DataFrame, min_ratio: float = 1.5, min_volume: float = 50_000,
+                   limit: Optional[int] = None) -> pd.DataFrame:
+    """Symbols trading well above their 20-day volume, highest ratio first"""
+    selected = features[(features["volume_ratio"] > min_ratio) & (features["recent_volume"] > min_volume)]
+    selected = selected.sort_values("volume_ratio", ascending=False, kind="stable")
+    return selected if limit is None else selected.iloc[:limit]
+
+
+class MarketScreener:
+    """Cross-sectional screens over every listed stock
+
+    Daily close and volume for the symbol index's common stocks (up to
+    ``max_symbols``, in symbol order) are downloaded in batches in the
+    background and kept as one (date x symbol) matrix. Features for the whole
+    matrix are computed once per refresh, so each screen is a column filter.
+    Until the first download finishes the screens return nothing.
+    """
+
+    def __init__(self, refresh_seconds: float = DEFAULT_REFRESH_SECONDS,
+                 max_symbols: int = DEFAULT_MAX_SYMBOLS,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 period: str = "3mo",
+                 market_data: Optional[MarketDataClient] = None,
+                 symbol_index: Optional[SymbolIndex] = None):
+        self.refresh_seconds = refresh_seconds
+        self.max_symbols = max_symbols
+        self.chunk_size = chunk_size
+        self.period = period
+        self.market_data = market_data or get_market_data_client()
+        self.symbol_index = symbol_index or get_symbol_index()
+        self.refreshed_at: Optional[float] = None
+        self._features: Optional[pd.DataFrame] = None
+        self._loop_task: Optional[asyncio.Task] = None
+
+    @property
+    def features(self) -> Optional[pd.DataFrame]:
+        """Momentum features of the current universe, or None before the first refresh"""
+        return self._features
+
+    def universe(self) -> List[str]:
+        """Listed common stocks to screen (no ETFs, warrants, units, rights or preferreds)"""
+        symbols = sorted(record.symbol for record in self.symbol_index.listed(common_only=True))
+        if len(symbols) > self.max_symbols:
+            logger.warning(f"Screening the first {self.max_symbols} of {len(symbols)} common stocks")
+        return symbols[:self.max_symbols]
+
+    def load(self, history: HistoryBatch):
+        """Replace the screened universe with an already downloaded batch"""
+        self._features = momentum_features(history.field("Close"), history.field("Volume"))
+        self.refreshed_at = time.time()
+
+    async def refresh(self):
+        """Download the universe in batches and recompute its features"""
+        symbols = self.universe()
+        if not symbols:
+            return
+
+        frames = []
+        for start in range(0, len(symbols), self.chunk_size):
+            chunk = symbols[start:start + self.chunk_size]
+            try:
+                batch = await self.market_data.download_history(chunk, period=self.period)
+            except Exception as e:
+                logger.warning(f"Screener download failed for {len(chunk)} symbols: {e}")
+                continue
+            if not batch.frame.empty:
+                frames.append(batch.frame[["Close", "Volume"]])
+
+        if not frames:
+            return
+        history = HistoryBatch(pd.concat(frames, axis=1).sort_index())
+        started = time.perf_counter()
+        self.load(history)
+        logger.info(f"Screener refreshed {len(self._features)} symbols "
+                    f"(features in {(time.perf_counter() - started) * 1000:.0f} ms)")
+
+    def momentum(self, min_score: int = 3, limit: Optional[int] = None) -> List[str]:
+        if self._features is None:
+            return []
+        return list(top_momentum(self._features, min_score, limit).index)
+
+    def volume_leaders(self, min_ratio: float = 1.5, min_volume: float = 50_000,
+                       limit: Optional[int] = None) -> List[str]:
+        if self._features is None:
+            return []
+        return list(volume_leaders(self._features, min_ratio, min_volume, limit).index)
+
+    async def start(self):
+        """Start the background refresh loop"""
+        self._loop_task = asyncio.create_task(self._run_loop())
+
+    async def stop(self):
+        if self._loop_task and not self._loop_task.done():
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run_loop(self):
+        while True:
+            if not self.symbol_index.loaded:
+                await asyncio.sleep(_INDEX_WAIT_SECONDS)
+                continue
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Screener refresh failed: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+
+# Singleton instance shared by every agent
+_screener = None
+
+
+def get_screener(**kwargs) -> MarketScreener:
+    """Get or create the process-wide market screener"""
+    global _screener
+    if _screener is None:
+        _screener = MarketScreener(**kwargs)
+    return _screener
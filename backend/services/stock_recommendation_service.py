@@ -1,6 +1,7 @@
 import asyncio
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 import logging
+from contextlib import aclosing
 from datetime import datetime
 
 from agents.base_agent import AgentOrchestrator
@@ -8,17 +9,89 @@ from agents.web_search_agent import WebSearchAgent
 from agents.market_analysis_agent import MarketAnalysisAgent
 from agents.earnings_agent import EarningsAgent
 from agents.recommendation_synthesizer import RecommendationSynthesizer
+from services.reasoning_store import ReasoningStore
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class _InflightRun:
+    """A pipeline run shared by every caller that asked for the same parameters"""
+    
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.callers = 0
+
+class _StreamRun:
+    """A streamed pipeline run whose events are replayed to every subscriber
+    
+    Subscribers that join late first get the events emitted so far. The run
+    is cancelled once its last subscriber disconnects.
+    """
+    
+    def __init__(self, events: AsyncIterator[Tuple[str, Dict[str, Any]]]):
+        self.events: List[Tuple[str, Dict[str, Any]]] = []
+        self.finished = False
+        self.abandoned = False
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self.task = asyncio.create_task(self._pump(events))
+    
+    async def _pump(self, events: AsyncIterator[Tuple[str, Dict[str, Any]]]):
+        try:
+            async for item in events:
+                self.events.append(item)
+                self._notify()
+        finally:
+            self.finished = True
+            self._notify()
+    
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+    
+    async def subscribe(self) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        self.subscribers += 1
+        try:
+            index = 0
+            while True:
+                while index < len(self.events):
+                    yield self.events[index]
+                    index += 1
+                if self.finished:
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.task.done():
+                self.abandoned = True
+                self.task.cancel()
+
 class StockRecommendationService:
     """Service that orchestrates all agents to generate stock recommendations"""
     
-    def __init__(self, openai_client=None):
+    # (agent_status key, agent name, context key the agent produces)
+    AGENT_STATUS_KEYS = (
+        ("web_search", "WebSearchAgent", "web_search_results"),
+        ("market_analysis", "MarketAnalysisAgent", "market_analysis"),
+        ("earnings_analysis", "EarningsAgent", "earnings_analysis"),
+        ("recommendation_synthesis", "RecommendationSynthesizer", "stock_recommendations"),
+    )
+    
+    def __init__(self, openai_client=None, budget_seconds: Optional[float] = 60,
+                 agent_deadlines: Optional[Dict[str, Dict[str, float]]] = None,
+                 reasoning_strategy: str = "concurrent", reasoning_concurrency: int = 4,
+                 reasoning_mode: str = "eager"):
         self.openai_client = openai_client
-        self.orchestrator = AgentOrchestrator()
+        self.budget_seconds = budget_seconds
+        self.agent_deadlines = agent_deadlines or {}
+        self.reasoning_strategy = reasoning_strategy
+        self.reasoning_concurrency = reasoning_concurrency
+        self.reasoning_mode = reasoning_mode
+        self.reasoning_store = ReasoningStore()
+        self.orchestrator = AgentOrchestrator(budget_seconds)
+        self._inflight: Dict[Tuple[bool, bool], _InflightRun] = {}
+        self._stream_run: Optional[_StreamRun] = None
         self._setup_agents()
     
     def _setup_agents(self):
@@ -27,16 +100,59 @@ class StockRecommendationService:
         web_agent = WebSearchAgent(self.openai_client)
         market_agent = MarketAnalysisAgent()
         earnings_agent = EarningsAgent()
-        synthesizer = RecommendationSynthesizer(self.openai_client)
+        synthesizer = self._create_synthesizer()
         
         # Add agents to orchestrator in execution order
-        self.orchestrator.add_agent(web_agent)
-        self.orchestrator.add_agent(market_agent)
-        self.orchestrator.add_agent(earnings_agent)
-        self.orchestrator.add_agent(synthesizer)
+        self.orchestrator.add_agent(self._configure_deadlines(web_agent))
+        self.orchestrator.add_agent(self._configure_deadlines(market_agent))
+        self.orchestrator.add_agent(self._configure_deadlines(earnings_agent))
+        self.orchestrator.add_agent(self._configure_deadlines(synthesizer))
+    
+    def _create_synthesizer(self, reasoning_mode: Optional[str] = None) -> RecommendationSynthesizer:
+        return RecommendationSynthesizer(self.openai_client,
+                                         reasoning_strategy=self.reasoning_strategy,
+                                         reasoning_concurrency=self.reasoning_concurrency,
+                                         reasoning_mode=reasoning_mode or self.reasoning_mode,
+                                         reasoning_store=self.reasoning_store)
+    
+    def _create_dag_orchestrator(self, reasoning_mode: Optional[str] = None) -> AgentOrchestrator:
+        """Fresh agents for one DAG run, so concurrent runs do not share agent state"""
+        orchestrator = AgentOrchestrator(self.budget_seconds)
+        orchestrator.add_agent(self._configure_deadlines(WebSearchAgent(self.openai_client)))
+        orchestrator.add_agent(self._configure_deadlines(MarketAnalysisAgent()))
+        orchestrator.add_agent(self._configure_deadlines(EarningsAgent()))
+        orchestrator.add_agent(self._configure_deadlines(self._create_synthesizer(reasoning_mode)))
+        return orchestrator
     
-    async def generate_recommendations(self, use_parallel_execution: bool = True) -> Dict[str, Any]:
-        """Generate stock recommendations using the agentic framework"""
+    def _configure_deadlines(self, agent):
+        """Apply configured soft/hard deadline fractions over the agent's defaults"""
+        deadlines = self.agent_deadlines.get(agent.name, {})
+        agent.soft_deadline = deadlines.get("soft", agent.soft_deadline)
+        agent.hard_deadline = deadlines.get("hard", agent.hard_deadline)
+        return agent
+    
+    async def generate_recommendations(self, use_parallel_execution: bool = True,
+                                       include_market_context: bool = True) -> Dict[str, Any]:
+        """Generate stock recommendations, sharing one pipeline run between concurrent callers"""
+        key = (use_parallel_execution, include_market_context)
+        run = self._inflight.get(key)
+        
+        if run is None:
+            task = asyncio.create_task(self._run_pipeline(use_parallel_execution, include_market_context))
+            run = _InflightRun(task)
+            self._inflight[key] = run
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            logger.info("Joining in-flight recommendation run")
+        
+        run.callers += 1
+        
+        # Shield the shared run so one disconnecting caller does not cancel it for the others
+        response = await asyncio.shield(run.task)
+        return {**response, "callers_served": run.callers}
+    
+    async def _run_pipeline(self, use_parallel_execution: bool, include_market_context: bool) -> Dict[str, Any]:
+        """Run the full agent pipeline once"""
         try:
             logger.info("Starting stock recommendation generation")
             start_time = datetime.now()
@@ -49,18 +165,8 @@ class StockRecommendationService:
             
             # Execute agents
             if use_parallel_execution:
-                # Run market data agents in parallel (independent tasks)
-                parallel_orchestrator = AgentOrchestrator()
-                parallel_orchestrator.add_agent(WebSearchAgent(self.openai_client))
-                parallel_orchestrator.add_agent(MarketAnalysisAgent())
-                parallel_orchestrator.add_agent(EarningsAgent())
-                
-                parallel_results = await parallel_orchestrator.run_agents_parallel(initial_context)
-                
-                # Then run synthesizer with collected data
-                synthesizer = RecommendationSynthesizer(self.openai_client)
-                final_results = await synthesizer.execute(parallel_results)
-                results = {**parallel_results, **final_results}
+                # Start every agent at once; each waits only for the context keys it consumes
+                results = await self._create_dag_orchestrator().run_agents_dag(initial_context)
             else:
                 # Run all agents sequentially
                 results = await self.orchestrator.run_agents_sequential(initial_context)
@@ -70,6 +176,8 @@ class StockRecommendationService:
             
             # Format final response
             response = self._format_response(results, execution_time)
+            if not include_market_context:
+                response.pop("market_context", None)
             
             logger.info(f"Stock recommendations generated in {execution_time:.2f} seconds")
             return response
@@ -78,6 +186,143 @@ class StockRecommendationService:
             logger.error(f"Failed to generate recommendations: {str(e)}")
             return self._create_error_response(str(e))
     
+    async def stream_recommendations(self, include_market_context: bool = True) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Run the pipeline and yield ``(event, data)`` pairs as results become available
+        
+        Events, in order: ``agent`` as each agent finishes (with a summary of
+        its result), ``recommendations`` with the ranked list (reasoning
+        pending), ``reasoning`` per symbol as it is generated, then ``done``.
+        Failures end the stream with an ``error`` event. Reasoning goes through
+        the reasoning store, so it is shared with the per-symbol endpoint.
+        Concurrent streams share one pipeline run.
+        """
+        run = self._stream_run
+        if run is None or run.task.done() or run.abandoned:
+            run = _StreamRun(self._stream_pipeline())
+            self._stream_run = run
+        else:
+            logger.info("Joining in-flight recommendation stream")
+        
+        async with aclosing(run.subscribe()) as events:
+            async for event, data in events:
+                if event == "recommendations" and not include_market_context:
+                    data = {key: value for key, value in data.items() if key != "market_context"}
+                yield event, data
+    
+    async def _stream_pipeline(self) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Run the pipeline once for ``stream_recommendations``"""
+        try:
+            start_time = datetime.now()
+            orchestrator = self._create_dag_orchestrator(reasoning_mode="lazy")
+            context = orchestrator.new_dag_context({
+                "request_timestamp": start_time.isoformat(),
+                "analysis_type": "comprehensive_stock_screening"
+            })
+            
+            async for agent, result in orchestrator.iter_agents_dag(context):
+                yield "agent", {
+                    "agent": agent.name,
+                    "status": context["agent_runs"][agent.name]["status"],
+                    **self._summarize_agent_result(agent.name, result)
+                }
+            
+            response = self._format_response(dict(context), (datetime.now() - start_time).total_seconds())
+            yield "recommendations", response
+            
+            symbols = [rec["symbol"] for rec in response["recommendations"] if rec.get("reasoning_status") == "pending"]
+            synthesizer = self._create_synthesizer()
+            
+            async def reason(symbol: str) -> Tuple[str, Optional[str]]:
+                return symbol, await self.reasoning_store.get_reasoning(
+                    symbol, synthesizer.request_stock_reasoning, synthesizer.fallback_stock_reasoning)
+            
+            tasks = [asyncio.create_task(reason(symbol)) for symbol in symbols]
+            try:
+                for finished in asyncio.as_completed(tasks):
+                    symbol, reasoning = await finished
+                    yield "reasoning", {"symbol": symbol, "reasoning": reasoning}
+            finally:
+                # Generation itself is shielded in the store and still completes for later requests
+                for task in tasks:
+                    task.cancel()
+            
+            yield "done", {"execution_time_seconds": (datetime.now() - start_time).total_seconds()}
+            
+        except Exception as e:
+            logger.error(f"Recommendation stream failed: {str(e)}")
+            yield "error", {"error": str(e)}
+    
+    def _summarize_agent_result(self, agent_name: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """The part of an agent's result shown to the user before the ranking is ready"""
+        if agent_name == "WebSearchAgent":
+            web_results = result.get("web_search_results", {})
+            return {
+                "sentiment": web_results.get("market_sentiment", "neutral"),
+                "trending_topics": web_results.get("trending_topics", [])[:5],
+                "trending_stocks": web_results.get("trending_stocks", [])
+            }
+        if agent_name == "MarketAnalysisAgent":
+            market_results = result.get("market_analysis", {})
+            return {
+                "volatility_level": market_results.get("volatility_metrics", {}).get("volatility_level", "moderate"),
+                "top_performing_sectors": market_results.get("sector_analysis", {}).get("top_performing_sectors", [])[:3]
+            }
+        if agent_name == "EarningsAgent":
+            earnings_results = result.get("earnings_analysis", {})
+            return {"upcoming_earnings_count": len(earnings_results.get("upcoming_earnings", []))}
+        return {}
+    
+    async def get_reasoning(self, symbol: str, snapshot: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Generate (or return cached) AI reasoning for one recommended symbol
+        
+        Symbols the store has not seen, e.g. after a restart that reloaded a
+        persisted snapshot, are registered from ``snapshot``. Returns None when
+        the symbol is not among the recommendations.
+        """
+        if symbol not in self.reasoning_store and snapshot:
+            self._register_from_snapshot(symbol, snapshot)
+        
+        synthesizer = self._create_synthesizer()
+        return await self.reasoning_store.get_reasoning(symbol, synthesizer.request_stock_reasoning,
+                                                        synthesizer.fallback_stock_reasoning)
+    
+    def _register_from_snapshot(self, symbol: str, snapshot: Dict[str, Any]):
+        """Rebuild reasoning inputs from a formatted recommendations response"""
+        recommendation = next((rec for rec in snapshot.get("recommendations", [])
+                               if rec.get("symbol", "").upper() == symbol.upper()), None)
+        if recommendation is None:
+            return
+        
+        market_context = snapshot.get("market_context", {})
+        web_data = {
+            "market_sentiment": market_context.get("sentiment", "neutral"),
+            "trending_topics": market_context.get("trending_topics", [])
+        }
+        market_data = {"volatility_metrics": {"volatility_level": market_context.get("volatility_level", "moderate")}}
+        stock = {
+            "symbol": recommendation["symbol"],
+            "company_name": recommendation.get("company_name", recommendation["symbol"]),
+            "sector": recommendation.get("sector", "Unknown"),
+            "current_price": recommendation.get("current_price", 0.0),
+            "month_change": recommendation.get("month_change", 0.0),
+            "composite_score": recommendation.get("ai_score", 0) / 10,
+            "pe_ratio": recommendation.get("pe_ratio")
+        }
+        context_summary = self._create_synthesizer()._create_analysis_context(web_data, market_data, {})
+        self.reasoning_store.register(stock, context_summary)
+    
+    def apply_cached_reasoning(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill in pending recommendations whose reasoning has since been generated"""
+        recommendations = response.get("recommendations")
+        if not recommendations or not any(rec.get("reasoning_status") == "pending" for rec in recommendations):
+            return response
+        
+        filled = []
+        for rec in recommendations:
+            reasoning = self.reasoning_store.cached(rec["symbol"]) if rec.get("reasoning_status") == "pending" else None
+            filled.append({**rec, "reasoning": reasoning, "reasoning_status": "ready"} if reasoning else rec)
+        return {**response, "recommendations": filled}
+    
     def _format_response(self, results: Dict[str, Any], execution_time: float) -> Dict[str, Any]:
         """Format the final response"""
         
@@ -111,14 +356,15 @@ class StockRecommendationService:
         return response
     
     def _get_agent_status(self, results: Dict[str, Any]) -> Dict[str, str]:
-        """Get status of each agent execution"""
+        """Get status of each agent execution: success, partial, timed_out or failed"""
         status = {}
+        agent_runs = results.get("agent_runs", {})
         
-        # Check if each agent completed successfully
-        status["web_search"] = "success" if "web_search_results" in results else "failed"
-        status["market_analysis"] = "success" if "market_analysis" in results else "failed"
-        status["earnings_analysis"] = "success" if "earnings_analysis" in results else "failed"
-        status["recommendation_synthesis"] = "success" if "stock_recommendations" in results else "failed"
+        for status_key, agent_name, result_key in self.AGENT_STATUS_KEYS:
+            if agent_name in agent_runs:
+                status[status_key] = agent_runs[agent_name]["status"]
+            else:
+                status[status_key] = "success" if result_key in results else "failed"
         
         return status
     
@@ -141,9 +387,9 @@ class StockRecommendationService:
 # Singleton instance for the application
 _recommendation_service = None
 
-def get_recommendation_service(openai_client=None) -> StockRecommendationService:
+def get_recommendation_service(openai_client=None, **kwargs) -> StockRecommendationService:
     """Get or create the recommendation service instance"""
     global _recommendation_service
     if _recommendation_service is None:
-        _recommendation_service = StockRecommendationService(openai_client)
+        _recommendation_service = StockRecommendationService(openai_client, **kwargs)
     return _recommendation_service
\ No newline at end of file
@@ -0,0 +1,343 @@
+from typing import Any, Dict, Iterable, List, Optional
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from services.http_client import get_http_client
+from services.market_data import get_market_data_client
+from services.reference_data import get_reference_data_cache
+
+logger = logging.getLogger(__name__)
+
+# Nasdaq Trader symbol directory: every security listed on US exchanges, refreshed nightly
+SYMBOL_DIRECTORY_URLS = (
+    "https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt",
+    "https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt",
+)
+
+# Exchange codes used in otherlisted.txt
+_EXCHANGES = {"A": "NYSE American", "N": "NYSE", "P": "NYSE Arca", "Z": "Cboe BZX", "V": "IEX"}
+
+# Nasdaq fifth-letter codes for warrants, units, rights and preferreds
+_NASDAQ_NON_COMMON_SUFFIXES = set("WURP")
+# The same classes in otherlisted.txt: dotted suffixes (``ABC.WS``, ``ABC.U``, ...) or the
+# ACT markers ``$`` (preferred), ``+`` (warrant), ``=`` (unit) and ``^`` (right)
+_OTHER_NON_COMMON_SUFFIXES = {"W", "WS", "WT", "U", "UN", "R", "RT", "RTW"}
+_OTHER_NON_COMMON_MARKERS = set("$+=^")
+_NON_COMMON_NAME = re.compile(r"\b(warrants?|units?|rights?|preferred|notes due|debentures?)\b", re.IGNORECASE)
+# Nasdaq financial status codes for delinquent and/or bankrupt issuers
+_DISTRESSED_STATUSES = set("EQGHJK")
+
+DEFAULT_REFRESH_SECONDS = 24 * 60 * 60
+# Retry delays after a failed directory download, doubling up to the cap
+_RETRY_SECONDS = 60
+_MAX_RETRY_SECONDS = 60 * 60
+# Market data filled in from ticker.info is trusted for this long before a filter looks it up again
+DEFAULT_ENRICHMENT_MAX_AGE = 24 * 60 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS symbols (
+    symbol TEXT PRIMARY KEY,
+    name TEXT,
+    exchange TEXT,
+    is_etf INTEGER NOT NULL DEFAULT 0,
+    sector TEXT,
+    industry TEXT,
+    market_cap REAL,
+    average_volume REAL,
+    listed_at REAL NOT NULL,
+    enriched_at REAL,
+    is_common INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_COLUMNS = ("symbol", "name", "exchange", "is_etf", "sector", "industry",
+            "market_cap", "average_volume", "listed_at", "enriched_at", "is_common")
+
+
+def _is_common_stock(symbol: str, name: str, financial_status: str, nasdaq: bool) -> bool:
+    """Whether a directory row is an ordinary share, not a warrant, unit, right or preferred
+
+    Nasdaq marks these classes with a fifth symbol letter, other exchanges
+    with a CQS suffix; the security name catches the rest. Issuers Nasdaq
+    reports as delinquent or bankrupt are excluded as well.
+    """
+    if financial_status in _DISTRESSED_STATUSES or _NON_COMMON_NAME.search(name):
+        return False
+    if nasdaq:
+        return not (len(symbol) == 5 and symbol[-1] in _NASDAQ_NON_COMMON_SUFFIXES)
+    if _OTHER_NON_COMMON_MARKERS.intersection(symbol):
+        return False
+    return symbol.partition(".")[2] not in _OTHER_NON_COMMON_SUFFIXES
+
+
+def parse_symbol_directory(text: str) -> List[Dict[str, Any]]:
+    """Parse a pipe-delimited Nasdaq Trader directory file, skipping test issues
+
+    Handles both ``nasdaqlisted.txt`` and ``otherlisted.txt``; symbols are
+    converted to Yahoo's form (``BRK.B`` -> ``BRK-B``) and flagged
+    ``is_common`` unless they are warrants, units, rights or preferreds.
+    """
+    lines = text.strip().splitlines()
+    if not lines:
+        return []
+    header = lines[0].split("|")
+    listings = []
+    for line in lines[1:]:
+        if line.startswith("File Creation Time"):
+            continue
+        row = dict(zip(header, line.split("|")))
+        symbol = row.get("Symbol") or row.get("ACT Symbol")
+        if not symbol or row.get("Test Issue") == "Y":
+            continue
+        symbol = symbol.strip().upper()
+        name = row.get("Security Name", "").strip()
+        listings.append({
+            "symbol": symbol.replace(".", "-"),
+            "name": name,
+            "exchange": _EXCHANGES.get(row.get("Exchange"), row.get("Exchange")) or "NASDAQ",
+            "is_etf": row.get("ETF") == "Y",
+            "is_common": _is_common_stock(symbol, name, row.get("Financial Status", "").strip(),
+                                          nasdaq="Symbol" in row)
+        })
+    return listings
+
+
+class SymbolRecord:
+    __slots__ = _COLUMNS
+
+    def __init__(self, symbol: str, name: Optional[str] = None, exchange: Optional[str] = None,
+                 is_etf: bool = False, sector: Optional[str] = None, industry: Optional[str] = None,
+                 market_cap: Optional[float] = None, average_volume: Optional[float] = None,
+                 listed_at: float = 0.0, enriched_at: Optional[float] = None, is_common: bool = True):
+        self.symbol = symbol
+        self.name = name
+        self.exchange = exchange
+        self.is_etf = bool(is_etf)
+        self.sector = sector
+        self.industry = industry
+        self.market_cap = market_cap
+        self.average_volume = average_volume
+        self.listed_at = listed_at
+        self.enriched_at = enriched_at
+        self.is_common = bool(is_common)
+
+
+class SymbolIndex:
+    """Local index of US-listed symbols for validating and filtering tickers without a network call
+
+    Listings come from the Nasdaq Trader symbol directory and are refreshed in
+    the background. Sector, industry, market cap and average volume are filled
+    in from every ``ticker.info`` payload the reference data cache fetches.
+    Everything is held in an in-memory dict (persisted to SQLite), so
+    membership and filter checks cost a hash lookup.
+
+    Until the first directory download succeeds the index is empty and the
+    filters pass every symbol through, so callers behave as before.
+    """
+
+    def __init__(self, path: str = "data/symbols.sqlite3",
+                 refresh_seconds: float = DEFAULT_REFRESH_SECONDS,
+                 enrichment_max_age: float = DEFAULT_ENRICHMENT_MAX_AGE,
+                 urls: Iterable[str] = SYMBOL_DIRECTORY_URLS):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self.enrichment_max_age = enrichment_max_age
+        self.urls = tuple(urls)
+        self._lock = threading.Lock()
+        self._loop_task: Optional[asyncio.Task] = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(_SCHEMA)
+        # Indexes created before ``is_common`` existed; the next refresh fills it in
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(symbols)")}
+        if "is_common" not in columns:
+            self._connection.execute("ALTER TABLE symbols ADD COLUMN is_common INTEGER NOT NULL DEFAULT 1")
+
+        rows = self._connection.execute(f"SELECT {', '.join(_COLUMNS)} FROM symbols").fetchall()
+        self._records: Dict[str, SymbolRecord] = {row[0]: SymbolRecord(*row) for row in rows}
+        refreshed = self._connection.execute("SELECT value FROM meta WHERE key = 'refreshed_at'").fetchone()
+        self.refreshed_at: Optional[float] = float(refreshed[0]) if refreshed else None
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol.upper() in self._records
+
+    def get(self, symbol: str) -> Optional[SymbolRecord]:
+        return self._records.get(symbol.upper())
+
+    def listed(self, include_etfs: bool = False, common_only: bool = False) -> List[SymbolRecord]:
+        """Every listed symbol's record (without ETFs, unless asked; only common stocks, if asked)"""
+        return [record for record in self._records.values()
+                if (include_etfs or not record.is_etf) and (record.is_common or not common_only)]
+
+    def filter_listed(self, symbols: Iterable[str], include_etfs: bool = False) -> List[str]:
+        """Symbols that are listed (and not ETFs, unless asked), upper-cased, deduplicated, in order"""
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        if not self.loaded:
+            return symbols
+        return [symbol for symbol in symbols
+                if symbol in self._records and (include_etfs or not self._records[symbol].is_etf)]
+
+    async def select(self, symbols: Iterable[str], min_market_cap: float = 0.0,
+                     min_average_volume: float = 0.0, include_etfs: bool = False) -> List[str]:
+        """Listed symbols with at least the given market cap and average volume, in input order
+
+        Symbols whose market data is missing or older than
+        ``enrichment_max_age`` are looked up through the shared market data
+        client (which enriches the index); the rest are answered locally.
+        """
+        candidates = self.filter_listed(symbols, include_etfs)
+
+        infos: Dict[str, Dict[str, Any]] = {}
+        if min_market_cap or min_average_volume:
+            lookup = [symbol for symbol in candidates if not self._is_enriched(symbol)]
+            if lookup:
+                infos = await get_market_data_client().info_many(lookup, "profile")
+
+        selected = []
+        for symbol in candidates:
+            if symbol in infos:
+                market_cap = infos[symbol].get("marketCap") or 0
+                average_volume = infos[symbol].get("averageVolume") or 0
+            else:
+                record = self._records.get(symbol)
+                market_cap = (record.market_cap if record else None) or 0
+                average_volume = (record.average_volume if record else None) or 0
+            if market_cap >= min_market_cap and average_volume >= min_average_volume:
+                selected.append(symbol)
+        return selected
+
+    def _is_enriched(self, symbol: str) -> bool:
+        record = self._records.get(symbol)
+        return (record is not None and record.enriched_at is not None
+                and time.time() - record.enriched_at < self.enrichment_max_age)
+
+    def enrich(self, symbol: str, info: Dict[str, Any]):
+        """Record sector, industry, market cap and average volume from a ``ticker.info`` payload"""
+        record = self._records.get(symbol.upper())
+        if record is None or not info:
+            return
+        now = time.time()
+        with self._lock:
+            record.sector = info.get("sector") or record.sector
+            record.industry = info.get("industry") or record.industry
+            record.market_cap = info.get("marketCap") or record.market_cap
+            record.average_volume = info.get("averageVolume") or record.average_volume
+            record.enriched_at = now
+            self._connection.execute(
+                "UPDATE symbols SET sector = ?, industry = ?, market_cap = ?, average_volume = ?, enriched_at = ? "
+                "WHERE symbol = ?",
+                (record.sector, record.industry, record.market_cap, record.average_volume, now, record.symbol)
+            )
+
+    async def start(self):
+        """Start the background directory refresh loop"""
+        self._loop_task = asyncio.create_task(self._run_loop())
+
+    async def stop(self):
+        if self._loop_task and not self._loop_task.done():
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run_loop(self):
+        retry_seconds = _RETRY_SECONDS
+        while True:
+            due = self.refreshed_at + self.refresh_seconds if self.refreshed_at is not None else 0
+            if time.time() >= due:
+                try:
+                    refreshed = await self.refresh()
+                except Exception as e:
+                    logger.error(f"Symbol index refresh failed: {e}")
+                    refreshed = False
+                if not refreshed:
+                    await asyncio.sleep(retry_seconds)
+                    retry_seconds = min(retry_seconds * 2, _MAX_RETRY_SECONDS)
+                    continue
+                retry_seconds = _RETRY_SECONDS
+            await asyncio.sleep(max(self.refreshed_at + self.refresh_seconds - time.time(), 0))
+
+    async def refresh(self) -> bool:
+        """Download the symbol directory and update listings, keeping enrichment; False if nothing was downloaded"""
+        client = get_http_client()
+        results = await asyncio.gather(*(client.get_parsed(url, parse_symbol_directory, upstream="symbol_directory")
+                                         for url in self.urls), return_exceptions=True)
+        listings = []
+        complete = True
+        for url, result in zip(self.urls, results):
+            if isinstance(result, Exception) or not result:
+                logger.warning(f"Symbol directory download failed for {url}: {result}")
+                complete = False
+            else:
+                listings.extend(result)
+
+        if not listings:
+            return False
+        await asyncio.to_thread(self._store_listings, listings, complete)
+        logger.info(f"Symbol index refreshed: {len(self._records)} symbols")
+        return True
+
+    def _store_listings(self, listings: List[Dict[str, Any]], complete: bool):
+        now = time.time()
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.executemany(
+                    "INSERT INTO symbols (symbol, name, exchange, is_etf, is_common, listed_at) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(symbol) DO UPDATE SET name = excluded.name, exchange = excluded.exchange, "
+                    "is_etf = excluded.is_etf, is_common = excluded.is_common, listed_at = excluded.listed_at",
+                    [(row["symbol"], row["name"], row["exchange"], int(row["is_etf"]), int(row["is_common"]), now)
+                     for row in listings]
+                )
+                # Only a full directory tells us which symbols were delisted
+                if complete:
+                    self._connection.execute("DELETE FROM symbols WHERE listed_at < ?", (now,))
+                self._connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('refreshed_at', ?)",
+                                         (str(now),))
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+            records = {} if complete else dict(self._records)
+            for row in listings:
+                record = self._records.get(row["symbol"]) or SymbolRecord(row["symbol"])
+                record.name, record.exchange, record.is_etf, record.is_common, record.listed_at = \
+                    row["name"], row["exchange"], row["is_etf"], row["is_common"], now
+                records[row["symbol"]] = record
+            self._records = records
+            self.refreshed_at = now
+
+
+# Singleton instance shared by every agent
+_symbol_index = None
+
+
+def get_symbol_index(**kwargs) -> SymbolIndex:
+    """Get or create the process-wide symbol index"""
+    global _symbol_index
+    if _symbol_index is None:
+        _symbol_index = SymbolIndex(**kwargs)
+        get_reference_data_cache().add_listener(_symbol_index.enrich)
+    return _symbol_index
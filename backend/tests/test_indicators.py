@@ -0,0 +1,15 @@
+import pytest
+
+from services.indicators import parse_indicator_spec
+
+
+def test_parse_indicator_spec_uses_explicit_and_default_periods():
+    assert parse_indicator_spec("ema_12") == ("ema", 12)
+    assert parse_indicator_spec("RSI") == ("rsi", 14)
+    assert parse_indicator_spec("macd") == ("macd", None)
+
+
+@pytest.mark.parametrize("spec", ["sma_0", "ema_0", "rsi_0", "bollinger_0", "ema_00"])
+def test_parse_indicator_spec_rejects_zero_period(spec):
+    with pytest.raises(ValueError, match="Unsupported indicator"):
+        parse_indicator_spec(spec)
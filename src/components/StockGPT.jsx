@@ -11,6 +11,7 @@ const StockGPT = () => {
   
   // Modern loading animation states
   const [currentAgentStep, setCurrentAgentStep] = useState(0);
+  const [completedAgents, setCompletedAgents] = useState([]);
   
   const agentSteps = [
     {
@@ -51,84 +52,117 @@ const StockGPT = () => {
     }
   ];
 
-  // Manage loading animation progression
+  // Agent names in the stream's `agent` events, mapped to their loading steps
+  const agentStepIds = {
+    WebSearchAgent: 'web_search',
+    MarketAnalysisAgent: 'market_analysis',
+    EarningsAgent: 'earnings_agent',
+    RecommendationSynthesizer: 'synthesizer'
+  };
+
+  // Highlight the first agent that has not reported back yet
   useEffect(() => {
-    let interval;
-    
-    if (loading) {
-      // Start with first step
-      setCurrentAgentStep(0);
-      console.log('Loading animation started: Web Search Agent');
-      
-      // Cycle through steps every 3 seconds
-      interval = setInterval(() => {
-        setCurrentAgentStep(prev => {
-          const nextStep = (prev + 1) % agentSteps.length;
-          console.log(`Loading animation: Step ${prev} → ${nextStep} (${agentSteps[nextStep].title})`);
-          return nextStep;
-        });
-      }, 3000);
-    } else {
-      // Reset to first step when not loading
-      setCurrentAgentStep(0);
-      console.log('Loading animation stopped');
-    }
+    const nextStep = agentSteps.findIndex(step => !completedAgents.includes(step.id));
+    setCurrentAgentStep(nextStep === -1 ? agentSteps.length - 1 : nextStep);
+  }, [completedAgents, agentSteps.length]);
+
+  const transformStock = (stock) => {
+    const score = Math.round(stock.ai_score);
+    console.log(`🔍 SCORE DEBUG: ${stock.symbol} - ai_score: ${stock.ai_score}, rounded: ${score}`);
     
-    return () => {
-      if (interval) clearInterval(interval);
+    return {
+      symbol: stock.symbol,
+      name: stock.company_name,
+      price: parseFloat(stock.current_price).toFixed(2), // Round to 2 decimal places
+      change: parseFloat(stock.month_change / 5).toFixed(2), // Approximate daily change, rounded to 2 decimals
+      changePercent: parseFloat(stock.month_change / 20).toFixed(1), // Approximate daily change %, rounded to 1 decimal
+      recommendation: stock.recommendation,
+      score: score, // Round score to whole number
+      reasoning: stock.reasoning,
+      reasoningStatus: stock.reasoning_status,
+      sector: stock.sector,
+      riskLevel: stock.risk_level
     };
-  }, [loading, agentSteps.length]);
+  };
 
-  const fetchRecommendations = async () => {
+  const fetchRecommendations = () => {
     setLoading(true);
     setError(null);
     setHasSearched(true);
+    setCompletedAgents([]);
     
-    try {
-      // Call the real agentic framework API
-      const response = await fetch('http://127.0.0.1:8000/stock-recommendations', {
-        method: 'GET',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-      });
-      
-      if (!response.ok) {
-        throw new Error(`Failed to fetch recommendations: ${response.status}`);
+    // Stream the agentic pipeline: agents report as they finish, then the ranking, then reasoning per stock
+    const source = new EventSource('http://127.0.0.1:8000/stock-recommendations/stream');
+    let pendingSymbols = new Set();
+    let rankingReceived = false;
+    
+    // Whatever reasoning the stream did not deliver is fetched per symbol
+    const finish = () => {
+      source.close();
+      pendingSymbols.forEach(symbol => fetchReasoning(symbol));
+      pendingSymbols = new Set();
+    };
+    
+    source.addEventListener('agent', (event) => {
+      const data = JSON.parse(event.data);
+      const stepId = agentStepIds[data.agent];
+      if (stepId) {
+        setCompletedAgents(completed => [...completed, stepId]);
       }
-      
-      const data = await response.json();
+    });
+    
+    source.addEventListener('recommendations', (event) => {
+      const data = JSON.parse(event.data);
+      rankingReceived = true;
       
       if (data.success && data.recommendations) {
-        // Transform API response to match component expectations
-        const transformedStocks = data.recommendations.map(stock => {
-          const score = Math.round(stock.ai_score);
-          console.log(`🔍 SCORE DEBUG: ${stock.symbol} - ai_score: ${stock.ai_score}, rounded: ${score}`);
-          
-          return {
-            symbol: stock.symbol,
-            name: stock.company_name,
-            price: parseFloat(stock.current_price).toFixed(2), // Round to 2 decimal places
-            change: parseFloat(stock.month_change / 5).toFixed(2), // Approximate daily change, rounded to 2 decimals
-            changePercent: parseFloat(stock.month_change / 20).toFixed(1), // Approximate daily change %, rounded to 1 decimal
-            recommendation: stock.recommendation,
-            score: score, // Round score to whole number
-            reasoning: stock.reasoning,
-            sector: stock.sector,
-            riskLevel: stock.risk_level
-          };
-        });
-        
+        const transformedStocks = data.recommendations.map(transformStock);
         setRecommendedStocks(transformedStocks);
+        pendingSymbols = new Set(transformedStocks
+          .filter(stock => stock.reasoningStatus === 'pending')
+          .map(stock => stock.symbol));
       } else {
-        throw new Error(data.error || 'No recommendations received');
+        setError(data.error || 'No recommendations received');
+        source.close();
       }
-    } catch (err) {
-      console.error('Error fetching recommendations:', err);
-      setError(err.message || 'Failed to fetch AI recommendations');
-      
-    } finally {
       setLoading(false);
+    });
+    
+    source.addEventListener('reasoning', (event) => {
+      const data = JSON.parse(event.data);
+      pendingSymbols.delete(data.symbol);
+      setRecommendedStocks(stocks => stocks.map(stock =>
+        stock.symbol === data.symbol ? { ...stock, reasoning: data.reasoning, reasoningStatus: 'ready' } : stock
+      ));
+    });
+    
+    source.addEventListener('done', finish);
+    
+    // Fired for the server's `error` event and for dropped connections; never let EventSource reconnect into a new run
+    source.addEventListener('error', (event) => {
+      const message = event.data ? JSON.parse(event.data).error : null;
+      finish();
+      if (!rankingReceived) {
+        console.error('Error streaming recommendations:', message);
+        setError(message || 'Failed to fetch AI recommendations');
+        setLoading(false);
+      }
+    });
+  };
+
+  const fetchReasoning = async (symbol) => {
+    try {
+      const response = await fetch(`http://127.0.0.1:8000/stock-recommendations/${symbol}/reasoning`);
+      if (!response.ok) {
+        throw new Error(`Failed to fetch reasoning: ${response.status}`);
+      }
+      
+      const data = await response.json();
+      setRecommendedStocks(stocks => stocks.map(stock =>
+        stock.symbol === symbol ? { ...stock, reasoning: data.reasoning, reasoningStatus: data.reasoning_status } : stock
+      ));
+    } catch (err) {
+      console.error(`Error fetching reasoning for ${symbol}:`, err);
     }
   };
 
@@ -190,8 +224,8 @@ const StockGPT = () => {
               <div className="grid grid-cols-1 md:grid-cols-2 gap-6 mb-12 max-w-4xl mx-auto px-2">
                 {agentSteps.map((step, index) => {
                   const StepIcon = step.icon;
-                  const isActive = index === currentAgentStep;
-                  const isCompleted = index < currentAgentStep;
+                  const isCompleted = completedAgents.includes(step.id);
+                  const isActive = !isCompleted && index === currentAgentStep;
                   
                   return (
                     <div key={step.id} className="flex justify-center">